@@ -0,0 +1,305 @@
+"""Shared SQLite connection management for `plans.db`.
+
+Opening a connection per request re-reads the schema and throws away the
+page cache every time, and the default rollback journal makes readers and
+writers block each other. `ConnectionPool` keeps one long-lived connection
+per thread instead, opened in WAL mode (readers never wait for the writer)
+with the pragmas below applied once per connection.
+
+Async endpoints never touch a connection directly: `read` runs a query
+function on a small bounded pool of reader threads and `write` on a single
+writer thread, so a slow write or lock wait never blocks the event loop and
+writers never contend with each other for the SQLite write lock.
+
+The writer group-commits: writes queued while it is busy (plus any arriving
+within a short window) run in one transaction, each inside its own
+savepoint, and share a single commit (one fsync). Every caller gets its
+result only after that commit; a write that raises is rolled back on its
+own and the rest of the batch still commits.
+
+Configuration (environment variables):
+- PLANORA_DB_PATH: database file (default `backend/plans.db`)
+- PLANORA_DB_SYNCHRONOUS: OFF, NORMAL or FULL (default FULL: every commit is fsynced, so it survives
+  power loss; with group commit one fsync covers a whole batch. NORMAL may lose the last commits)
+- PLANORA_DB_CACHE_KB: page cache per connection in KiB (default 16384)
+- PLANORA_DB_MMAP_BYTES: bytes of the file to memory-map (default 64 MB, 0 disables)
+- PLANORA_DB_BUSY_TIMEOUT_MS: how long a writer waits for the write lock (default 5000)
+- PLANORA_DB_READ_WORKERS: reader threads used by `read` (default 4)
+- PLANORA_DB_BATCH_MAX: most writes committed together (default 64, 1 commits each write alone)
+- PLANORA_DB_BATCH_WAIT_MS: how long the writer waits for more writes before committing (default 2)
+"""
+
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), 'plans.db')
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class GroupCommitWriter:
+    """Single writer thread that commits queued write functions in batches."""
+
+    def __init__(self, pool: 'ConnectionPool', batch_max: int, batch_wait_ms: float):
+        self.pool = pool
+        self.batch_max = max(1, batch_max)
+        self.batch_wait = max(0.0, batch_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name='planora-db-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, args) -> Future:
+        future = Future()
+        self._queue.put((future, fn, args))
+        return future
+
+    def stop(self):
+        """Commit everything already queued, then stop the thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None, True
+        batch = [first]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_max:
+            try:
+                # take what is already queued, then wait out the window for more
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _loop(self):
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            if batch:
+                self._commit(batch)
+        self.pool._close_current()
+
+    def _commit(self, batch):
+        conn = self.pool.connection()
+        started = []
+        outcomes = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for future, fn, args in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                started.append(future)
+                conn.execute('SAVEPOINT planora_write')
+                try:
+                    result = fn(conn, *args)
+                except Exception as e:
+                    conn.execute('ROLLBACK TO planora_write')
+                    conn.execute('RELEASE planora_write')
+                    outcomes.append((future, None, e))
+                else:
+                    conn.execute('RELEASE planora_write')
+                    outcomes.append((future, result, None))
+            conn.commit()
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            # nothing in the batch was committed: fail every caller still waiting
+            for future, _, _ in batch:
+                if future in started or future.set_running_or_notify_cancel():
+                    future.set_exception(e)
+            with self.pool._lock:
+                self.pool.counters['rollbacks'] += 1
+            return
+        with self.pool._lock:
+            self.pool.counters['batches'] += 1
+            self.pool.counters['batched_writes'] += len(outcomes)
+            self.pool.counters['max_batch'] = max(self.pool.counters['max_batch'], len(outcomes))
+        # only now is every write in the batch durable
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+class ConnectionPool:
+    """One lazily opened, tuned SQLite connection per thread."""
+
+    def __init__(self, db_path: str = None, synchronous: str = None, cache_kb: int = None,
+                 mmap_bytes: int = None, busy_timeout_ms: int = None, read_workers: int = None,
+                 batch_max: int = None, batch_wait_ms: float = None, setup=None):
+        self.db_path = os.environ.get('PLANORA_DB_PATH', DEFAULT_DB_PATH) if db_path is None else db_path
+        synchronous = (os.environ.get('PLANORA_DB_SYNCHRONOUS', 'FULL') if synchronous is None else synchronous).upper()
+        self.synchronous = synchronous if synchronous in SYNCHRONOUS_MODES else 'FULL'
+        self.cache_kb = _env_int('PLANORA_DB_CACHE_KB', 16384) if cache_kb is None else cache_kb
+        self.mmap_bytes = _env_int('PLANORA_DB_MMAP_BYTES', 64 * 1024 * 1024) if mmap_bytes is None else mmap_bytes
+        self.busy_timeout_ms = _env_int('PLANORA_DB_BUSY_TIMEOUT_MS', 5000) if busy_timeout_ms is None else busy_timeout_ms
+        self.read_workers = max(1, _env_int('PLANORA_DB_READ_WORKERS', 4) if read_workers is None else read_workers)
+        self.batch_max = _env_int('PLANORA_DB_BATCH_MAX', 64) if batch_max is None else batch_max
+        if batch_wait_ms is None:
+            try:
+                batch_wait_ms = float(os.environ.get('PLANORA_DB_BATCH_WAIT_MS', 2))
+            except ValueError:
+                batch_wait_ms = 2.0
+        self.batch_wait_ms = batch_wait_ms
+        # schema setup, run once on the first connection instead of at import time
+        self.setup = setup
+        self._setup_done = setup is None
+        self._setup_lock = threading.Lock()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._readers = None
+        self._writer = None
+        # every connection handed out, so close_all can reach other threads' connections
+        self._connections = {}
+        self.counters = {'opened': 0, 'transactions': 0, 'rollbacks': 0, 'reads': 0, 'writes': 0,
+                         'batches': 0, 'batched_writes': 0, 'max_batch': 0}
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000.0, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_kb)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_bytes)}')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use.
+
+        The connection stays open for reuse; do not close it.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._lock:
+                self._connections[threading.get_ident()] = conn
+                self.counters['opened'] += 1
+        if not self._setup_done:
+            self._run_setup(conn)
+        return conn
+
+    def _run_setup(self, conn: sqlite3.Connection):
+        with self._setup_lock:
+            if self._setup_done:
+                return
+            try:
+                self.setup(conn)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            self._setup_done = True
+
+    @contextmanager
+    def transaction(self):
+        """Yield the thread's connection; commit on success, roll back on error.
+
+        Nested blocks on the same thread join the outermost transaction.
+        """
+        conn = self.connection()
+        self._local.depth += 1
+        try:
+            yield conn
+        except BaseException:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                conn.rollback()
+                with self._lock:
+                    self.counters['rollbacks'] += 1
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            conn.commit()
+            with self._lock:
+                self.counters['transactions'] += 1
+
+    def _run(self, fn, args):
+        with self.transaction() as conn:
+            return fn(conn, *args)
+
+    def _close_current(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            with self._lock:
+                self._connections.pop(threading.get_ident(), None)
+            self._local.conn = None
+            conn.close()
+
+    async def read(self, fn, *args):
+        """Run `fn(conn, *args)` in a transaction on a reader thread and return its result."""
+        with self._lock:
+            if self._readers is None:
+                self._readers = ThreadPoolExecutor(max_workers=self.read_workers, thread_name_prefix='planora-db-reader')
+            self.counters['reads'] += 1
+            readers = self._readers
+        return await asyncio.get_running_loop().run_in_executor(readers, self._run, fn, args)
+
+    async def write(self, fn, *args):
+        """Queue `fn(conn, *args)` for the writer thread; returns its result once its batch is committed."""
+        with self._lock:
+            if self._writer is None:
+                self._writer = GroupCommitWriter(self, self.batch_max, self.batch_wait_ms)
+            self.counters['writes'] += 1
+            writer = self._writer
+        return await asyncio.wrap_future(writer.submit(fn, args))
+
+    def shutdown(self):
+        """Stop the reader/writer threads (after queued work) and close all connections."""
+        with self._lock:
+            readers, writer, self._readers, self._writer = self._readers, self._writer, None, None
+        if readers is not None:
+            readers.shutdown(wait=True)
+        if writer is not None:
+            writer.stop()
+        self.close_all()
+
+    def close_all(self):
+        """Close every pooled connection (e.g. on shutdown); threads reopen lazily."""
+        with self._lock:
+            conns, self._connections = list(self._connections.values()), {}
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        # every thread opens a fresh connection on its next use
+        self._local = threading.local()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters,
+                        connections=len(self._connections),
+                        read_workers=self.read_workers,
+                        batch_max=self.batch_max,
+                        batch_wait_ms=self.batch_wait_ms,
+                        db_path=self.db_path,
+                        journal_mode='wal',
+                        synchronous=self.synchronous,
+                        cache_kb=self.cache_kb,
+                        mmap_bytes=self.mmap_bytes,
+                        busy_timeout_ms=self.busy_timeout_ms)
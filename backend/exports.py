@@ -0,0 +1,234 @@
+"""PDF and iCalendar renderings of a study plan.
+
+Both renderers are deterministic: the same plan (and start date) always gives
+the same bytes. That keeps the strong ETags on the export endpoints honest
+and lets identical exports be reused. reportlab is imported on first use.
+
+Drawing a long plan with reportlab takes tens of milliseconds of pure Python,
+so `ExportPool` renders PDFs in memory in worker processes, keeping the event
+loop free and using every core; at most `queue_depth` renders are admitted at
+a time. `render_bundle` is the per-plan job of the bulk export, whose ZIP
+is written incrementally by `ZipStream`.
+
+Configuration (environment variables):
+- PLANORA_EXPORT_WORKERS: render processes (default: min(4, cpu count)); 0 renders in a thread of the server process
+- PLANORA_EXPORT_QUEUE_DEPTH: max renders admitted at once before new ones are rejected (default 16)
+"""
+
+import asyncio
+import io
+import os
+import zipfile
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+from backend.extraction import ExtractionQueueFull, _ProcessPool, _env_int
+
+
+def render_pdf(plan_obj: dict, out):
+    """Draw `plan_obj` as a PDF into `out` (a path or binary file object)."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    # invariant: no creation timestamp or random document id in the output
+    c = canvas.Canvas(out, pagesize=letter, invariant=1)
+    width, height = letter
+    x = 40
+    y = height - 40
+    line_height = 14
+
+    title = f"Planora Study Plan — {plan_obj.get('plan_length', '')} days"
+    c.setFont('Helvetica-Bold', 16)
+    c.drawString(x, y, title)
+    y -= 30
+
+    c.setFont('Helvetica', 10)
+    c.drawString(x, y, f"Course: {plan_obj.get('course_type','')}")
+    y -= 16
+    c.drawString(x, y, f"Exam Date: {plan_obj.get('exam_date','')}")
+    y -= 20
+
+    for day in plan_obj.get('plan', []):
+        if y < 80:
+            c.showPage()
+            y = height - 40
+            c.setFont('Helvetica', 10)
+        header = f"Day {day.get('day')}{' (Review)' if day.get('is_review') else ''} — {day.get('total_minutes',0)} minutes"
+        c.setFont('Helvetica-Bold', 12)
+        c.drawString(x, y, header)
+        y -= 16
+        c.setFont('Helvetica', 10)
+        c.drawString(x+8, y, day.get('daily_summary',''))
+        y -= 14
+        for t in day.get('topics', []):
+            text = f"- {t.get('title')} ({t.get('estimated_minutes')} min)"
+            c.drawString(x+12, y, text)
+            y -= line_height
+        y -= 8
+
+    c.save()
+
+
+def render_pdf_bytes(plan_json: bytes) -> bytes:
+    """Worker job: the PDF of a plan given as JSON text, built in memory."""
+    from backend import fastjson
+    buf = io.BytesIO()
+    render_pdf(fastjson.loads(plan_json), buf)
+    return buf.getvalue()
+
+
+class ExportPool(_ProcessPool):
+    """Bounded process pool that renders plan PDFs.
+
+    Submissions beyond `queue_depth` raise `ExtractionQueueFull` right away,
+    like the extraction pools, so an export burst turns into fast 503s
+    instead of an unbounded backlog.
+    """
+
+    def __init__(self, workers: int = None, queue_depth: int = None):
+        default_workers = min(4, os.cpu_count() or 1)
+        self.workers = _env_int('PLANORA_EXPORT_WORKERS', default_workers) if workers is None else workers
+        self.queue_depth = _env_int('PLANORA_EXPORT_QUEUE_DEPTH', 16) if queue_depth is None else queue_depth
+        self.pending = 0
+
+    async def run(self, fn, *args):
+        """`fn(*args)` in a worker process (a thread when workers is 0)."""
+        if self.pending >= self.queue_depth:
+            raise ExtractionQueueFull()
+        self.pending += 1
+        try:
+            if self.workers > 0:
+                return await self._run_in_worker(fn, *args)
+            return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def render_pdf(self, plan_json: bytes) -> bytes:
+        return await self.run(render_pdf_bytes, plan_json)
+
+    def status(self) -> dict:
+        return {'workers': self.workers, 'queue_depth': self.queue_depth, 'pending': self.pending}
+
+
+def is_study_plan(plan_obj) -> bool:
+    """A plan the renderers can draw: a JSON object whose `plan` (if any) is a list
+    of day objects, each with a list of topic objects."""
+    if not isinstance(plan_obj, dict) or not isinstance(plan_obj.get('plan', []), list):
+        return False
+    for day in plan_obj.get('plan', []):
+        if not isinstance(day, dict) or not isinstance(day.get('topics', []), list):
+            return False
+        if not all(isinstance(t, dict) for t in day.get('topics', [])):
+            return False
+    return True
+
+
+def plan_start(created_at: Optional[str]) -> datetime:
+    """When a saved plan starts (its created_at); unparseable values fall back to 1970-01-01."""
+    try:
+        return datetime.fromisoformat(created_at) if created_at else datetime(1970, 1, 1)
+    except ValueError:
+        return datetime(1970, 1, 1)
+
+
+def render_bundle(plan_id: int, plan_json: bytes, formats: Sequence[str], created_at: Optional[str]) -> List[Tuple[str, bytes]]:
+    """Worker job for bulk exports: [(file name, bytes)] of a saved plan in each of `formats` ("pdf", "ics").
+
+    Raises ValueError if the stored plan is not one `is_study_plan` accepts.
+    """
+    from backend import fastjson
+    try:
+        plan_obj = fastjson.loads(plan_json)
+    except ValueError:
+        plan_obj = None
+    if not is_study_plan(plan_obj):
+        raise ValueError("not a study plan")
+    created = plan_start(created_at)
+    files = []
+    if 'pdf' in formats:
+        buf = io.BytesIO()
+        render_pdf(plan_obj, buf)
+        files.append((f"plan_{plan_id}.pdf", buf.getvalue()))
+    if 'ics' in formats:
+        ics = render_ics(plan_obj, created.date(), stamp=created, uid_prefix=f"planora-{plan_id}")
+        files.append((f"plan_{plan_id}.ics", ics.encode('utf-8')))
+    return files
+
+
+class _ChunkSink:
+    """Write-only file object whose contents are taken out after each entry."""
+
+    def __init__(self):
+        self._buf = bytearray()
+
+    def write(self, data) -> int:
+        self._buf += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = bytes(self._buf)
+        self._buf.clear()
+        return data
+
+
+class ZipStream:
+    """ZIP archive produced piece by piece: `add` and `close` return the bytes to send next.
+
+    The sink cannot seek, so zipfile writes each entry's sizes in a data
+    descriptor after its data, and nothing but the entry being written (plus
+    the central directory) is held in memory.
+    """
+
+    def __init__(self):
+        self._sink = _ChunkSink()
+        self._zip = zipfile.ZipFile(self._sink, 'w')
+
+    def add(self, name: str, data: bytes, compress: bool = True, date_time=(1980, 1, 1, 0, 0, 0)) -> bytes:
+        info = zipfile.ZipInfo(name, date_time=date_time)
+        # PDFs are already deflated inside; storing them costs nothing
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        self._zip.writestr(info, data)
+        return self._sink.take()
+
+    def close(self) -> bytes:
+        self._zip.close()
+        return self._sink.take()
+
+
+def _ics_text(value) -> str:
+    # RFC 5545 TEXT escaping
+    return str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def render_ics(plan_obj: dict, start: date, stamp: Optional[datetime] = None, uid_prefix: str = "planora") -> str:
+    """All-day events, one per plan day, with day 1 on `start`.
+
+    `stamp` becomes every event's DTSTAMP (default: midnight of `start`), so
+    the output depends only on the arguments.
+    """
+    stamp = stamp or datetime(start.year, start.month, start.day)
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Planora//Study Plan//EN",
+    ]
+    for d in plan_obj.get('plan', []):
+        try:
+            day = int(d['day'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        ev_date = start + timedelta(days=day - 1)
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{uid_prefix}-{day}",
+            f"DTSTAMP:{stamp.strftime('%Y%m%dT%H%M%SZ')}",
+            f"DTSTART;VALUE=DATE:{ev_date.strftime('%Y%m%d')}",
+            f"DTEND;VALUE=DATE:{(ev_date + timedelta(days=1)).strftime('%Y%m%d')}",
+            f"SUMMARY:{_ics_text(d.get('daily_summary') or f'Day {day}')}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
@@ -0,0 +1,320 @@
+"""Off-event-loop text extraction for uploaded syllabi.
+
+PDF parsing with pdfplumber is CPU bound and can take seconds for long
+syllabi, so it runs in a bounded process pool instead of inside the async
+request handlers. Large PDFs are split into page ranges that are extracted
+in parallel and joined back in page order.
+
+Image OCR (Tesseract/EasyOCR) gets its own worker processes with a bounded
+queue: once the queue is full, or a job misses its deadline, callers get an
+exception they can turn into a fast 503 instead of piling up requests.
+
+Configuration (environment variables):
+- PLANORA_PDF_WORKERS: worker processes (default: min(4, cpu count)); 0 extracts inline
+- PLANORA_PDF_QUEUE_DEPTH: max PDF jobs admitted at once before new ones are rejected (default 16)
+- PLANORA_PDF_PAGES_PER_CHUNK: pages per parallel range (default 25)
+- PLANORA_OCR_WORKERS: OCR worker processes (default 2); 0 runs OCR inline
+- PLANORA_OCR_QUEUE_SIZE: OCR jobs allowed to wait for a free worker (default 8)
+- PLANORA_OCR_DEADLINE_S: seconds an OCR request may wait plus run (default 30)
+"""
+
+import asyncio
+import io
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Sequence, Tuple
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class ExtractionQueueFull(Exception):
+    """Raised when a pool already has its maximum number of jobs admitted."""
+
+    def __init__(self, retry_after: int = 5):
+        super().__init__("extraction queue is full")
+        self.retry_after = retry_after
+
+
+class ExtractionTimeout(Exception):
+    """Raised when an extraction job does not finish within its deadline."""
+
+    def __init__(self, retry_after: int = 5):
+        super().__init__("extraction deadline exceeded")
+        self.retry_after = retry_after
+
+
+def pdf_page_count(contents: bytes) -> int:
+    import pdfplumber
+    with pdfplumber.open(io.BytesIO(contents)) as pdf:
+        return len(pdf.pages)
+
+
+def extract_pdf_pages(contents: bytes, start: int = 0, end: Optional[int] = None) -> List[str]:
+    """Extract the text of pages [start, end) of a PDF; missing text becomes ""."""
+    import pdfplumber
+    with pdfplumber.open(io.BytesIO(contents)) as pdf:
+        return [p.extract_text() or "" for p in pdf.pages[start:end]]
+
+
+def extract_pdf_text(contents: bytes) -> str:
+    """Synchronously extract a whole PDF, pages joined by blank lines."""
+    return "\n\n".join(extract_pdf_pages(contents))
+
+
+def page_ranges(page_count: int, pages_per_chunk: int) -> List[Tuple[int, int]]:
+    pages_per_chunk = max(1, pages_per_chunk)
+    return [(s, min(s + pages_per_chunk, page_count)) for s in range(0, page_count, pages_per_chunk)]
+
+
+def ocr_image(contents: bytes, use_gpu: bool = False, languages: Optional[Sequence[str]] = None) -> Tuple[str, float, float]:
+    """OCR job run in a worker: returns (text, started_at, finished_at) wall-clock times."""
+    started = time.time()
+    from backend.parser import extract_text_from_image
+    text = extract_text_from_image(contents, use_gpu=use_gpu, languages=languages)
+    return text, started, time.time()
+
+
+def ocr_warm_language_sets() -> List[List[str]]:
+    """Language sets listed in PLANORA_OCR_WARM_LANGUAGES ("en;en,fr" -> [["en"], ["en", "fr"]])."""
+    spec = os.environ.get('PLANORA_OCR_WARM_LANGUAGES') or ''
+    return [[l for l in group.split(',') if l.strip()] for group in spec.split(';') if group.strip()]
+
+
+def warm_ocr_readers():
+    """Preload the EasyOCR readers configured for warm-up in the current process."""
+    language_sets = ocr_warm_language_sets()
+    if not language_sets:
+        return
+    from backend.parser import easyocr_readers
+    gpu = os.environ.get('PLANORA_OCR_WARM_GPU', '').lower() in ("1", "true", "yes")
+    try:
+        easyocr_readers.warm(language_sets, gpu=gpu)
+    except Exception as e:
+        print(f"Warning: could not warm EasyOCR readers: {e}")
+
+
+def _noop():
+    return None
+
+
+class _ProcessPool:
+    """Lazily started spawn-based process pool shared by the extraction pools.
+
+    A worker that dies (OOM kill, a crash in native code) breaks the whole
+    ProcessPoolExecutor; the broken executor is dropped so the next job
+    starts fresh worker processes.
+    """
+
+    workers = 0
+    _executor = None
+    _initializer = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: never fork a process that is running the server's threads
+            ctx = multiprocessing.get_context('spawn')
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                                 initializer=self._initializer)
+        return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        """Forget a broken executor (if it is still the current one) and reap its workers."""
+        if executor is not None and self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run_in_worker(self, fn, *args):
+        """`fn(*args)` in a worker process.
+
+        If the pool is broken by a dead worker, it is replaced and the job is
+        tried once more; a second break raises `ExtractionQueueFull` so the
+        caller answers 503 instead of failing every later job.
+        """
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            executor = self._get_executor()
+            try:
+                return await loop.run_in_executor(executor, fn, *args)
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+        raise ExtractionQueueFull()
+
+    def start(self):
+        """Spawn the worker processes now instead of on the first job."""
+        if self.workers > 0:
+            executor = self._get_executor()
+            for _ in range(self.workers):
+                executor.submit(_noop)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class PdfExtractionPool(_ProcessPool):
+    """Bounded process pool for PDF text extraction.
+
+    At most `queue_depth` PDFs are admitted at a time; further submissions raise
+    `ExtractionQueueFull` straight away instead of queueing without bound.
+    """
+
+    def __init__(self, workers: int = None, queue_depth: int = None, pages_per_chunk: int = None):
+        default_workers = min(4, os.cpu_count() or 1)
+        self.workers = _env_int('PLANORA_PDF_WORKERS', default_workers) if workers is None else workers
+        self.queue_depth = _env_int('PLANORA_PDF_QUEUE_DEPTH', 16) if queue_depth is None else queue_depth
+        self.pages_per_chunk = _env_int('PLANORA_PDF_PAGES_PER_CHUNK', 25) if pages_per_chunk is None else pages_per_chunk
+        self.pending = 0
+
+    async def extract(self, contents: bytes) -> str:
+        """Extract a PDF's text without blocking the event loop.
+
+        Raises `ExtractionQueueFull` when the pool is saturated and re-raises
+        pdfplumber errors (e.g. when `contents` is not a PDF).
+        """
+        if self.workers <= 0:
+            # Inline mode (PLANORA_PDF_WORKERS=0): the pre-pool behaviour
+            return extract_pdf_text(contents)
+        if self.pending >= self.queue_depth:
+            raise ExtractionQueueFull()
+        self.pending += 1
+        try:
+            page_count = await self._run_in_worker(pdf_page_count, contents)
+            ranges = page_ranges(page_count, self.pages_per_chunk)
+            if len(ranges) <= 1:
+                pages = await self._run_in_worker(extract_pdf_pages, contents)
+            else:
+                chunks = await asyncio.gather(*[
+                    self._run_in_worker(extract_pdf_pages, contents, s, e) for s, e in ranges
+                ])
+                pages = [p for chunk in chunks for p in chunk]
+            return "\n\n".join(pages)
+        finally:
+            self.pending -= 1
+
+    def status(self) -> dict:
+        return {
+            'workers': self.workers,
+            'queue_depth': self.queue_depth,
+            'pending': self.pending,
+            'pages_per_chunk': self.pages_per_chunk,
+        }
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+
+class OcrWorkerPool(_ProcessPool):
+    """Dedicated OCR worker processes with a bounded queue and per-request deadline.
+
+    Up to `workers + queue_size` jobs are in flight at once (running or waiting);
+    beyond that `submit` raises `ExtractionQueueFull` immediately. A job that is
+    not done within `deadline` seconds raises `ExtractionTimeout`; it keeps its
+    slot until the worker actually finishes, so timed-out work still counts
+    towards the queue. Each worker keeps its own EasyOCR reader pool and warms
+    it (PLANORA_OCR_WARM_LANGUAGES) when it starts.
+    """
+
+    _initializer = staticmethod(warm_ocr_readers)
+
+    def __init__(self, workers: int = None, queue_size: int = None, deadline: float = None, window: int = 200):
+        self.workers = _env_int('PLANORA_OCR_WORKERS', 2) if workers is None else workers
+        self.queue_size = _env_int('PLANORA_OCR_QUEUE_SIZE', 8) if queue_size is None else queue_size
+        if deadline is None:
+            try:
+                deadline = float(os.environ.get('PLANORA_OCR_DEADLINE_S', 30))
+            except ValueError:
+                deadline = 30.0
+        self.deadline = deadline
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self.counters = {'submitted': 0, 'completed': 0, 'rejected': 0, 'deadline_exceeded': 0}
+        self._wait_times = deque(maxlen=window)
+        self._ocr_times = deque(maxlen=window)
+
+    @property
+    def capacity(self) -> int:
+        return max(1, self.workers) + self.queue_size
+
+    def _retry_after(self) -> int:
+        # Rough time for the current backlog to drain
+        avg_ocr = (sum(self._ocr_times) / len(self._ocr_times)) if self._ocr_times else 5.0
+        return max(1, int(round(avg_ocr * self.in_flight / max(1, self.workers))))
+
+    def _release(self, _future=None):
+        with self._lock:
+            self.in_flight -= 1
+
+    async def submit(self, contents: bytes, use_gpu: bool = False, languages: Optional[Sequence[str]] = None) -> str:
+        """OCR `contents` in a worker process and return the text."""
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.counters['rejected'] += 1
+                raise ExtractionQueueFull(self._retry_after())
+            self.in_flight += 1
+            self.counters['submitted'] += 1
+        enqueued = time.time()
+        if self.workers <= 0:
+            # Inline mode (PLANORA_OCR_WORKERS=0): OCR inside the request handler
+            try:
+                text, started, finished = ocr_image(contents, use_gpu, languages)
+            finally:
+                self._release()
+        else:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(ocr_image, contents, use_gpu, languages)
+            except BrokenProcessPool:
+                self._release()
+                self._discard_executor(executor)
+                raise ExtractionQueueFull(self._retry_after())
+            except Exception:
+                self._release()
+                raise
+            future.add_done_callback(self._release)
+            try:
+                text, started, finished = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.deadline)
+            except BrokenProcessPool:
+                # a worker died; the next job gets a fresh pool
+                self._discard_executor(executor)
+                raise ExtractionQueueFull(self._retry_after())
+            except asyncio.TimeoutError:
+                # drops the job if it has not started yet; a running job finishes in the background
+                future.cancel()
+                with self._lock:
+                    self.counters['deadline_exceeded'] += 1
+                raise ExtractionTimeout(self._retry_after())
+        with self._lock:
+            self.counters['completed'] += 1
+            self._wait_times.append(max(0.0, started - enqueued))
+            self._ocr_times.append(finished - started)
+        return text
+
+    def status(self) -> dict:
+        with self._lock:
+            return dict(
+                self.counters,
+                workers=self.workers,
+                queue_size=self.queue_size,
+                deadline_s=self.deadline,
+                in_flight=self.in_flight,
+                queue_depth=max(0, self.in_flight - self.workers),
+                wait_s_p50=_percentile(self._wait_times, 0.5),
+                wait_s_p95=_percentile(self._wait_times, 0.95),
+                ocr_s_p50=_percentile(self._ocr_times, 0.5),
+                ocr_s_p95=_percentile(self._ocr_times, 0.95),
+            )
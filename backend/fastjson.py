@@ -0,0 +1,50 @@
+"""Fast JSON encoding for large responses.
+
+FastAPI runs every returned object through `jsonable_encoder` and then
+`json.dumps`, which walks a 365-day plan twice. An endpoint that returns a
+`FastJSONResponse` skips the encoder pass, and the body is rendered by orjson
+when it is installed or by the stdlib otherwise. `RawJSONResponse` sends text
+that is already JSON, such as a stored plan, without parsing it at all.
+"""
+
+import json
+from importlib.util import find_spec
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+ORJSON_AVAILABLE = find_spec('orjson') is not None
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON for `content`; values plain JSON can't express go through jsonable_encoder."""
+    if ORJSON_AVAILABLE:
+        import orjson
+        try:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            pass
+    try:
+        text = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+    except TypeError:
+        text = json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+    return text.encode('utf-8')
+
+
+def loads(data):
+    """Parse JSON text or bytes (orjson when available)."""
+    if ORJSON_AVAILABLE:
+        import orjson
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """Body is already-encoded JSON and is sent as is."""
+    media_type = "application/json"
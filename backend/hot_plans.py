@@ -0,0 +1,101 @@
+"""Process-local cache of recently read saved plans.
+
+A few active plans are read over and over: Streamlit reloads them, and the
+calendar and export flows fetch them again. This LRU keeps each plan's
+decoded JSON bytes (already decompressed and carrying its latest done flags,
+exactly what get_plan sends) together with its version. The total size is
+bounded by a byte budget.
+
+Every write to a plan invalidates its entry once the write has committed. A
+reader that missed the cache takes a `token()` before going to the database.
+Its `put` is dropped if any invalidation happened in between, so a read that
+raced a write can never re-insert the old row. Entries are not shared
+between processes: writes made by another worker process or by scripts are
+not seen, so run a single backend process, or set the budget to 0 when
+running several.
+
+Configuration (environment variables):
+- PLANORA_PLAN_READ_CACHE_BYTES: memory budget (default 32 MB, 0 disables the cache)
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# rough per-entry bookkeeping (key, tuple, OrderedDict slot) on top of the body
+ENTRY_OVERHEAD = 128
+
+
+class HotPlanCache:
+    """Byte-bounded LRU of plan id -> (JSON bytes, version)."""
+
+    def __init__(self, max_bytes: int = None):
+        if max_bytes is None:
+            try:
+                max_bytes = int(os.environ.get('PLANORA_PLAN_READ_CACHE_BYTES', 32 * 1024 * 1024))
+            except ValueError:
+                max_bytes = 32 * 1024 * 1024
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._used = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'stores': 0, 'stale_puts': 0, 'invalidations': 0, 'evictions': 0}
+
+    def get(self, plan_id: int) -> Optional[Tuple[bytes, int]]:
+        with self._lock:
+            entry = self._entries.get(plan_id)
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            self._entries.move_to_end(plan_id)
+            self.counters['hits'] += 1
+            return entry[0], entry[1]
+
+    def token(self) -> int:
+        """Take before reading a plan from the database; pass to `put`."""
+        return self._generation
+
+    def put(self, plan_id: int, body: bytes, version: int, token: int):
+        size = len(body) + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if token != self._generation:
+                # a plan was written since this read started; it may be this one
+                self.counters['stale_puts'] += 1
+                return
+            old = self._entries.pop(plan_id, None)
+            if old is not None:
+                self._used -= old[2]
+            self._entries[plan_id] = (body, version, size)
+            self._used += size
+            self.counters['stores'] += 1
+            while self._used > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._used -= evicted
+                self.counters['evictions'] += 1
+
+    def invalidate(self, plan_id: int):
+        """Forget `plan_id`; call after every committed write to that plan."""
+        with self._lock:
+            self._generation += 1
+            old = self._entries.pop(plan_id, None)
+            if old is not None:
+                self._used -= old[2]
+                self.counters['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._used = 0
+
+    def stats(self) -> dict:
+        lookups = self.counters['hits'] + self.counters['misses']
+        return dict(self.counters,
+                    entries=len(self._entries),
+                    bytes=self._used,
+                    max_bytes=self.max_bytes,
+                    hit_rate=round(self.counters['hits'] / lookups, 3) if lookups else None)
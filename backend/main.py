@@ -1,27 +1,66 @@
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
-import uvicorn
-import io
-import pdfplumber
+import asyncio
+import base64
+from contextlib import asynccontextmanager
+import hashlib
 import json
-from backend.parser import extract_topics, generate_plan
+import math
+import re
+from backend.parser import extract_topics, sweep_plans, reschedule_plan
+from backend.extraction import PdfExtractionPool, OcrWorkerPool, ExtractionQueueFull, ExtractionTimeout, ocr_warm_language_sets, warm_ocr_readers
+from backend.text_cache import TextCache, cache_key
+from backend.plan_cache import PlanCache
+from backend.hot_plans import HotPlanCache
+from backend.pdf_cache import PdfCache, pdf_cache_key
+from backend.db import ConnectionPool
+from backend.migrations import migrate
+from backend import exports, store
+from backend.fastjson import FastJSONResponse, RawJSONResponse
+from backend import fastjson
 from fastapi.responses import StreamingResponse
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-import tempfile
-import sqlite3
 import os
-from datetime import datetime, timedelta
-# Optional encryption for token-at-rest
-try:
-    from cryptography.fernet import Fernet, InvalidToken
-    CRYPTO_AVAILABLE = True
-except Exception:
-    CRYPTO_AVAILABLE = False
+from datetime import date, datetime, timedelta
+from importlib.util import find_spec
+# Optional encryption for token-at-rest. Heavy optional packages (cryptography,
+# reportlab, the OCR stack in backend.parser) are only probed here and imported
+# on first use, so a new worker starts quickly.
+CRYPTO_AVAILABLE = find_spec('cryptography') is not None
 
-app = FastAPI(title="Planora Backend")
+
+def _fernet(key):
+    from cryptography.fernet import Fernet
+    return Fernet(key.encode() if isinstance(key, str) else key)
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    """Warm the OCR readers on startup; shut the worker pools, caches and DB down on exit.
+
+    EasyOCR models listed in PLANORA_OCR_WARM_LANGUAGES (e.g. "en;en,fr") are loaded
+    before the first request.
+    """
+    if ocr_warm_language_sets():
+        if ocr_pool.workers > 0:
+            # OCR runs in the worker processes; each warms its readers as it starts
+            ocr_pool.start()
+        else:
+            warm_ocr_readers()
+    try:
+        yield
+    finally:
+        pdf_pool.shutdown()
+        ocr_pool.shutdown()
+        export_pool.shutdown()
+        text_cache.shutdown()
+        db.shutdown()
+
+
+# orjson-rendered responses by default; big payloads return FastJSONResponse directly
+# so FastAPI skips its jsonable_encoder pass too (see backend/fastjson.py)
+app = FastAPI(title="Planora Backend", default_response_class=FastJSONResponse, lifespan=_lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,21 +70,91 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.post("/plan")
-async def create_plan(
-    file: Optional[UploadFile] = File(None),
-    image: Optional[UploadFile] = File(None),
-    syllabus_text: Optional[str] = Form(None),
-    topics_text: Optional[str] = Form(None),
-    exam_date: Optional[str] = Form(None),
-    exam_type: Optional[str] = Form("final"),
-    hours_per_day: float = Form(2.0),
-    plan_length: int = Form(14),
-    review_day_fraction: Optional[float] = Form(None),
-    course_type: str = Form("General"),
-    use_ocr_gpu: Optional[str] = Form(None),
-):
-    """Create a study plan from an uploaded syllabus (PDF), pasted text, manual topics, or image OCR."""
+# PDF text extraction runs in a bounded process pool (see backend/extraction.py)
+pdf_pool = PdfExtractionPool()
+# Image OCR runs in its own worker processes with a bounded queue and deadline
+ocr_pool = OcrWorkerPool()
+# Extracted syllabus text keyed by upload hash + extractor settings (see backend/text_cache.py)
+text_cache = TextCache()
+# Memoized generate_plan results keyed by a fingerprint of topics + plan settings
+plan_cache = PlanCache()
+# Recently read saved plans (stored JSON bytes + version); every plan write invalidates its entry
+hot_plans = HotPlanCache()
+# PDF exports are drawn in worker processes and kept by plan content hash (backend/pdf_cache.py)
+export_pool = exports.ExportPool()
+pdf_cache = PdfCache()
+
+
+OCR_LANGUAGE_RE = re.compile(r"^[a-z_]{2,10}$")
+
+
+def _parse_ocr_languages(value: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated OCR language list ("en,fr"); raises ValueError on bad codes."""
+    if not value:
+        return None
+    langs = [l.strip().lower() for l in value.split(',') if l.strip()]
+    if len(langs) > 8 or not all(OCR_LANGUAGE_RE.match(l) for l in langs):
+        raise ValueError("ocr_languages must be up to 8 comma-separated language codes")
+    return langs or None
+
+
+def _ocr_settings(use_ocr_gpu: Optional[str], ocr_languages: Optional[List[str]] = None) -> dict:
+    """Extractor settings that affect OCR output (part of the text cache key)."""
+    from . import parser as _parser
+    use_gpu_flag = bool(use_ocr_gpu and str(use_ocr_gpu).lower() in ("1", "true", "yes"))
+    engines = [name for name, ok in (("tesseract", _parser.OCR_AVAILABLE), ("easyocr", _parser.EASYOCR_AVAILABLE)) if ok]
+    languages = list(_parser.normalize_languages(ocr_languages))
+    return {"extractor": "ocr", "engines": engines, "gpu": use_gpu_flag, "languages": languages}
+
+
+def _busy(e: Exception, what: str) -> HTTPException:
+    """503 telling the client when to retry an overloaded extraction pool."""
+    return HTTPException(status_code=503, detail=f"{what} is busy ({e}), retry shortly",
+                         headers={"Retry-After": str(e.retry_after)})
+
+
+async def _ocr_text(contents: bytes, use_ocr_gpu: Optional[str], ocr_languages: Optional[List[str]] = None) -> str:
+    settings = _ocr_settings(use_ocr_gpu, ocr_languages)
+    key = cache_key(contents, **settings)
+    cached = await text_cache.aget(key)
+    if cached is not None:
+        return cached
+    try:
+        text = await ocr_pool.submit(contents, use_gpu=settings["gpu"], languages=settings["languages"]) or ""
+    except (ExtractionQueueFull, ExtractionTimeout) as e:
+        raise _busy(e, "OCR")
+    except Exception:
+        text = ""
+    await text_cache.aput(key, text)
+    return text
+
+
+async def _file_text(contents: bytes) -> str:
+    """Text of an uploaded PDF (via the extraction pool) or plain-text file."""
+    key = cache_key(contents, extractor="pdfplumber")
+    cached = await text_cache.aget(key)
+    if cached is not None:
+        return cached
+    try:
+        if b"%PDF" not in contents[:1024]:
+            raise ValueError("not a PDF")
+        text = await pdf_pool.extract(contents)
+    except ExtractionQueueFull as e:
+        raise _busy(e, "PDF extraction")
+    except Exception:
+        try:
+            return contents.decode("utf-8")
+        except Exception:
+            return ""
+    await text_cache.aput(key, text)
+    return text
+
+
+async def _read_syllabus_text(file: Optional[UploadFile], image: Optional[UploadFile], syllabus_text: Optional[str], topics_text: Optional[str], use_ocr_gpu: Optional[str], ocr_languages: Optional[List[str]] = None) -> str:
+    """Return the syllabus text from manual topics, image OCR, an uploaded file or pasted text.
+
+    Extracted PDF/OCR text is cached by content hash, so repeat uploads skip extraction.
+    """
     # Priority: manual topics_text -> image OCR -> uploaded file (pdf/text) -> syllabus_text
     text = ""
 
@@ -54,43 +163,44 @@ async def create_plan(
         text = topics_text
     elif image is not None:
         contents = await image.read()
-        try:
-            # try OCR from image
-            from .parser import extract_text_from_image
-            use_gpu_flag = False
-            if use_ocr_gpu and str(use_ocr_gpu).lower() in ("1","true","yes"):
-                use_gpu_flag = True
-
-            ocr_text = extract_text_from_image(contents, use_gpu=use_gpu_flag)
-            text = ocr_text or ""
-        except Exception:
-            text = ""
+        text = await _ocr_text(contents, use_ocr_gpu, ocr_languages)
     elif file is not None:
         contents = await file.read()
         # If image file uploaded via file field
         if file.content_type and file.content_type.startswith("image"):
-            try:
-                from .parser import extract_text_from_image
-                use_gpu_flag = False
-                if use_ocr_gpu and str(use_ocr_gpu).lower() in ("1","true","yes"):
-                    use_gpu_flag = True
-                text = extract_text_from_image(contents, use_gpu=use_gpu_flag) or ""
-            except Exception:
-                text = ""
+            text = await _ocr_text(contents, use_ocr_gpu, ocr_languages)
         else:
-            try:
-                with pdfplumber.open(io.BytesIO(contents)) as pdf:
-                    pages = [p.extract_text() or "" for p in pdf.pages]
-                    text = "\n\n".join(pages)
-            except Exception:
-                try:
-                    text = contents.decode("utf-8")
-                except Exception:
-                    text = ""
+            text = await _file_text(contents)
 
     if not text and syllabus_text:
         text = syllabus_text
+    return text
+
+
+@app.post("/plan")
+async def create_plan(
+    file: Optional[UploadFile] = File(None),
+    image: Optional[UploadFile] = File(None),
+    syllabus_text: Optional[str] = Form(None),
+    topics_text: Optional[str] = Form(None),
+    exam_date: Optional[str] = Form(None),
+    exam_type: Optional[str] = Form("final"),
+    hours_per_day: float = Form(2.0),
+    plan_length: int = Form(14),
+    review_day_fraction: Optional[float] = Form(None),
+    course_type: str = Form("General"),
+    use_ocr_gpu: Optional[str] = Form(None),
+    ocr_languages: Optional[str] = Form(None),
+):
+    """Create a study plan from an uploaded syllabus (PDF), pasted text, manual topics, or image OCR.
 
+    `ocr_languages` is an optional comma-separated list of OCR language codes (e.g. "en,fr").
+    """
+    try:
+        langs = _parse_ocr_languages(ocr_languages)
+    except ValueError as e:
+        return {"error": str(e)}
+    text = await _read_syllabus_text(file, image, syllabus_text, topics_text, use_ocr_gpu, langs)
     if not text:
         return {"error": "No syllabus, topics, or image provided"}
 
@@ -100,7 +210,7 @@ async def create_plan(
         rfrac = float(review_day_fraction) if review_day_fraction is not None else None
     except Exception:
         rfrac = None
-    plan = generate_plan(topics, plan_length=plan_length, hours_per_day=hours_per_day, exam_type=exam_type, review_day_fraction=rfrac)
+    plan = plan_cache.generate(topics, plan_length=plan_length, hours_per_day=hours_per_day, exam_type=exam_type, review_day_fraction=rfrac)
 
     response = {
         "exam_date": exam_date,
@@ -108,137 +218,439 @@ async def create_plan(
         "plan_length": plan_length,
         "hours_per_day": hours_per_day,
         "course_type": course_type,
+        "review_day_fraction": rfrac,
         "topics_count": len(topics),
+        # topic metadata lets /reschedule re-plan saved plans without re-parsing
+        "topics": [t.to_dict() for t in topics],
         "plan": plan,
     }
-    return response
+    return FastJSONResponse(response)
+
+
+# Upper bound on hours_per_day x plan_length combinations per /plan_sweep call
+SWEEP_MAX_POINTS = 400
+
+
+def _parse_number_list(value: str, cast):
+    """Parse a JSON list ("[1, 2]") or comma-separated string ("1,2") into a list of numbers."""
+    value = (value or "").strip()
+    if value.startswith('['):
+        items = json.loads(value)
+    else:
+        items = [v for v in value.split(',') if v.strip()]
+    return [cast(v) for v in items]
+
+
+@app.post("/plan_sweep")
+async def plan_sweep(
+    file: Optional[UploadFile] = File(None),
+    image: Optional[UploadFile] = File(None),
+    syllabus_text: Optional[str] = Form(None),
+    topics_text: Optional[str] = Form(None),
+    exam_type: Optional[str] = Form("final"),
+    hours_per_day: str = Form("2.0"),
+    plan_length: str = Form("14"),
+    review_day_fraction: Optional[float] = Form(None),
+    use_ocr_gpu: Optional[str] = Form(None),
+    ocr_languages: Optional[str] = Form(None),
+):
+    """Size one syllabus for every combination of `hours_per_day` and `plan_length`.
+
+    Both fields accept a JSON list or a comma-separated string (e.g. "1,2,3"). Returns a grid of
+    plan summaries (review/study days, study minutes, whether the topics fit) without building days.
+    """
+    try:
+        hours_options = _parse_number_list(hours_per_day, float)
+        length_options = _parse_number_list(plan_length, int)
+    except Exception:
+        return {"error": "hours_per_day and plan_length must be lists of numbers"}
+    if not hours_options or not length_options:
+        return {"error": "hours_per_day and plan_length must not be empty"}
+    if any(h <= 0 for h in hours_options) or any(n < 1 for n in length_options):
+        return {"error": "hours_per_day must be positive and plan_length at least 1"}
+    # "nan" and "inf" parse as floats but cannot size a day
+    if not all(math.isfinite(h) for h in hours_options):
+        return {"error": "hours_per_day must be finite"}
+    if review_day_fraction is not None and not math.isfinite(review_day_fraction):
+        return {"error": "review_day_fraction must be finite"}
+    if len(hours_options) * len(length_options) > SWEEP_MAX_POINTS:
+        return {"error": f"too many combinations (max {SWEEP_MAX_POINTS})"}
+    try:
+        langs = _parse_ocr_languages(ocr_languages)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    text = await _read_syllabus_text(file, image, syllabus_text, topics_text, use_ocr_gpu, langs)
+    if not text:
+        return {"error": "No syllabus, topics, or image provided"}
+
+    topics = extract_topics(text)
+    grid = sweep_plans([t.get("length", 0) for t in topics], length_options, hours_options,
+                       exam_type=exam_type, review_day_fraction=review_day_fraction)
+    return {
+        "exam_type": exam_type,
+        "topics_count": len(topics),
+        "hours_per_day": hours_options,
+        "plan_length": length_options,
+        "grid": grid,
+    }
 
 
 DB_PATH = os.path.join(os.path.dirname(__file__), 'plans.db')
 
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS plans (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        created_at TEXT,
-        course_type TEXT,
-        exam_date TEXT,
-        plan_json TEXT
-    )''')
-    # Table for storing OAuth tokens (refresh tokens) tied to a plan or user
-    c.execute('''CREATE TABLE IF NOT EXISTS oauth_tokens (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        plan_id INTEGER,
-        refresh_token TEXT,
-        access_token TEXT,
-        scope TEXT,
-        expires_at TEXT,
-        created_at TEXT
-    )''')
-    # Users table for simple account management
-    c.execute('''CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE,
-        password_hash TEXT,
-        created_at TEXT
-    )''')
-
-    # Ensure optional user_id columns exist on plans and oauth_tokens (for migrations)
-    # SQLite: add column if not exists by checking pragma
-    def _ensure_column(table, column_def):
-        colname = column_def.split()[0]
-        c.execute(f"PRAGMA table_info({table})")
-        cols = [r[1] for r in c.fetchall()]
-        if colname not in cols:
-            c.execute(f"ALTER TABLE {table} ADD COLUMN {column_def}")
-
-    _ensure_column('plans', 'user_id INTEGER')
-    _ensure_column('oauth_tokens', 'user_id INTEGER')
-    conn.commit()
-    conn.close()
-
-
-init_db()
+# Per-thread pooled connections (WAL, tuned pragmas); the first one applies pending
+# schema migrations (backend/migrations.py). Tests swap in their own pool.
+db = ConnectionPool(os.environ.get('PLANORA_DB_PATH', DB_PATH), setup=migrate)
+
+
+async def _read_plan(plan_id: int):
+    """(JSON bytes, version) of a saved plan, or None; served from hot_plans when possible."""
+    cached = hot_plans.get(plan_id)
+    if cached is not None:
+        return cached
+    token = hot_plans.token()
+    row = await db.read(store.get_plan_bytes, plan_id)
+    if row:
+        hot_plans.put(plan_id, row[0], row[1], token)
+    return row
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header value names `etag` (weak comparison, `*` matches anything)."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*' or (tag[2:] if tag.startswith('W/') else tag) == etag:
+            return True
+    return False
+
+
+async def _plan_version(plan_id: int) -> Optional[int]:
+    """Current version of a plan for ETag checks: hot_plans if it holds the plan, else one indexed read."""
+    cached = hot_plans.get(plan_id)
+    if cached is not None:
+        return cached[1]
+    return await db.read(store.plan_version, plan_id)
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={'ETag': etag})
+
+
+def _as_stored_plan(plan: str) -> str:
+    """`plan` if it is valid JSON, else the {"plan": <text>} that get_plan returns for other text.
+
+    Stored plans are thereby always JSON, so get_plan can send them without parsing.
+    """
+    try:
+        fastjson.loads(plan)
+        return plan
+    except ValueError:
+        return json.dumps({"plan": plan})
 
 
 @app.post('/save_plan')
 async def save_plan(plan: str = Form(...), course_type: str = Form(None), exam_date: str = Form(None), user_id: Optional[int] = Form(None)):
     """Save a plan JSON and return an id."""
     # Accept optional user_id to associate the plan
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
     now = datetime.utcnow().isoformat()
-    if user_id:
-        c.execute('INSERT INTO plans (created_at, course_type, exam_date, plan_json, user_id) VALUES (?,?,?,?,?)', (now, course_type, exam_date, plan, user_id))
-    else:
-        c.execute('INSERT INTO plans (created_at, course_type, exam_date, plan_json) VALUES (?,?,?,?)', (now, course_type, exam_date, plan))
-    plan_id = c.lastrowid
-    conn.commit()
-    conn.close()
-    return {"id": plan_id}
+    plan_id = await db.write(store.insert_plan, now, course_type, exam_date, _as_stored_plan(plan), user_id)
+    hot_plans.invalidate(plan_id)
+    return {"id": plan_id, "version": 0}
+
+
+# Largest page /list_plans returns; longer listings follow next_cursor or stream as NDJSON
+LIST_PLANS_MAX_LIMIT = max(1, int(os.environ.get('PLANORA_LIST_MAX_LIMIT', 500)))
+
+
+def _encode_cursor(before_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"before": before_id}).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor: str) -> int:
+    """Plan id the next page starts below; raises ValueError on a malformed cursor."""
+    try:
+        before_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))["before"]
+    except Exception:
+        raise ValueError("invalid_cursor")
+    if type(before_id) is not int:
+        raise ValueError("invalid_cursor")
+    return before_id
+
+
+def _parse_list_fields(fields: Optional[str]) -> tuple:
+    """Comma-separated subset of store.PLAN_LIST_FIELDS; raises ValueError on unknown names."""
+    if not fields:
+        return store.PLAN_LIST_FIELDS
+    requested = tuple(f.strip() for f in fields.split(',') if f.strip())
+    unknown = [f for f in requested if f not in store.PLAN_LIST_FIELDS]
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)} (allowed: {', '.join(store.PLAN_LIST_FIELDS)})")
+    return requested
+
+
+async def _stream_plan_listing(user_id: Optional[int], before_id: Optional[int], fields: tuple, limit: Optional[int]):
+    """NDJSON lines, fetched one keyset page at a time so memory stays flat."""
+    remaining = None if limit is None else max(1, limit)
+    while remaining is None or remaining > 0:
+        page_size = LIST_PLANS_MAX_LIMIT if remaining is None else min(remaining, LIST_PLANS_MAX_LIMIT)
+        rows = await db.read(store.list_plans, page_size, user_id, before_id, fields)
+        if rows:
+            yield b''.join(fastjson.dumps(r) + b'\n' for r in rows)
+            before_id = rows[-1]['id']
+        if len(rows) < page_size:
+            return
+        if remaining is not None:
+            remaining -= len(rows)
+    # stopped by `limit`: say where to resume if anything is left
+    if await db.read(store.list_plans, 1, user_id, before_id, ('id',)):
+        yield fastjson.dumps({"next_cursor": _encode_cursor(before_id)}) + b'\n'
+
+
+def _listing_etag(user_id: Optional[int], before_id: Optional[int], page_size: int, columns: tuple,
+                  newest_id: Optional[int]) -> str:
+    # Listed columns never change after insert, there is no delete, and ids
+    # only grow: a page's content is fixed by its query plus the newest id on it.
+    key = f"{user_id}|{before_id}|{page_size}|{','.join(columns)}|{newest_id}"
+    return '"list-' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
 
 
 @app.get('/list_plans')
-async def list_plans(limit: int = 50, user_id: Optional[int] = None):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    if user_id:
-        c.execute('SELECT id, created_at, course_type, exam_date, user_id FROM plans WHERE user_id=? ORDER BY id DESC LIMIT ?', (user_id, limit))
-    else:
-        c.execute('SELECT id, created_at, course_type, exam_date, user_id FROM plans ORDER BY id DESC LIMIT ?', (limit,))
-    rows = c.fetchall()
-    conn.close()
-    items = []
-    for r in rows:
-        items.append({"id": r[0], "created_at": r[1], "course_type": r[2], "exam_date": r[3], "user_id": r[4]})
-    return {"plans": items}
+async def list_plans(limit: Optional[int] = None, user_id: Optional[int] = None, cursor: Optional[str] = None,
+                     fields: Optional[str] = None, format: str = 'json',
+                     if_none_match: Optional[str] = Header(None)):
+    """Newest-first plan summaries, paged by an opaque cursor.
+
+    A page holds `limit` plans (default 50, at most LIST_PLANS_MAX_LIMIT); pass
+    the returned `next_cursor` back as `cursor` for the next one (null on the
+    last page). `fields` picks a comma-separated subset of the summary columns;
+    `id` is always returned. `format=ndjson` streams every plan after `cursor`
+    (or only `limit` of them, then a `{"next_cursor": ...}` line) one per line.
+
+    JSON pages carry an ETag; a matching If-None-Match gets 304 after a
+    one-row index lookup.
+    """
+    try:
+        before_id = _decode_cursor(cursor) if cursor else None
+        columns = _parse_list_fields(fields)
+    except ValueError as e:
+        return {"error": str(e)}
+    if format == 'ndjson':
+        return StreamingResponse(_stream_plan_listing(user_id, before_id, columns, limit),
+                                 media_type='application/x-ndjson')
+    page_size = min(max(1, 50 if limit is None else limit), LIST_PLANS_MAX_LIMIT)
+    if if_none_match:
+        newest = await db.read(store.list_plans, 1, user_id, before_id, ('id',))
+        etag = _listing_etag(user_id, before_id, page_size, columns, newest[0]['id'] if newest else None)
+        if _etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+    # one extra row tells whether another page exists
+    rows = await db.read(store.list_plans, page_size + 1, user_id, before_id, columns)
+    next_cursor = _encode_cursor(rows[page_size - 1]['id']) if len(rows) > page_size else None
+    etag = _listing_etag(user_id, before_id, page_size, columns, rows[0]['id'] if rows else None)
+    return FastJSONResponse({"plans": rows[:page_size], "next_cursor": next_cursor}, headers={'ETag': etag})
 
 
 @app.post('/register')
 async def register(username: str = Form(...), password: str = Form(...)):
     """Register a new user. Returns user id on success or error if username exists."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
     now = datetime.utcnow().isoformat()
-    # check exists
-    c.execute('SELECT id FROM users WHERE username=?', (username,))
-    if c.fetchone():
-        conn.close()
+    # PBKDF2 is deliberately slow; keep it off the event loop too
+    ph = await asyncio.get_running_loop().run_in_executor(None, _hash_password, password)
+    uid = await db.write(store.insert_user, username, ph, now)
+    if uid is None:
         return {"error": "username_exists"}
-    ph = _hash_password(password)
-    c.execute('INSERT INTO users (username, password_hash, created_at) VALUES (?,?,?)', (username, ph, now))
-    uid = c.lastrowid
-    conn.commit()
-    conn.close()
     return {"user_id": uid}
 
 
 @app.post('/login')
 async def login(username: str = Form(...), password: str = Form(...)):
     """Simple login: verify password and return user_id on success."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('SELECT id, password_hash FROM users WHERE username=?', (username,))
-    row = c.fetchone()
-    conn.close()
+    row = await db.read(store.find_user, username)
     if not row:
         return {"error": "not_found"}
     uid, stored = row
-    if not _verify_password(stored, password):
+    if not await asyncio.get_running_loop().run_in_executor(None, _verify_password, stored, password):
         return {"error": "invalid_credentials"}
     return {"user_id": uid}
 
 
 @app.post('/update_plan')
 async def update_plan(id: int = Form(...), plan: str = Form(...)):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('UPDATE plans SET plan_json=? WHERE id=?', (plan, id))
-    conn.commit()
-    conn.close()
-    return {"ok": True}
+    version = await db.write(store.update_plan_json, id, _as_stored_plan(plan))
+    hot_plans.invalidate(id)
+    return {"ok": True, "version": version}
+
+
+def _parse_done_flags(done: Optional[str]) -> dict:
+    """Parse done flags given as a JSON list of {"day", "topic_index", "done"} objects or [day, topic_index, done] triples."""
+    flags = {}
+    for item in json.loads(done) if done else []:
+        if isinstance(item, dict):
+            day, idx, flag = item["day"], item["topic_index"], item.get("done", True)
+        else:
+            day, idx, flag = item
+        flags[(int(day), int(idx))] = bool(flag)
+    return flags
+
+
+def _apply_done_flags(days: List[dict], flags: dict) -> int:
+    """Set `done` on the topics addressed by `flags`; returns how many were found."""
+    applied = 0
+    for day in days:
+        for i, t in enumerate(day.get("topics", [])):
+            if (day.get("day"), i) in flags:
+                t["done"] = flags[(day.get("day"), i)]
+                applied += 1
+    return applied
+
+
+@app.patch('/plan_progress')
+async def patch_plan_progress(id: int = Form(...), version: int = Form(...), changes: str = Form(...)):
+    """Apply a few done-flag changes to saved plan `id` without resending the plan.
+
+    `changes` uses the same format as /reschedule's `done` field. `version` must be
+    the plan's current version (from save_plan, update_plan, a previous patch or
+    get_plan's X-Plan-Version header); on a mismatch nothing is written and the
+    current version is returned with a "version_conflict" error. Plans kept in
+    plan_topics (PLANORA_PLAN_ROWS) are updated there with indexed UPDATEs and
+    their stored JSON is not rewritten.
+    """
+    try:
+        flags = _parse_done_flags(changes)
+    except Exception:
+        return {"error": "invalid changes payload"}
+    if await db.read(store.has_plan_rows, id):
+        return await _patch_topic_rows(id, version, flags)
+    # checked against the database, not hot_plans, so a stale entry can't cause a false conflict
+    current = await db.read(store.plan_version, id)
+    if current is None:
+        return {"error": "not found"}
+    if current != version:
+        return {"error": "version_conflict", "version": current}
+    if not flags:
+        return {"ok": True, "version": version, "applied": 0}
+    row = await _read_plan(id)
+    if row and row[1] != version:
+        row = await db.read(store.get_plan_bytes, id)
+    if not row:
+        return {"error": "not found"}
+    try:
+        plan_obj = json.loads(row[0])
+        applied = _apply_done_flags(plan_obj["plan"], flags)
+    except Exception:
+        return {"error": "stored plan has no days"}
+    if applied != len(flags):
+        return {"error": "unknown day or topic_index in changes"}
+    # compare-and-set: a concurrent writer between the read and here wins
+    if not await db.write(store.update_plan_json_if_version, id, json.dumps(plan_obj), version):
+        return {"error": "version_conflict", "version": await db.read(store.plan_version, id)}
+    hot_plans.invalidate(id)
+    return {"ok": True, "version": version + 1, "applied": applied}
+
+
+async def _patch_topic_rows(id: int, version: int, flags: dict) -> dict:
+    """plan_progress for a plan kept in plan_topics: flip the flags in SQL, leave plan_json alone."""
+    if flags:
+        try:
+            if await db.write(store.update_topics_done, id, version, flags):
+                hot_plans.invalidate(id)
+                return {"ok": True, "version": version + 1, "applied": len(flags)}
+        except KeyError:
+            return {"error": "unknown day or topic_index in changes"}
+    current = await db.read(store.plan_version, id)
+    if current != version:
+        return {"error": "version_conflict", "version": current}
+    return {"ok": True, "version": version, "applied": 0}
+
+
+@app.get('/plan_stats')
+async def plan_stats(id: int, as_of: Optional[str] = None):
+    """Progress of saved plan `id` without loading it into the client.
+
+    Returns topic and minute totals (done and overall), how many days are
+    finished, the next day with unfinished topics and the overdue days. Day 1
+    is the day the plan was saved (UTC), as in the calendar export, and a day
+    is overdue once `as_of` (YYYY-MM-DD, default today) is past it. Plans kept
+    in plan_days / plan_topics (PLANORA_PLAN_ROWS) are answered by indexed
+    queries; others by parsing the stored plan ("source" says which).
+    """
+    try:
+        today = date.fromisoformat(as_of) if as_of else datetime.utcnow().date()
+    except ValueError:
+        return {"error": "as_of must be YYYY-MM-DD"}
+    progress = await db.read(store.plan_progress, id)
+    if progress is None:
+        return {"error": "not found"}
+    try:
+        first_day = datetime.fromisoformat(progress.pop("created_at")).date()
+    except (TypeError, ValueError):
+        first_day = today
+    current_day = (today - first_day).days + 1
+    open_days = progress.pop("open_days")
+    return {"id": id, **progress, "days_done": progress["days"] - len(open_days), "current_day": current_day,
+            "next_day": open_days[0] if open_days else None,
+            "overdue_days": [d for d in open_days if d < current_day]}
+
+
+@app.post('/reschedule')
+async def reschedule(id: int = Form(...), plan_length: int = Form(...), done: Optional[str] = Form(None), hours_per_day: Optional[float] = Form(None),
+                     exam_type: Optional[str] = Form(None), review_day_fraction: Optional[float] = Form(None), as_of: Optional[str] = Form(None)):
+    """Re-plan the unfinished topics of saved plan `id` over `plan_length` new days.
+
+    Completed work is kept as it is; only the remaining minutes of the stored
+    topics are reallocated (see parser.reschedule_plan). The new days start on
+    the plan's current day (day 1 is the day it was saved, as in /plan_stats;
+    `as_of` is YYYY-MM-DD, default today). `hours_per_day`, `exam_type` and
+    `review_day_fraction` default to the stored plan's. `done` optionally
+    carries the latest done flags (topic_index is 0-based within the day). The
+    rescheduled plan is saved back under the same id and returned; its new
+    version is sent in the X-Plan-Version header.
+    """
+    if plan_length < 1:
+        return {"error": "plan_length must be at least 1"}
+    try:
+        today = date.fromisoformat(as_of) if as_of else datetime.utcnow().date()
+    except ValueError:
+        return {"error": "as_of must be YYYY-MM-DD"}
+    try:
+        flags = _parse_done_flags(done)
+    except Exception:
+        return {"error": "invalid done payload"}
+    row = await _read_plan(id)
+    header = await db.read(store.plan_header, id)
+    if not row or not header:
+        return {"error": "not found"}
+    try:
+        current_day = (today - datetime.fromisoformat(header[1]).date()).days + 1
+    except (TypeError, ValueError):
+        current_day = 1
+    try:
+        plan_obj = json.loads(row[0])
+        days = plan_obj["plan"]
+    except Exception:
+        return {"error": "stored plan has no days to reschedule"}
+
+    # record the latest done flags on the stored days
+    _apply_done_flags(days, flags)
+    hours = hours_per_day or float(plan_obj.get("hours_per_day") or 2.0)
+    exam_type = exam_type or plan_obj.get("exam_type") or "final"
+    if review_day_fraction is None:
+        review_day_fraction = plan_obj.get("review_day_fraction")
+    new_days = reschedule_plan(days, plan_length, hours_per_day=hours, exam_type=exam_type,
+                               review_day_fraction=review_day_fraction,
+                               topics_meta=plan_obj.get("topics"), first_day=current_day)
+    plan_obj["plan"] = new_days
+    plan_obj["plan_length"] = len(new_days)
+    plan_obj["hours_per_day"] = hours
+    plan_obj["exam_type"] = exam_type
+    plan_obj["review_day_fraction"] = review_day_fraction
+    if not await db.write(store.update_plan_json_if_version, id, json.dumps(plan_obj), row[1]):
+        return {"error": "version_conflict", "version": await db.read(store.plan_version, id)}
+    hot_plans.invalidate(id)
+    return FastJSONResponse(plan_obj, headers={'X-Plan-Version': str(row[1] + 1)})
 
 
 def _get_oauth_client_creds():
@@ -265,7 +677,7 @@ def _get_cipher():
     ciphers = []
     for k in key_list:
         try:
-            ciphers.append(Fernet(k.encode() if isinstance(k, str) else k))
+            ciphers.append(_fernet(k))
         except Exception:
             continue
     if not ciphers:
@@ -396,12 +808,8 @@ async def gcal_oauth_callback(code: Optional[str] = None, state: Optional[str] =
 
     # store tokens (encrypt refresh token if possible)
     enc_refresh = _encrypt_token(refresh_token)
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
     now = datetime.utcnow().isoformat()
-    c.execute('INSERT INTO oauth_tokens (plan_id, refresh_token, access_token, scope, expires_at, created_at, user_id) VALUES (?,?,?,?,?,?,?)', (plan_id, enc_refresh, access_token, scope, expires_at, now, user_id))
-    conn.commit()
-    conn.close()
+    await db.write(store.insert_oauth_token, plan_id, enc_refresh, access_token, scope, expires_at, now, user_id)
 
     # Return a small HTML success page that instructs the user
     html = """
@@ -432,19 +840,26 @@ def _refresh_access_token(refresh_token: str):
     return resp.json()
 
 
+def _plan_etag(plan_id: int, version: int) -> str:
+    return f'"plan-{plan_id}-v{version}"'
+
+
 @app.get('/get_plan')
-async def get_plan(id: int):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('SELECT plan_json FROM plans WHERE id=?', (id,))
-    row = c.fetchone()
-    conn.close()
+async def get_plan(id: int, if_none_match: Optional[str] = Header(None)):
+    """The saved plan exactly as stored (no parse / re-encode); its version is in X-Plan-Version.
+
+    The ETag is derived from the plan's version, so a client holding the
+    current copy gets 304 without the plan being read.
+    """
+    if if_none_match:
+        version = await _plan_version(id)
+        if version is not None and _etag_matches(if_none_match, _plan_etag(id, version)):
+            return _not_modified(_plan_etag(id, version))
+    row = await _read_plan(id)
     if not row:
         return {"error": "not found"}
-    try:
-        return json.loads(row[0])
-    except Exception:
-        return {"plan": row[0]}
+    # every row is JSON: save_plan normalizes its input and migration 6 wrapped older text rows
+    return RawJSONResponse(row[0], headers={'X-Plan-Version': str(row[1]), 'ETag': _plan_etag(id, row[1])})
 
 
 @app.post('/gcal_create')
@@ -464,14 +879,9 @@ async def gcal_create(events: str = Form(...), access_token: str = Form(...)):
     if access_token.startswith('plan:'):
         try:
             pid = int(access_token.split(':',1)[1])
-            conn = sqlite3.connect(DB_PATH)
-            c = conn.cursor()
-            c.execute('SELECT refresh_token FROM oauth_tokens WHERE plan_id=? ORDER BY id DESC LIMIT 1', (pid,))
-            row = c.fetchone()
-            conn.close()
-            if not row:
+            stored = await db.read(store.latest_refresh_token, pid)
+            if stored is None:
                 return {"error": "no refresh token for plan"}
-            stored = row[0]
             # decrypt stored refresh token if encrypted
             refresh_token = _decrypt_token(stored) or stored
             tok = _refresh_access_token(refresh_token)
@@ -505,17 +915,12 @@ async def gcal_revoke(plan_id: Optional[int] = Form(None), user_id: Optional[int
     Returns a summary of revocation attempts.
     """
     import requests as _requests
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    if plan_id:
-        c.execute('SELECT id, refresh_token FROM oauth_tokens WHERE plan_id=? AND revoked=0', (plan_id,))
-    elif user_id:
-        c.execute('SELECT id, refresh_token FROM oauth_tokens WHERE user_id=? AND revoked=0', (user_id,))
-    else:
-        conn.close()
+    if not plan_id and not user_id:
         return {"error": "provide plan_id or user_id"}
-    rows = c.fetchall()
+    rows = await db.read(store.active_refresh_tokens, plan_id, user_id)
     results = []
+    revoked = []
+    # Google is called outside the transaction so the write lock is not held across requests
     for r in rows:
         oid, stored = r
         # attempt decrypt, fallback to plaintext
@@ -528,48 +933,22 @@ async def gcal_revoke(plan_id: Optional[int] = Form(None), user_id: Optional[int
             status = resp.status_code
             ok = status in (200, 400)  # 200 OK, 400 if token already invalid per Google
             if ok:
-                c.execute('UPDATE oauth_tokens SET revoked=1 WHERE id=?', (oid,))
+                revoked.append(oid)
                 results.append({"id": oid, "status": "revoked", "code": status})
             else:
                 results.append({"id": oid, "status": "failed", "code": status, "body": resp.text})
         except Exception as e:
             results.append({"id": oid, "status": "error", "error": str(e)})
-    conn.commit()
-    conn.close()
+    if revoked:
+        await db.write(store.mark_tokens_revoked, revoked)
     return {"results": results}
 
 
-@app.post('/rotate_keys')
-async def rotate_keys(new_key: str = Form(...), backup: bool = Form(False)):
-    """Rotate encryption keys for stored refresh tokens.
-
-    This endpoint will decrypt each stored refresh token using existing keys (or treat as plaintext)
-    and re-encrypt using `new_key`. If `backup` is true, the previous ciphertext is stored in
-    `refresh_token_backup` column.
-
-    Warning: rotating keys is a sensitive operation; ensure you keep `new_key` secure.
-    """
-    if not CRYPTO_AVAILABLE:
-        return {"error": "cryptography not available on server"}
-    try:
-        new_cipher = Fernet(new_key.encode() if isinstance(new_key, str) else new_key)
-    except Exception as e:
-        return {"error": f"invalid new_key: {e}"}
-
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    # ensure backup column exists
-    c.execute("PRAGMA table_info(oauth_tokens)")
-    cols = [r[1] for r in c.fetchall()]
-    if 'refresh_token_backup' not in cols:
-        c.execute('ALTER TABLE oauth_tokens ADD COLUMN refresh_token_backup TEXT')
-
-    c.execute('SELECT id, refresh_token FROM oauth_tokens')
-    rows = c.fetchall()
+def _rotate_refresh_tokens(conn, new_cipher, backup: bool):
+    """Re-encrypt every stored refresh token with `new_cipher`; runs in one write transaction."""
     rotated = 0
     failed = []
-    for r in rows:
-        oid, stored = r
+    for oid, stored in store.all_refresh_tokens(conn):
         # attempt to decrypt with existing keys; if fails, assume stored plaintext
         try:
             plain = _decrypt_token(stored)
@@ -583,72 +962,229 @@ async def rotate_keys(new_key: str = Form(...), backup: bool = Form(False)):
             continue
         try:
             new_ciphertext = new_cipher.encrypt(plain.encode()).decode()
-            if backup:
-                c.execute('UPDATE oauth_tokens SET refresh_token_backup=? WHERE id=?', (stored, oid))
-            c.execute('UPDATE oauth_tokens SET refresh_token=? WHERE id=?', (new_ciphertext, oid))
+            store.replace_refresh_token(conn, oid, new_ciphertext, backup=stored if backup else None)
             rotated += 1
         except Exception as e:
             failed.append({"id": oid, "error": str(e)})
-    conn.commit()
-    conn.close()
+    return rotated, failed
+
+
+@app.post('/rotate_keys')
+async def rotate_keys(new_key: str = Form(...), backup: bool = Form(False)):
+    """Rotate encryption keys for stored refresh tokens.
+
+    This endpoint will decrypt each stored refresh token using existing keys (or treat as plaintext)
+    and re-encrypt using `new_key`. If `backup` is true, the previous ciphertext is stored in
+    `refresh_token_backup` column.
+
+    Warning: rotating keys is a sensitive operation; ensure you keep `new_key` secure.
+    """
+    if not CRYPTO_AVAILABLE:
+        return {"error": "cryptography not available on server"}
+    try:
+        new_cipher = _fernet(new_key)
+    except Exception as e:
+        return {"error": f"invalid new_key: {e}"}
+
+    rotated, failed = await db.write(_rotate_refresh_tokens, new_cipher, backup)
     return {"rotated": rotated, "failed": failed}
 
 
+# PDFs are sent in pieces of this size, from memory
+PDF_CHUNK_BYTES = 64 * 1024
+
+
+def _iter_chunks(data: bytes):
+    view = memoryview(data)
+    for i in range(0, len(view), PDF_CHUNK_BYTES):
+        yield bytes(view[i:i + PDF_CHUNK_BYTES])
+
+
+async def _pdf_response(plan_json: bytes, filename: str, headers: Optional[dict] = None):
+    """Stream the PDF of `plan_json` from pdf_cache, rendering it in export_pool on a miss."""
+    key = pdf_cache_key(plan_json)
+    pdf = pdf_cache.get(key)
+    if pdf is None:
+        try:
+            pdf = await export_pool.render_pdf(plan_json)
+        except ExtractionQueueFull as e:
+            raise _busy(e, "PDF export")
+        except (ValueError, TypeError, AttributeError):
+            return {"error": "invalid plan"}
+        pdf_cache.put(key, pdf)
+    return StreamingResponse(_iter_chunks(pdf), media_type='application/pdf', headers=dict(
+        headers or {}, **{"Content-Disposition": f"attachment; filename={filename}", "Content-Length": str(len(pdf))}))
+
+
 @app.post('/export_pdf')
-async def export_pdf(plan: dict = Form(...)):
-    """Accepts a `plan` JSON (as form field or string) and returns a simple PDF representation."""
-    # `plan` may arrive as a JSON string
-    import json as _json
+async def export_pdf(plan: str = Form(...)):
+    """Accepts a `plan` JSON string (form field) and returns a simple PDF representation."""
     try:
-        if isinstance(plan, str):
-            plan_obj = _json.loads(plan)
+        plan_obj = fastjson.loads(plan)
+    except ValueError:
+        return {"error": "plan is not valid JSON"}
+    if not isinstance(plan_obj, dict):
+        return {"error": "plan must be a JSON object"}
+    return await _pdf_response(plan.encode('utf-8'), "planora_plan.pdf")
+
+
+async def _saved_plan_export(plan_id: int):
+    """(plan dict, version, created_at) of a saved plan for the export endpoints, or an error dict."""
+    row = await _read_plan(plan_id)
+    if not row:
+        return {"error": "not found"}
+    header = await db.read(store.plan_header, plan_id)
+    try:
+        plan_obj = fastjson.loads(row[0])
+    except ValueError:
+        plan_obj = None
+    if not exports.is_study_plan(plan_obj) or not header:
+        return {"error": "not a study plan"}
+    return plan_obj, row[1], header[1]
+
+
+@app.get('/export_pdf')
+async def export_saved_pdf(id: int, if_none_match: Optional[str] = Header(None)):
+    """PDF of a saved plan; ETag follows the plan's version, so unchanged plans answer 304."""
+    if if_none_match:
+        version = await _plan_version(id)
+        if version is not None and _etag_matches(if_none_match, f'"pdf-{id}-v{version}"'):
+            return _not_modified(f'"pdf-{id}-v{version}"')
+    row = await _read_plan(id)
+    if not row:
+        return {"error": "not found"}
+    body, version = row
+    if body.lstrip()[:1] != b"{":
+        return {"error": "not a study plan"}
+    return await _pdf_response(body, f"planora_plan_{id}.pdf", {'ETag': f'"pdf-{id}-v{version}"'})
+
+
+@app.get('/export_ics')
+async def export_saved_ics(id: int, start: Optional[str] = None, if_none_match: Optional[str] = Header(None)):
+    """iCalendar file of a saved plan with day 1 on `start` (YYYY-MM-DD; default: the day it was saved)."""
+    start_date = None
+    if start:
+        try:
+            start_date = date.fromisoformat(start)
+        except ValueError:
+            return {"error": "invalid start date, expected YYYY-MM-DD"}
+    header = await db.read(store.plan_header, id)
+    if not header:
+        return {"error": "not found"}
+    version, created_at = header
+    created = exports.plan_start(created_at)
+    start_date = start_date or created.date()
+    etag = f'"ics-{id}-v{version}-{start_date.isoformat()}"'
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    found = await _saved_plan_export(id)
+    if isinstance(found, dict):
+        return found
+    plan_obj, version, _ = found
+    etag = f'"ics-{id}-v{version}-{start_date.isoformat()}"'
+    ics = exports.render_ics(plan_obj, start_date, stamp=created, uid_prefix=f"planora-{id}")
+    return Response(ics.encode('utf-8'), media_type='text/calendar', headers={
+        "Content-Disposition": f"attachment; filename=planora_plan_{id}.ics", 'ETag': etag})
+
+
+# Most plans one /export_bulk request may include
+BULK_EXPORT_MAX_PLANS = max(1, int(os.environ.get('PLANORA_BULK_EXPORT_MAX_PLANS', 500)))
+EXPORT_FORMATS = ('pdf', 'ics')
+# How often one bulk-export plan waits 50 ms for a full export pool (~10 s) before it is skipped
+BULK_EXPORT_BUSY_RETRIES = 200
+
+
+async def _bulk_export_files(plan_id: int, formats: tuple):
+    """(plan id, [(file name, bytes)], error) for one plan of a bulk export."""
+    row = await db.read(store.get_plan_bytes, plan_id)
+    header = await db.read(store.plan_header, plan_id)
+    if not row or not header:
+        return plan_id, [], "not found"
+    body = row[0]
+    cached = pdf_cache.get(pdf_cache_key(body)) if 'pdf' in formats else None
+    todo = tuple(f for f in formats if not (f == 'pdf' and cached is not None))
+    files = []
+    if todo:
+        for _ in range(BULK_EXPORT_BUSY_RETRIES + 1):
+            try:
+                files = await export_pool.run(exports.render_bundle, plan_id, body, todo, header[1])
+                break
+            except ExtractionQueueFull:
+                # other exports hold the pool; this request's window is already bounded
+                await asyncio.sleep(0.05)
+            except (ValueError, TypeError, AttributeError) as e:
+                return plan_id, [], str(e) or "invalid plan"
         else:
-            plan_obj = plan
-    except Exception:
-        plan_obj = plan
-
-    # Create PDF in a temporary file
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-    c = canvas.Canvas(tmp.name, pagesize=letter)
-    width, height = letter
-    x = 40
-    y = height - 40
-    line_height = 14
-
-    title = f"Planora Study Plan — {plan_obj.get('plan_length', '')} days"
-    c.setFont('Helvetica-Bold', 16)
-    c.drawString(x, y, title)
-    y -= 30
-
-    c.setFont('Helvetica', 10)
-    c.drawString(x, y, f"Course: {plan_obj.get('course_type','')}")
-    y -= 16
-    c.drawString(x, y, f"Exam Date: {plan_obj.get('exam_date','')}")
-    y -= 20
-
-    for day in plan_obj.get('plan', []):
-        if y < 80:
-            c.showPage()
-            y = height - 40
-            c.setFont('Helvetica', 10)
-        header = f"Day {day.get('day')}{' (Review)' if day.get('is_review') else ''} — {day.get('total_minutes',0)} minutes"
-        c.setFont('Helvetica-Bold', 12)
-        c.drawString(x, y, header)
-        y -= 16
-        c.setFont('Helvetica', 10)
-        c.drawString(x+8, y, day.get('daily_summary',''))
-        y -= 14
-        for t in day.get('topics', []):
-            text = f"- {t.get('title')} ({t.get('estimated_minutes')} min)"
-            c.drawString(x+12, y, text)
-            y -= line_height
-        y -= 8
-
-    c.save()
-    tmp.flush()
-    tmp.seek(0)
-
-    return StreamingResponse(open(tmp.name, 'rb'), media_type='application/pdf', headers={"Content-Disposition": "attachment; filename=planora_plan.pdf"})
+            return plan_id, [], "export busy"
+    if cached is not None:
+        files.insert(0, (f"plan_{plan_id}.pdf", cached))
+    return plan_id, files, None
+
+
+async def _stream_bulk_zip(plan_ids: List[int], formats: tuple):
+    """ZIP bytes, one entry at a time in the order renders finish, then manifest.json.
+
+    At most a couple of renders per worker are in flight, so memory holds a
+    handful of plans however many are exported.
+    """
+    window = max(1, min(2 * max(1, export_pool.workers), export_pool.queue_depth))
+    todo = iter(plan_ids)
+    running = set()
+    manifest = []
+    archive = exports.ZipStream()
+    try:
+        while True:
+            for plan_id in todo:
+                running.add(asyncio.ensure_future(_bulk_export_files(plan_id, formats)))
+                if len(running) >= window:
+                    break
+            if not running:
+                break
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                plan_id, files, error = task.result()
+                for name, data in files:
+                    yield archive.add(name, data, compress=not name.endswith('.pdf'))
+                manifest.append({"id": plan_id, "files": [name for name, _ in files], "error": error})
+        yield archive.add('manifest.json', fastjson.dumps(manifest))
+        yield archive.close()
+    finally:
+        # client went away: drop renders nobody will read
+        for task in running:
+            task.cancel()
+
+
+@app.post('/export_bulk')
+async def export_bulk(ids: Optional[str] = Form(None), user_id: Optional[int] = Form(None), formats: str = Form('pdf,ics')):
+    """ZIP of many saved plans as PDF and/or ICS files, streamed while they render.
+
+    Pass `ids` (a JSON list of plan ids) or `user_id` (all of that user's
+    plans). `formats` is a comma-separated subset of pdf,ics. Files are
+    named plan_<id>.pdf / plan_<id>.ics; the archive ends with manifest.json
+    listing every plan's files, or its error (e.g. "not found").
+    """
+    wanted = tuple(f for f in EXPORT_FORMATS if f in {x.strip().lower() for x in formats.split(',')})
+    if not wanted:
+        return {"error": f"formats must be a comma-separated subset of {','.join(EXPORT_FORMATS)}"}
+    if ids:
+        try:
+            requested = json.loads(ids)
+            if not isinstance(requested, list) or not all(type(i) is int for i in requested):
+                raise ValueError
+        except ValueError:
+            return {"error": "ids must be a JSON list of plan ids"}
+        plan_ids = list(dict.fromkeys(requested))
+    elif user_id:
+        rows = await db.read(store.list_plans, BULK_EXPORT_MAX_PLANS + 1, user_id, None, ('id',))
+        plan_ids = [r['id'] for r in rows]
+    else:
+        return {"error": "pass ids or user_id"}
+    if len(plan_ids) > BULK_EXPORT_MAX_PLANS:
+        return {"error": f"at most {BULK_EXPORT_MAX_PLANS} plans per export; pass ids in batches"}
+    if export_pool.queue_depth < 1:
+        raise _busy(ExtractionQueueFull(), "PDF export")
+    return StreamingResponse(_stream_bulk_zip(plan_ids, wanted), media_type='application/zip',
+                             headers={"Content-Disposition": "attachment; filename=planora_plans.zip"})
 
 
 @app.get('/ocr_status')
@@ -659,20 +1195,26 @@ async def ocr_status():
         'tesseract_binary': False,
         'easyocr_installed': False,
     }
-    try:
-        import pytesseract
+    # find_spec only looks the packages up; importing easyocr would load torch
+    if find_spec('pytesseract') is not None:
         info['pytesseract_installed'] = True
         # check binary presence
         import shutil
         info['tesseract_binary'] = bool(shutil.which('tesseract'))
-    except Exception:
-        pass
-    try:
-        import easyocr
-        info['easyocr_installed'] = True
-    except Exception:
-        pass
+    info['easyocr_installed'] = find_spec('easyocr') is not None
+    # EasyOCR readers loaded in this process (OCR workers keep their own)
+    from .parser import easyocr_readers
+    info['easyocr_readers'] = easyocr_readers.status()
+    # OCR worker pool sizing: queue depth, wait time and OCR time
+    info['ocr_pool'] = ocr_pool.status()
     return info
 
+@app.get('/cache_stats')
+async def cache_stats():
+    """Return hit/miss counters and sizes of the server-side caches."""
+    return {'text': text_cache.stats(), 'plan': plan_cache.stats(), 'hot_plans': hot_plans.stats(),
+            'pdf': dict(pdf_cache.stats(), pool=export_pool.status())}
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,181 @@
+"""Versioned schema migrations for `plans.db`.
+
+The schema version lives in SQLite's `PRAGMA user_version`. `migrate` reads
+that single integer and, when steps are pending, applies all of them in one
+transaction and bumps the version, so every later start (and every worker
+racing it) only pays for the integer check.
+
+To change the schema, append a `(version, description, function)` step to
+`MIGRATIONS`; never edit a step that has shipped.
+"""
+
+import json
+import sqlite3
+from typing import Iterable, Tuple
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> set:
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_missing_columns(conn: sqlite3.Connection, table: str, column_defs: Iterable[str]):
+    existing = _columns(conn, table)
+    for column_def in column_defs:
+        if column_def.split()[0] not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column_def}")
+
+
+def _v1_baseline(conn: sqlite3.Connection):
+    # Databases from before versioning already have (some of) these tables
+    # and columns, so this step is written to be safe on them too.
+    conn.execute('''CREATE TABLE IF NOT EXISTS plans (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        created_at TEXT,
+        course_type TEXT,
+        exam_date TEXT,
+        plan_json TEXT
+    )''')
+    # OAuth tokens (refresh tokens) tied to a plan or user
+    conn.execute('''CREATE TABLE IF NOT EXISTS oauth_tokens (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        plan_id INTEGER,
+        refresh_token TEXT,
+        access_token TEXT,
+        scope TEXT,
+        expires_at TEXT,
+        created_at TEXT
+    )''')
+    # Users table for simple account management
+    conn.execute('''CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE,
+        password_hash TEXT,
+        created_at TEXT
+    )''')
+    _add_missing_columns(conn, 'plans', [
+        'user_id INTEGER',
+        # bumped on every write; lets clients send optimistic progress patches
+        'version INTEGER NOT NULL DEFAULT 0',
+    ])
+    _add_missing_columns(conn, 'oauth_tokens', [
+        'user_id INTEGER',
+        # set by /gcal_revoke
+        'revoked INTEGER NOT NULL DEFAULT 0',
+        # previous ciphertext kept by key rotation when asked to
+        'refresh_token_backup TEXT',
+    ])
+
+
+def _v2_token_and_owner_indexes(conn: sqlite3.Connection):
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_plans_user_id ON plans(user_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_oauth_tokens_plan_id ON oauth_tokens(plan_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_oauth_tokens_user_id ON oauth_tokens(user_id)')
+
+
+def _v3_covering_indexes(conn: sqlite3.Connection):
+    # Each index holds every column its query reads, so list_plans and the
+    # token lookups never touch the table rows (plans rows carry the whole
+    # plan_json, often spilling onto overflow pages). `id` follows the
+    # equality column so ORDER BY id DESC LIMIT n is a short backwards walk.
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_plans_user_listing '
+                 'ON plans(user_id, id, created_at, course_type, exam_date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_oauth_tokens_plan_tokens '
+                 'ON oauth_tokens(plan_id, id, revoked, refresh_token)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_oauth_tokens_user_tokens '
+                 'ON oauth_tokens(user_id, id, revoked, refresh_token)')
+    # the v2 single-column indexes are prefixes of the ones above
+    conn.execute('DROP INDEX IF EXISTS idx_plans_user_id')
+    conn.execute('DROP INDEX IF EXISTS idx_oauth_tokens_plan_id')
+    conn.execute('DROP INDEX IF EXISTS idx_oauth_tokens_user_id')
+
+
+def _v4_plan_format(conn: sqlite3.Connection):
+    # how plan_json is stored (backend/plan_codec.py); existing rows are plain JSON
+    _add_missing_columns(conn, 'plans', ["plan_format TEXT NOT NULL DEFAULT 'json'"])
+
+
+def _v5_plan_rows(conn: sqlite3.Connection):
+    # Optional normalized copy of each plan's days and topics (see
+    # store.NORMALIZE_PLANS), clustered by plan so one plan is one range.
+    conn.execute('''CREATE TABLE IF NOT EXISTS plan_days (
+        plan_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        total_minutes INTEGER,
+        is_review INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (plan_id, day)
+    ) WITHOUT ROWID''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS plan_topics (
+        plan_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        idx INTEGER NOT NULL,
+        title TEXT,
+        estimated_minutes INTEGER,
+        done INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (plan_id, day, idx)
+    ) WITHOUT ROWID''')
+    # only the unfinished topics: next/overdue-day lookups read just these
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_plan_topics_open ON plan_topics(plan_id, day) WHERE done=0')
+    # 1 while plan_topics.done holds flags newer than plan_json
+    _add_missing_columns(conn, 'plans', ['progress_in_rows INTEGER NOT NULL DEFAULT 0'])
+
+
+def _v6_wrap_legacy_plan_text(conn: sqlite3.Connection):
+    # Before save_plan normalized its input, any text could be stored, and
+    # get_plan answered {"plan": <text>} for rows that aren't JSON. Store
+    # exactly that, so every row is the JSON get_plan sends, byte for byte.
+    from backend import fastjson, plan_codec
+    updates = []
+    for plan_id, stored, fmt in conn.execute('SELECT id, plan_json, plan_format FROM plans'):
+        try:
+            text = plan_codec.decode(stored, fmt)
+        except Exception:
+            # unknown format or a codec that isn't installed: leave the row alone
+            continue
+        if text is not None:
+            try:
+                fastjson.loads(text)
+                continue
+            except ValueError:
+                pass
+        updates.append((json.dumps({"plan": text}), plan_id))
+    conn.executemany("UPDATE plans SET plan_json=?, plan_format='json' WHERE id=?", updates)
+
+
+MIGRATIONS: Tuple[tuple, ...] = (
+    (1, "baseline tables plus user_id, version, revoked and refresh_token_backup columns", _v1_baseline),
+    (2, "indexes for per-user plans and per-plan/per-user tokens", _v2_token_and_owner_indexes),
+    (3, "covering indexes for plan listing and token lookups", _v3_covering_indexes),
+    (4, "plans.plan_format tag for compressed plan_json", _v4_plan_format),
+    (5, "normalized plan_days / plan_topics tables", _v5_plan_rows),
+    (6, "wrap legacy non-JSON plan_json as {\"plan\": text}", _v6_wrap_legacy_plan_text),
+)
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Bring the database up to LATEST_VERSION; returns the resulting version.
+
+    A database that is already current costs one PRAGMA read. Pending steps run
+    in a single transaction: either all of them apply or none do.
+    """
+    version = schema_version(conn)
+    if version >= LATEST_VERSION:
+        return version
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # re-check under the write lock: another process may have just migrated
+        current = schema_version(conn)
+        for version, _description, step in MIGRATIONS:
+            if version > current:
+                step(conn)
+                current = version
+        conn.execute(f'PRAGMA user_version = {int(current)}')
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return current
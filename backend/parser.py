@@ -1,34 +1,166 @@
 import re
-from typing import List, Dict
+from typing import List, Dict, Optional, Sequence
+from collections import OrderedDict
 import math
 import io
+import os
+import threading
+from importlib.util import find_spec
 import numpy as np
 
-# Optional OCR support
-try:
-    from PIL import Image
-    import pytesseract
-    OCR_AVAILABLE = True
-except Exception:
-    OCR_AVAILABLE = False
-    # Try to detect EasyOCR as a fallback (may handle handwriting better)
-try:
-    import easyocr
-    EASYOCR_AVAILABLE = True
-except Exception:
-    EASYOCR_AVAILABLE = False
+# Optional OCR support. Only probe whether the packages are installed here:
+# PIL/pytesseract and especially easyocr (which pulls in torch) are imported
+# on first OCR use, so importing the parser stays cheap.
+OCR_AVAILABLE = find_spec("PIL") is not None and find_spec("pytesseract") is not None
+# EasyOCR is the fallback (may handle handwriting better)
+EASYOCR_AVAILABLE = find_spec("easyocr") is not None
 
 HEADING_RE = re.compile(r"(?im)^(chapter\s+\d+[:.-]?\s*(.*)|\bchapter\b.*$)", re.MULTILINE)
 
 
-def extract_topics(text: str) -> List[Dict]:
+class Topic:
+    """A syllabus topic whose content is a view into the shared syllabus text.
+
+    Only offsets into `text` are stored; `content` is sliced on access, so extracting thousands of topics does not copy the syllabus.
+    Supports `topic["title"]` / `topic.get("length")` so code written for the
+    older dict topics keeps working.
+    """
+
+    __slots__ = ("title", "length", "estimated_minutes", "_text", "_start", "_end")
+    FIELDS = ("title", "content", "length", "estimated_minutes")
+
+    def __init__(self, title: str, length: int, text: str = "", start: int = 0, end: int = 0):
+        self.title = title
+        self.length = length
+        self.estimated_minutes = None
+        self._text = text
+        self._start = start
+        self._end = end
+
+    @property
+    def content(self) -> str:
+        return self._text[self._start:self._end]
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS or key == "content":
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self.FIELDS else None
+        return default if value is None else value
+
+    def to_dict(self, include_content: bool = False) -> Dict:
+        d = {"title": self.title, "length": self.length}
+        if include_content:
+            d["content"] = self.content
+        if self.estimated_minutes is not None:
+            d["estimated_minutes"] = self.estimated_minutes
+        return d
+
+    def __repr__(self):
+        return f"Topic({self.title!r}, length={self.length})"
+
+
+class PlanDay:
+    """One day of a plan; topic parts are stored as (title, minutes) tuples.
+
+    Converted to the JSON-ready dict shape only at the edge via `to_dict`.
+    """
+
+    __slots__ = ("day", "topics", "total_minutes", "is_review", "daily_summary")
+
+    def __init__(self, day: int, is_review: bool = False):
+        self.day = day
+        self.topics = []
+        self.total_minutes = 0
+        self.is_review = is_review
+        self.daily_summary = ""
+
+    def to_dict(self) -> Dict:
+        return {
+            "day": self.day,
+            "topics": [{"title": title, "estimated_minutes": minutes} for title, minutes in self.topics],
+            "total_minutes": self.total_minutes,
+            "is_review": self.is_review,
+            "daily_summary": self.daily_summary,
+        }
+
+
+# Precompiled patterns for the extract_topics heuristics
+CHAPTER_LINE_RE = re.compile(r"^chapter\s+\d+\b.*$", re.IGNORECASE | re.MULTILINE)
+INLINE_CHAPTER_RE = re.compile(r"\s+chapter\s+\d+:", re.IGNORECASE)
+PARAGRAPH_BREAK_RE = re.compile(r"\n\s*\n")
+NON_SPACE_RE = re.compile(r"\S")
+MANUAL_LINE_MAX = 120
+
+
+def _manual_line_spans(text: str) -> Optional[List[tuple]]:
+    """Return (start, end) spans of the non-empty lines if every line is short, else None.
+
+    Stops at the first long line, so large syllabi are not split into line copies.
+    """
+    spans = []
+    pos = 0
+    n = len(text)
+    while pos <= n:
+        nl = text.find('\n', pos)
+        end = n if nl == -1 else nl
+        if end - pos >= MANUAL_LINE_MAX:
+            stripped = text[pos:end].strip()
+            if len(stripped) >= MANUAL_LINE_MAX:
+                return None
+            if stripped:
+                spans.append((pos, end))
+        elif not text[pos:end].isspace() and end > pos:
+            spans.append((pos, end))
+        if nl == -1:
+            break
+        pos = nl + 1
+    return spans
+
+
+def _trim(text: str, start: int, end: int) -> tuple:
+    """Return the bounds of text[start:end].strip() without copying the slice."""
+    m = NON_SPACE_RE.search(text, start, end)
+    if not m:
+        return end, end
+    start = m.start()
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _section_bounds(pattern, text: str) -> List[tuple]:
+    """Scan `text` once and return (heading_start, heading_end, body_start, body_end) per match.
+
+    Bodies run from the end of one heading to the start of the next (or the end of the text),
+    exactly the pieces `re.split(pattern, text)[1:]` would produce, without copying them.
+    """
+    matches = [(m.start(), m.end()) for m in pattern.finditer(text)]
+    bounds = []
+    for i, (hs, he) in enumerate(matches):
+        body_end = matches[i + 1][0] if i + 1 < len(matches) else len(text)
+        bounds.append((hs, he, he, body_end))
+    return bounds
+
+
+def extract_topics(text: str) -> List[Topic]:
     """Try to extract chapters/sections from syllabus text.
 
     This is a simple heuristic parser:
     - Look for lines starting with 'Chapter X' (case-insensitive)
     - If none found, try splitting on patterns like "Chapter" or periods followed by "Chapter"
     - If still none, split on double newlines and use chunks
-    - Return list of {'title': str, 'length': int}
+    - Return list of `Topic` (title, length, content view)
+
+    Each heuristic is a single scan with a precompiled pattern that records heading and
+    body offsets; topics keep those offsets instead of copies of their content.
     """
     if not text:
         return []
@@ -38,85 +170,175 @@ def extract_topics(text: str) -> List[Dict]:
 
     # Quick heuristic: if user provided a short manual list (many short lines),
     # treat each non-empty line as a separate topic.
-    lines = [l.strip() for l in text.split('\n') if l.strip()]
-    if len(lines) >= 2 and all(len(l) < 120 for l in lines):
-        # If there are several short lines, assume manual topic list
+    spans = _manual_line_spans(text)
+    if spans is not None and len(spans) >= 2:
         topics = []
-        for l in lines:
-            topics.append({
-                "title": l[:120],
-                "content": "",
-                "length": len(l),
-            })
+        for start, end in spans:
+            l = text[start:end].strip()
+            topics.append(Topic(l[:120], len(l)))
         return topics
 
-    headings = []
-    for match in re.finditer(r"(?im)^chapter\s+\d+\b.*$", text, flags=re.MULTILINE):
-        h = match.group(0).strip()
-        headings.append(h)
-
     topics = []
-    if headings:
-        # Split by headings: find positions
-        parts = re.split(r"(?im)^chapter\s+\d+\b.*$", text, flags=re.MULTILINE)
-        # re.split includes leading text before first heading; pair headings with parts
-        # Build titles from headings list
-        for i, h in enumerate(headings):
-            content = parts[i+1] if i+1 < len(parts) else ""
-            topics.append({
-                "title": h,
-                "content": content.strip(),
-                "length": len(content),
-            })
+    bounds = _section_bounds(CHAPTER_LINE_RE, text)
+    if bounds:
+        # One topic per heading line; the body is everything up to the next heading
+        for hs, he, bs, be in bounds:
+            topics.append(Topic(text[hs:he].strip(), be - bs, text, *_trim(text, bs, be)))
     else:
-        # Try splitting on " Chapter " pattern (inline chapters)
-        chapter_parts = re.split(r'\s+chapter\s+\d+:', text, flags=re.IGNORECASE)
-        if len(chapter_parts) > 1:
-            # Found inline chapters, extract them
-            for i, part in enumerate(chapter_parts[1:]):
-                # Extract title (first part before period or colon)
-                lines = part.strip().split('\n')
-                title = lines[0][:80].strip()
+        # Try splitting on " Chapter N:" pattern (inline chapters)
+        bounds = _section_bounds(INLINE_CHAPTER_RE, text)
+        if bounds:
+            for i, (_, _, bs, be) in enumerate(bounds):
+                cs, ce = _trim(text, bs, be)
+                # Extract title (first line of the chapter body)
+                nl = text.find('\n', cs, ce)
+                title = text[cs:min(ce if nl == -1 else nl, cs + 80)].strip()
                 if not title:
                     title = f"Chapter {i+1}"
-                topics.append({
-                    "title": f"Chapter {i+1}: {title}",
-                    "content": part.strip(),
-                    "length": len(part),
-                })
+                topics.append(Topic(f"Chapter {i+1}: {title}", be - bs, text, cs, ce))
         else:
             # Fallback: split into paragraphs/sections by two newlines
-            chunks = [c.strip() for c in re.split(r"\n\s*\n", text) if c.strip()]
-            # Keep chunks that are reasonably sized
-            for i, c in enumerate(chunks):
-                if len(c) < 30:
+            pos = 0
+            breaks = [(m.start(), m.end()) for m in PARAGRAPH_BREAK_RE.finditer(text)]
+            breaks.append((len(text), len(text)))
+            for bstart, bend in breaks:
+                start, end = _trim(text, pos, bstart)
+                pos = bend
+                # Keep chunks that are reasonably sized
+                if end - start < 30:
                     continue
-                title = c.split('\n')[0][:80]
-                topics.append({
-                    "title": title,
-                    "content": c,
-                    "length": len(c),
-                })
+                nl = text.find('\n', start, end)
+                title = text[start:(end if nl == -1 else nl)][:80]
+                topics.append(Topic(title, end - start, text, start, end))
 
     # If still empty, create a single topic
     if not topics:
-        topics = [{"title": "Syllabus", "content": text, "length": len(text)}]
+        topics = [Topic("Syllabus", len(text), text, 0, len(text))]
 
     return topics
 
 
-def extract_text_from_image(image_bytes: bytes, use_gpu: bool = False) -> str:
+# Tesseract language codes for the ISO 639-1 codes EasyOCR uses
+TESSERACT_LANGS = {
+    'en': 'eng', 'fr': 'fra', 'de': 'deu', 'es': 'spa', 'it': 'ita', 'pt': 'por',
+    'nl': 'nld', 'ru': 'rus', 'ar': 'ara', 'hi': 'hin', 'ja': 'jpn', 'ko': 'kor',
+    'ch_sim': 'chi_sim', 'ch_tra': 'chi_tra',
+}
+
+
+def normalize_languages(languages: Optional[Sequence[str]]) -> tuple:
+    """Return a canonical, de-duplicated language tuple (defaults to English)."""
+    langs = []
+    for lang in languages or ():
+        lang = str(lang).strip().lower()
+        if lang and lang not in langs:
+            langs.append(lang)
+    return tuple(langs) or ('en',)
+
+
+class EasyOcrReaderPool:
+    """Process-wide EasyOCR readers keyed by (language set, gpu).
+
+    Building `easyocr.Reader` loads detection and recognition models from disk,
+    so readers are created once and reused. Least recently used readers are
+    dropped when the estimated model memory exceeds the budget
+    (PLANORA_EASYOCR_MEMORY_MB, default 2048).
+    """
+
+    # Used when the model size cannot be measured (no torch parameters exposed)
+    DEFAULT_READER_BYTES = 400 * 1024 * 1024
+
+    def __init__(self, memory_budget_bytes: int = None):
+        if memory_budget_bytes is None:
+            try:
+                memory_budget_bytes = int(os.environ.get('PLANORA_EASYOCR_MEMORY_MB', 2048)) * 1024 * 1024
+            except ValueError:
+                memory_budget_bytes = 2048 * 1024 * 1024
+        self.memory_budget_bytes = memory_budget_bytes
+        self._readers = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    @classmethod
+    def _reader_bytes(cls, reader) -> int:
+        total = 0
+        for attr in ('detector', 'recognizer'):
+            model = getattr(reader, attr, None)
+            try:
+                total += sum(p.numel() * p.element_size() for p in model.parameters())
+            except Exception:
+                continue
+        return total or cls.DEFAULT_READER_BYTES
+
+    def _load(self, languages: tuple, gpu: bool):
+        import easyocr
+        return easyocr.Reader(list(languages), gpu=gpu)
+
+    def get(self, languages: Optional[Sequence[str]] = None, gpu: bool = False):
+        """Return a (cached) reader for `languages`, loading it on first use."""
+        key = (normalize_languages(languages), bool(gpu))
+        with self._lock:
+            entry = self._readers.get(key)
+            if entry is not None:
+                self._readers.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            reader = self._load(*key)
+            self.loads += 1
+            self._readers[key] = (reader, self._reader_bytes(reader))
+            # evict least recently used readers, but always keep the one just loaded
+            while len(self._readers) > 1 and self.memory_bytes() > self.memory_budget_bytes:
+                self._readers.popitem(last=False)
+                self.evictions += 1
+            return reader
+
+    def warm(self, language_sets: Sequence[Sequence[str]], gpu: bool = False):
+        """Preload readers (e.g. at startup); a no-op when EasyOCR is not installed."""
+        if not EASYOCR_AVAILABLE:
+            return
+        for languages in language_sets:
+            self.get(languages, gpu=gpu)
+
+    def memory_bytes(self) -> int:
+        return sum(size for _, size in self._readers.values())
+
+    def status(self) -> dict:
+        return {
+            'readers': [{'languages': list(k[0]), 'gpu': k[1]} for k in self._readers],
+            'memory_bytes': self.memory_bytes(),
+            'memory_budget_bytes': self.memory_budget_bytes,
+            'loads': self.loads,
+            'hits': self.hits,
+            'evictions': self.evictions,
+        }
+
+
+easyocr_readers = EasyOcrReaderPool()
+
+
+def extract_text_from_image(image_bytes: bytes, use_gpu: bool = False, languages: Optional[Sequence[str]] = None) -> str:
     """Attempt to extract text from an image (bytes) using pytesseract.
 
+    `languages` are ISO codes as used by EasyOCR (e.g. ["en", "fr"]); EasyOCR
+    readers come from the shared `easyocr_readers` pool.
     Returns the extracted text or an empty string if OCR not available.
     """
     if not image_bytes:
         return ""
+    languages = normalize_languages(languages)
     # Prefer pytesseract if available
     if OCR_AVAILABLE:
         try:
+            from PIL import Image
+            import pytesseract
             img = Image.open(io.BytesIO(image_bytes))
-            text = pytesseract.image_to_string(img)
+            tess_langs = [TESSERACT_LANGS[l] for l in languages if l in TESSERACT_LANGS]
+            if tess_langs:
+                text = pytesseract.image_to_string(img, lang="+".join(tess_langs))
+            else:
+                text = pytesseract.image_to_string(img)
             return text or ""
         except Exception:
             # fall through to EasyOCR if available
@@ -125,8 +347,9 @@ def extract_text_from_image(image_bytes: bytes, use_gpu: bool = False) -> str:
     # Try EasyOCR if available (better on some handwriting)
     if EASYOCR_AVAILABLE:
         try:
-            reader = easyocr.Reader(['en'], gpu=use_gpu)
+            reader = easyocr_readers.get(languages, gpu=use_gpu)
             # easyocr expects image path or numpy array; we pass bytes via PIL
+            from PIL import Image
             img = Image.open(io.BytesIO(image_bytes))
             res = reader.readtext(np.array(img))
             # `res` is list of (bbox, text, confidence)
@@ -138,20 +361,67 @@ def extract_text_from_image(image_bytes: bytes, use_gpu: bool = False) -> str:
     return ""
 
 
-def generate_plan(topics: List[Dict], plan_length: int = 14, hours_per_day: float = 2.0, exam_type: str = "final", review_day_fraction: float = None) -> List[Dict]:
-    """Generate a simple day-by-day plan.
+class _DayAllocator:
+    """Place topic minutes onto days in a (possibly rotated) day order.
 
-    Heuristic:
-    - Compute total length of all topics
-    - Allocate total available minutes = plan_length * hours_per_day * 60
-    - For each topic, estimate minutes proportionally to its length
-    - Assign topics to days trying to fill each day's minutes
-    - Insert a review day every 7th day where no new topics assigned (marked as review)
+    Days that still have capacity are tracked with a "next open day" forest
+    (union-find with path compression), so a full day is skipped in near
+    constant time instead of being rescanned by every later topic. Placement
+    is identical to walking the rotated order and filling every open day.
     """
-    capacity = int(hours_per_day * 60)
-    total_capacity = plan_length * capacity
-    total_length = sum(t.get("length", 1) for t in topics) or 1
 
+    __slots__ = ("days", "order", "capacity", "_next")
+
+    def __init__(self, days: List[PlanDay], order: List[int], capacity: int):
+        self.days = days
+        self.order = order
+        self.capacity = capacity
+        # _next[i] points at i while order[i] is open; index len(order) is the sentinel
+        self._next = list(range(len(order) + 1))
+        for i, di in enumerate(order):
+            if capacity - days[di].total_minutes <= 0:
+                self._next[i] = i + 1
+
+    def _find(self, i: int) -> int:
+        nxt = self._next
+        root = i
+        while nxt[root] != root:
+            root = nxt[root]
+        while nxt[i] != root:
+            nxt[i], i = root, nxt[i]
+        return root
+
+    def allocate(self, title: str, minutes: int, start: int = 0):
+        """Allocate `minutes` of `title` starting at position `start` of the order, wrapping once."""
+        n = len(self.order)
+        remaining = minutes
+        part_idx = 1
+        if n == 0 or remaining <= 0:
+            return
+        # Visit open positions in [start, n) and then [0, start)
+        for lo, hi in ((start, n), (0, start)):
+            pos = self._find(lo)
+            while pos < hi:
+                day = self.days[self.order[pos]]
+                # allow placing on any day (including review) but respect capacity
+                avail = self.capacity - day.total_minutes
+                take = min(remaining, avail)
+                part_title = title
+                if minutes > take:
+                    part_title = f"{title} (Part {part_idx})"
+                day.topics.append((part_title, take))
+                day.total_minutes += take
+                remaining -= take
+                part_idx += 1
+                if take == avail:
+                    self._next[pos] = pos + 1
+                if remaining <= 0:
+                    return
+                pos = self._find(pos + 1)
+
+
+def review_day_count(plan_length: int, exam_type: str = "final", review_day_fraction: float = None) -> tuple:
+    """Return (review_share, review_days_count) for a plan of `plan_length` days."""
     # Reserve a modest chunk of total capacity for review days and ensure
     # review days are fewer than study days. We pick a small fraction of days
     # to be review days and cap reserved minutes to the available review-day minutes.
@@ -182,6 +452,28 @@ def generate_plan(topics: List[Dict], plan_length: int = 14, hours_per_day: floa
         if review_days_count >= plan_length:
             review_days_count = max(0, plan_length - 1)
 
+    return review_share, review_days_count
+
+
+def size_plan(lengths, plan_length: int = 14, hours_per_day: float = 2.0, exam_type: str = "final", review_day_fraction: float = None, total_length: float = None) -> Dict:
+    """Size a plan from an array of topic lengths without building any days.
+
+    - Reserve a share of the total minutes for review days
+    - Estimate minutes per topic proportionally to its length (at least 5)
+    - If rounding overshoots the study capacity, rescale (at least 3)
+
+    All per-topic work is done as NumPy array operations. Returns a dict with
+    `capacity`, `review_days_count`, `reserved_for_review`, `topic_capacity`
+    and `minutes` (an int64 array aligned with `lengths`).
+    """
+    lengths = np.asarray(lengths, dtype=np.float64)
+    capacity = int(hours_per_day * 60)
+    total_capacity = plan_length * capacity
+    if total_length is None:
+        total_length = float(lengths.sum()) or 1
+
+    review_share, review_days_count = review_day_count(plan_length, exam_type, review_day_fraction)
+
     # Reserve minutes for review but don't exceed the physical minutes available
     reserved_for_review = int(total_capacity * review_share)
     max_review_capacity = review_days_count * capacity
@@ -191,26 +483,85 @@ def generate_plan(topics: List[Dict], plan_length: int = 14, hours_per_day: floa
     # Available minutes for topic study
     topic_capacity = max(0, total_capacity - reserved_for_review)
 
-    # Estimate minutes per topic (proportional) but reduce aggressiveness to be faster
-    total_minutes = 0
-    for t in topics:
-        proportion = t.get("length", 0) / total_length
-        # base estimate scaled to topic_capacity
-        t["estimated_minutes"] = max(5, int(round(proportion * topic_capacity)))
-        total_minutes += t["estimated_minutes"]
+    # Estimate minutes per topic (proportional); np.rint rounds half to even like round()
+    minutes = np.maximum(5, np.rint(lengths / total_length * topic_capacity)).astype(np.int64)
+    total_minutes = int(minutes.sum())
 
     # If estimated total exceeds topic_capacity (due to rounding), scale down proportionally
     if total_minutes > topic_capacity and total_minutes > 0:
         scale = topic_capacity / total_minutes
-        total_minutes = 0
-        for t in topics:
-            t["estimated_minutes"] = max(3, int(round(t["estimated_minutes"] * scale)))
-            total_minutes += t["estimated_minutes"]
+        minutes = np.maximum(3, np.rint(minutes * scale)).astype(np.int64)
+
+    return {
+        "capacity": capacity,
+        "review_days_count": review_days_count,
+        "reserved_for_review": reserved_for_review,
+        "topic_capacity": topic_capacity,
+        "minutes": minutes,
+    }
+
+
+def sweep_plans(lengths, plan_lengths: List[int], hours_options: List[float], exam_type: str = "final", review_day_fraction: float = None) -> List[Dict]:
+    """Size every (hours_per_day, plan_length) combination for one set of topic lengths.
 
+    Returns one summary dict per grid point, hours-major, without allocating days.
+    """
+    lengths = np.asarray(lengths, dtype=np.float64)
+    total_length = float(lengths.sum()) or 1
+    grid = []
+    for hours in hours_options:
+        for plan_length in plan_lengths:
+            sizing = size_plan(lengths, plan_length=plan_length, hours_per_day=hours, exam_type=exam_type,
+                               review_day_fraction=review_day_fraction, total_length=total_length)
+            minutes = sizing["minutes"]
+            study_minutes = int(minutes.sum())
+            study_days = plan_length - sizing["review_days_count"]
+            grid.append({
+                "hours_per_day": hours,
+                "plan_length": plan_length,
+                "review_days": sizing["review_days_count"],
+                "study_days": study_days,
+                "topic_capacity": sizing["topic_capacity"],
+                "study_minutes": study_minutes,
+                "min_topic_minutes": int(minutes.min()) if minutes.size else 0,
+                "max_topic_minutes": int(minutes.max()) if minutes.size else 0,
+                "fits": study_minutes <= sizing["topic_capacity"],
+                "utilization": round(study_minutes / sizing["topic_capacity"], 3) if sizing["topic_capacity"] else None,
+            })
+    return grid
+
+
+def generate_plan(topics: List[Topic], plan_length: int = 14, hours_per_day: float = 2.0, exam_type: str = "final", review_day_fraction: float = None) -> List[Dict]:
+    """Generate a day-by-day plan as JSON-ready dicts (see `build_plan`)."""
+    days = build_plan(topics, plan_length=plan_length, hours_per_day=hours_per_day, exam_type=exam_type,
+                      review_day_fraction=review_day_fraction)
+    return [d.to_dict() for d in days]
+
+
+def build_plan(topics: List[Topic], plan_length: int = 14, hours_per_day: float = 2.0, exam_type: str = "final", review_day_fraction: float = None) -> List[PlanDay]:
+    """Generate a simple day-by-day plan.
+
+    Heuristic:
+    - Compute total length of all topics
+    - Allocate total available minutes = plan_length * hours_per_day * 60
+    - For each topic, estimate minutes proportionally to its length
+    - Assign topics to days trying to fill each day's minutes
+    - Insert a review day every 7th day where no new topics assigned (marked as review)
+    """
+    # Size all topics in one vectorized pass (review reservation, proportional minutes, floors)
+    lengths = np.fromiter((t.get("length", 0) for t in topics), dtype=np.float64, count=len(topics))
+    total_length = sum(t.get("length", 1) for t in topics) or 1
+    sizing = size_plan(lengths, plan_length=plan_length, hours_per_day=hours_per_day, exam_type=exam_type,
+                       review_day_fraction=review_day_fraction, total_length=total_length)
+    for t, minutes in zip(topics, sizing["minutes"].tolist()):
+        t["estimated_minutes"] = minutes
+    return _layout_days(topics, plan_length, sizing["capacity"], sizing["review_days_count"], exam_type)
+
+
+def _layout_days(topics: List[Topic], plan_length: int, capacity: int, review_days_count: int, exam_type: str, first_day: int = 1) -> List[PlanDay]:
+    """Place sized topics (`estimated_minutes` set) onto `plan_length` new days numbered from `first_day`."""
     # Create day containers
-    days = []
-    for d in range(plan_length):
-        days.append({"day": d + 1, "topics": [], "total_minutes": 0, "is_review": False})
+    days = [PlanDay(first_day + d) for d in range(plan_length)]
 
     # Choose which days are review days and space them across the plan
     if review_days_count > 0:
@@ -223,64 +574,112 @@ def generate_plan(topics: List[Dict], plan_length: int = 14, hours_per_day: floa
                 positions.append(pos)
         # mark chosen positions as review days
         for d in positions:
-            days[d]["is_review"] = True
-
-    # Helper to allocate minutes of a topic across days following a day order
-    def allocate_minutes(title: str, minutes: int, day_order: List[int]):
-        remaining = minutes
-        part_idx = 1
-        while remaining > 0:
-            allocated_in_pass = False
-            for di in day_order:
-                day = days[di]
-                # allow placing on any day (including review) but respect capacity
-                avail = capacity - day["total_minutes"]
-                if avail <= 0:
-                    continue
-                take = min(remaining, avail)
-                part_title = title
-                if minutes > take:
-                    part_title = f"{title} (Part {part_idx})"
-                day["topics"].append({"title": part_title, "estimated_minutes": take})
-                day["total_minutes"] += take
-                remaining -= take
-                part_idx += 1
-                allocated_in_pass = True
-                if remaining <= 0:
-                    break
-            if not allocated_in_pass:
-                # No available space anywhere (shouldn't happen after scaling) — break to avoid infinite loop
-                break
+            days[d].is_review = True
 
     # Determine day order based on exam type
     if exam_type == "regular_test":
         # front-load: earliest to latest
-        day_order = [i for i in range(plan_length) if not days[i]["is_review"]]
+        day_order = [i for i in range(plan_length) if not days[i].is_review]
+        allocator = _DayAllocator(days, day_order, capacity)
         # Sort topics by size descending to pack big topics first
         topics_sorted = sorted(topics, key=lambda x: x.get("length", 0), reverse=True)
         for t in topics_sorted:
-            allocate_minutes(t.get("title"), t.get("estimated_minutes"), day_order)
+            allocator.allocate(t.get("title"), t.get("estimated_minutes"), 0)
     else:
         # final: spread topics round-robin across non-review days
-        non_review_days = [i for i in range(plan_length) if not days[i]["is_review"]]
+        non_review_days = [i for i in range(plan_length) if not days[i].is_review]
         if not non_review_days:
             non_review_days = list(range(plan_length))
+        allocator = _DayAllocator(days, non_review_days, capacity)
         next_idx = 0
         for t in topics:
-            # create a day order starting at next_idx to spread allocations
-            order = non_review_days[next_idx:] + non_review_days[:next_idx]
-            allocate_minutes(t.get("title"), t.get("estimated_minutes"), order)
+            # start at next_idx (wrapping around) to spread allocations
+            allocator.allocate(t.get("title"), t.get("estimated_minutes"), next_idx)
             # advance next_idx for next topic to encourage spreading
             next_idx = (next_idx + 1) % len(non_review_days)
 
     # Build daily summary
     for d in days:
-        if d["is_review"]:
-            d["daily_summary"] = "Review day: revisit previous topics and do practice questions."
-        elif d["topics"]:
-            titles = [t["title"] for t in d["topics"]]
-            d["daily_summary"] = f"Today's goal: {', '.join(titles[:2])} + practice problems ({len(d['topics'])} topics)."
+        if d.is_review:
+            d.daily_summary = "Review day: revisit previous topics and do practice questions."
+        elif d.topics:
+            titles = [title for title, _ in d.topics[:2]]
+            d.daily_summary = f"Today's goal: {', '.join(titles)} + practice problems ({len(d.topics)} topics)."
         else:
-            d["daily_summary"] = "Light day: review notes or rest."
+            d.daily_summary = "Light day: review notes or rest."
 
     return days
+
+
+PART_SUFFIX_RE = re.compile(r" \(Part \d+\)$")
+
+
+def reschedule_plan(days: List[Dict], plan_length: int, hours_per_day: float = 2.0, exam_type: str = "final", review_day_fraction: float = None, done: Optional[Dict[tuple, bool]] = None, topics_meta: Optional[List[Dict]] = None, first_day: int = 1) -> List[Dict]:
+    """Re-plan only the unfinished work of an existing plan onto `plan_length` new days.
+
+    - The leading run of completed days (every topic done, or review/light days
+      between them) is kept untouched; later days whose topics are all done are
+      kept too, renumbered to follow it, so finished work is never dropped;
+      so are the done topics of partly done days, marked done
+    - Remaining minutes of the other days' unfinished parts are summed per topic
+      (" (Part N)" suffixes removed); topics are not re-estimated
+    - Those minutes are laid out on the new days like `build_plan` does, scaled
+      down (at least 3 minutes) only if they no longer fit. The new days are
+      numbered from `first_day` (the plan's current day, so none lands in the
+      past) or right after the kept days, whichever is later
+
+    `done` maps (day number, 0-based topic index) to a flag and overrides the
+    `done` stored on each topic. `topics_meta` is the original topic list
+    (title/length) used for ordering and for the regular_test size ordering.
+    """
+    done = done or {}
+
+    def is_done(day: Dict, i: int, t: Dict) -> bool:
+        return bool(done.get((day.get("day"), i), t.get("done", False)))
+
+    # Keep the prefix of days whose work is finished
+    kept = 0
+    for day in days:
+        topics = day.get("topics", [])
+        if not all(is_done(day, i, t) for i, t in enumerate(topics)):
+            break
+        kept += 1
+    # Trailing review/light days of the prefix are future days: re-plan them too
+    while kept and not days[kept - 1].get("topics"):
+        kept -= 1
+
+    finished = [dict(d) for d in days[:kept]]
+    remaining = {}
+    for day in days[kept:]:
+        topics = day.get("topics", [])
+        if topics and all(is_done(day, i, t) for i, t in enumerate(topics)):
+            finished.append(dict(day, day=len(finished) + 1))
+            continue
+        completed = [dict(t, done=True) for i, t in enumerate(topics) if is_done(day, i, t)]
+        if completed:
+            finished.append(dict(day, day=len(finished) + 1, topics=completed,
+                                 total_minutes=sum(int(t.get("estimated_minutes") or 0) for t in completed)))
+        for i, t in enumerate(topics):
+            if is_done(day, i, t):
+                continue
+            base = PART_SUFFIX_RE.sub("", t.get("title") or "")
+            remaining[base] = remaining.get(base, 0) + int(t.get("estimated_minutes") or 0)
+
+    lengths = {m.get("title"): m.get("length", 0) for m in (topics_meta or [])}
+    order = {title: i for i, title in enumerate(lengths)}
+    topics = [Topic(title, lengths.get(title, minutes)) for title, minutes in
+              sorted(remaining.items(), key=lambda kv: order.get(kv[0], len(order)))]
+    for t in topics:
+        t.estimated_minutes = remaining[t.title]
+
+    capacity = int(hours_per_day * 60)
+    review_share, review_days_count = review_day_count(plan_length, exam_type, review_day_fraction)
+    study_capacity = (plan_length - review_days_count) * capacity
+    total_minutes = sum(t.estimated_minutes for t in topics)
+    if total_minutes > study_capacity and total_minutes > 0:
+        scale = study_capacity / total_minutes
+        for t in topics:
+            t.estimated_minutes = max(3, int(round(t.estimated_minutes * scale)))
+
+    new_days = _layout_days(topics, plan_length, capacity, review_days_count, exam_type, first_day=max(len(finished) + 1, first_day))
+    return finished + [d.to_dict() for d in new_days]
@@ -0,0 +1,83 @@
+"""Rendered plan PDFs keyed by a hash of the plan's JSON.
+
+Users export the same plan again and again (after every reload, from the
+saved-plan list, from Streamlit's download button), and a 365-day plan
+takes around 100 ms to draw. Rendering is deterministic, so the PDF is
+cached under the SHA-256 of the exact JSON it was drawn from: an unchanged
+plan is served from memory, and any edit changes the key, so nothing ever
+needs invalidating. Entries are evicted least recently used first once the
+byte budget is reached.
+
+Configuration (environment variables):
+- PLANORA_PDF_CACHE_BYTES: memory budget (default 64 MB, 0 disables the cache)
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# rough per-entry bookkeeping on top of the PDF bytes
+ENTRY_OVERHEAD = 160
+# bump when the PDF layout changes so old renderings are not served
+RENDER_VERSION = 1
+
+
+def pdf_cache_key(plan_json: bytes) -> str:
+    return hashlib.sha256(b'%d:' % RENDER_VERSION + plan_json).hexdigest()
+
+
+class PdfCache:
+    """Byte-bounded LRU of plan content hash -> PDF bytes."""
+
+    def __init__(self, max_bytes: int = None):
+        if max_bytes is None:
+            try:
+                max_bytes = int(os.environ.get('PLANORA_PDF_CACHE_BYTES', 64 * 1024 * 1024))
+            except ValueError:
+                max_bytes = 64 * 1024 * 1024
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._used = 0
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            pdf = self._entries.get(key)
+            if pdf is None:
+                self.counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters['hits'] += 1
+            return pdf
+
+    def put(self, key: str, pdf: bytes):
+        size = len(pdf) + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._used -= len(old) + ENTRY_OVERHEAD
+            self._entries[key] = pdf
+            self._used += size
+            self.counters['stores'] += 1
+            while self._used > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._used -= len(evicted) + ENTRY_OVERHEAD
+                self.counters['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._used = 0
+
+    def stats(self) -> dict:
+        lookups = self.counters['hits'] + self.counters['misses']
+        return dict(self.counters,
+                    entries=len(self._entries),
+                    bytes=self._used,
+                    max_bytes=self.max_bytes,
+                    hit_rate=round(self.counters['hits'] / lookups, 3) if lookups else None)
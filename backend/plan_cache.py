@@ -0,0 +1,115 @@
+"""Memoized plan generation.
+
+For the same topics (titles and lengths, in order) and the same
+`plan_length`, `hours_per_day`, `exam_type` and `review_day_fraction`,
+`generate_plan` always returns the same days, so results are cached under a
+stable fingerprint of those inputs. The cache keeps the compact `PlanDay`
+objects and hands every caller freshly built dicts, so callers can mutate
+what they get back. Entries expire after a TTL and the least recently used
+ones are dropped once the cache is full.
+
+Configuration (environment variables):
+- PLANORA_PLAN_CACHE_SIZE: max cached plans (default 256, 0 disables caching)
+- PLANORA_PLAN_CACHE_TTL_S: seconds an entry stays valid (default 600)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from backend.parser import build_plan
+
+
+def plan_fingerprint(topics, plan_length: int, hours_per_day: float, exam_type: str, review_day_fraction: Optional[float]) -> str:
+    """Stable SHA-256 fingerprint of everything `generate_plan` output depends on."""
+    payload = {
+        "topics": [[t.get("title"), t.get("length", 0)] for t in topics],
+        "plan_length": int(plan_length),
+        "hours_per_day": float(hours_per_day),
+        "exam_type": exam_type,
+        "review_day_fraction": None if review_day_fraction is None else float(review_day_fraction),
+    }
+    return hashlib.sha256(json.dumps(payload, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+class PlanCache:
+    """Bounded LRU + TTL memo in front of `build_plan`."""
+
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None, clock=time.monotonic):
+        if max_entries is None:
+            try:
+                max_entries = int(os.environ.get('PLANORA_PLAN_CACHE_SIZE', 256))
+            except ValueError:
+                max_entries = 256
+        if ttl_seconds is None:
+            try:
+                ttl_seconds = float(os.environ.get('PLANORA_PLAN_CACHE_TTL_S', 600))
+            except ValueError:
+                ttl_seconds = 600.0
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+
+    def _lookup(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            expires_at, days, minutes = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                self.counters['expired'] += 1
+                self.counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters['hits'] += 1
+            return days, minutes
+
+    def _store(self, key: str, days, minutes):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, days, minutes)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def generate(self, topics, plan_length: int = 14, hours_per_day: float = 2.0, exam_type: str = "final", review_day_fraction: float = None) -> List[Dict]:
+        """Drop-in replacement for `generate_plan` that reuses identical earlier results.
+
+        Like `generate_plan`, sets `estimated_minutes` on each input topic.
+        """
+        key = plan_fingerprint(topics, plan_length, hours_per_day, exam_type, review_day_fraction)
+        cached = self._lookup(key)
+        if cached is None:
+            days = build_plan(topics, plan_length=plan_length, hours_per_day=hours_per_day, exam_type=exam_type,
+                              review_day_fraction=review_day_fraction)
+            minutes = tuple(t.get("estimated_minutes") for t in topics)
+            self._store(key, days, minutes)
+        else:
+            days, minutes = cached
+            for t, m in zip(topics, minutes):
+                t["estimated_minutes"] = m
+        # to_dict builds new dicts every time, so callers never share cached state
+        return [d.to_dict() for d in days]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.counters['hits'] + self.counters['misses']
+        return dict(self.counters,
+                    entries=len(self._entries),
+                    max_entries=self.max_entries,
+                    ttl_seconds=self.ttl_seconds,
+                    hit_rate=round(self.counters['hits'] / lookups, 3) if lookups else None)
@@ -0,0 +1,88 @@
+"""Compressed storage for `plans.plan_json`.
+
+Every plans row has a `plan_format` tag that says how its plan_json is stored:
+
+- `json`: plain JSON text. All rows written before compression existed use it.
+- `zlib`: UTF-8 JSON compressed with zlib, stored as a BLOB.
+- `zstd`: UTF-8 JSON compressed with zstandard, stored as a BLOB. This needs
+  the optional `zstandard` package, which is imported on first use.
+
+`encode` chooses how new writes are stored. `decode` reads a row in any of
+the formats, so changing the setting (or running scripts/recompress_plans.py)
+never strands old rows. Small plans are kept as JSON, because compression
+barely shrinks them.
+
+Configuration (environment variables):
+- PLANORA_PLAN_COMPRESSION: `none`, `auto`, `zstd` or `zlib` (default `none`:
+  plain JSON). Compression trades CPU on every read and write for a smaller
+  file, so it is worth turning on for large databases. `auto` uses zstd when
+  it is installed and zlib otherwise, and an explicit `zstd` also falls back
+  to zlib when zstandard is missing.
+- PLANORA_PLAN_COMPRESS_MIN_BYTES: plans smaller than this are stored as
+  plain JSON (default 512).
+"""
+
+import os
+import zlib
+from importlib.util import find_spec
+from typing import Optional, Tuple, Union
+
+ZSTD_AVAILABLE = find_spec('zstandard') is not None
+FORMATS = ('json', 'zlib', 'zstd')
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def _write_format(setting: str) -> str:
+    setting = (setting or 'none').strip().lower()
+    if setting in ('none', 'json', 'off', '0'):
+        return 'json'
+    if setting in ('auto', 'zstd'):
+        return 'zstd' if ZSTD_AVAILABLE else 'zlib'
+    return 'zlib'
+
+
+WRITE_FORMAT = _write_format(os.environ.get('PLANORA_PLAN_COMPRESSION', 'none'))
+try:
+    MIN_BYTES = int(os.environ.get('PLANORA_PLAN_COMPRESS_MIN_BYTES', 512))
+except ValueError:
+    MIN_BYTES = 512
+
+
+def encode(plan_json: str, fmt: Optional[str] = None) -> Tuple[Union[str, bytes], str]:
+    """Return (stored value, plan_format) for `plan_json`, in WRITE_FORMAT unless `fmt` is given."""
+    fmt = WRITE_FORMAT if fmt is None else fmt
+    raw = plan_json.encode('utf-8')
+    if fmt == 'json' or len(raw) < MIN_BYTES:
+        return plan_json, 'json'
+    if fmt == 'zstd':
+        import zstandard
+        packed = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    else:
+        fmt = 'zlib'
+        packed = zlib.compress(raw, ZLIB_LEVEL)
+    if len(packed) >= len(raw):
+        return plan_json, 'json'
+    return packed, fmt
+
+
+def decode_bytes(stored: Union[str, bytes, None], fmt: Optional[str]) -> Optional[bytes]:
+    """UTF-8 plan_json of a row stored as (`stored`, `fmt`); raises ValueError on an unknown format."""
+    if stored is None:
+        return None
+    if fmt is None or fmt == 'json':
+        return stored.encode('utf-8') if isinstance(stored, str) else bytes(stored)
+    if fmt == 'zlib':
+        return zlib.decompress(stored)
+    if fmt == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(stored)
+    raise ValueError(f"unknown plan_format {fmt!r}")
+
+
+def decode(stored: Union[str, bytes, None], fmt: Optional[str]) -> Optional[str]:
+    """plan_json text of a row stored as (`stored`, `fmt`); raises ValueError on an unknown format."""
+    if isinstance(stored, str) and (fmt is None or fmt == 'json'):
+        return stored
+    raw = decode_bytes(stored, fmt)
+    return None if raw is None else raw.decode('utf-8')
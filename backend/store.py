@@ -0,0 +1,271 @@
+"""Queries against `plans.db`.
+
+Every function takes an open connection as its first argument and runs
+synchronously, so endpoints can hand them to `ConnectionPool.read` /
+`ConnectionPool.write` and keep SQLite work off the event loop. None of them
+commit; the pool wraps each call in a transaction.
+
+Configuration (environment variables):
+- PLANORA_PLAN_ROWS: also keep every saved plan's days and topics as rows in
+  plan_days / plan_topics, so progress queries and done-flag updates run as
+  indexed SQL (default off; plans written while it is off have no rows and
+  are read from plan_json instead)
+"""
+
+import json
+import os
+import sqlite3
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from backend import plan_codec
+
+NORMALIZE_PLANS = os.environ.get('PLANORA_PLAN_ROWS', '').lower() in ('1', 'true', 'yes')
+
+
+# --- plans ---
+# plan_json is stored as tagged by plan_format (see backend/plan_codec.py); these
+# functions take and return plain JSON text either way.
+def insert_plan(conn: sqlite3.Connection, created_at: str, course_type: Optional[str], exam_date: Optional[str],
+                plan_json: str, user_id: Optional[int] = None) -> int:
+    stored, fmt = plan_codec.encode(plan_json)
+    if user_id:
+        cur = conn.execute('INSERT INTO plans (created_at, course_type, exam_date, plan_json, plan_format, user_id) VALUES (?,?,?,?,?,?)',
+                           (created_at, course_type, exam_date, stored, fmt, user_id))
+    else:
+        cur = conn.execute('INSERT INTO plans (created_at, course_type, exam_date, plan_json, plan_format) VALUES (?,?,?,?,?)',
+                           (created_at, course_type, exam_date, stored, fmt))
+    if NORMALIZE_PLANS:
+        _write_plan_rows(conn, cur.lastrowid, plan_json)
+    return cur.lastrowid
+
+
+def _plan_rows(plan_json: str):
+    """(day rows, topic rows) of a plan, or None if its days can't be keyed by day number."""
+    try:
+        days = json.loads(plan_json)["plan"]
+        numbers = [int(d["day"]) for d in days]
+    except Exception:
+        return None
+    if len(set(numbers)) != len(numbers):
+        return None
+    day_rows, topic_rows = [], []
+    for n, d in zip(numbers, days):
+        day_rows.append((n, d.get("total_minutes"), int(bool(d.get("is_review")))))
+        topic_rows += [(n, i, t.get("title"), t.get("estimated_minutes"), int(bool(t.get("done"))))
+                       for i, t in enumerate(d.get("topics") or []) if isinstance(t, dict)]
+    return day_rows, topic_rows
+
+
+def _write_plan_rows(conn: sqlite3.Connection, plan_id: int, plan_json: str):
+    rows = _plan_rows(plan_json)
+    if rows is None:
+        return
+    conn.executemany('INSERT INTO plan_days (plan_id, day, total_minutes, is_review) VALUES (?,?,?,?)',
+                     [(plan_id, *r) for r in rows[0]])
+    conn.executemany('INSERT INTO plan_topics (plan_id, day, idx, title, estimated_minutes, done) VALUES (?,?,?,?,?,?)',
+                     [(plan_id, *r) for r in rows[1]])
+
+
+def _replace_plan_rows(conn: sqlite3.Connection, plan_id: int, plan_json: str):
+    """Bring plan_days / plan_topics in line with a newly written plan_json."""
+    conn.execute('DELETE FROM plan_topics WHERE plan_id=?', (plan_id,))
+    conn.execute('DELETE FROM plan_days WHERE plan_id=?', (plan_id,))
+    if NORMALIZE_PLANS:
+        _write_plan_rows(conn, plan_id, plan_json)
+
+
+# columns /list_plans can return; `id` is always included (it is the cursor)
+PLAN_LIST_FIELDS = ('id', 'created_at', 'course_type', 'exam_date', 'user_id')
+
+
+def list_plans(conn: sqlite3.Connection, limit: int = 50, user_id: Optional[int] = None,
+               before_id: Optional[int] = None, fields: Sequence[str] = PLAN_LIST_FIELDS) -> List[Dict]:
+    """Newest-first plan summaries, optionally only those with id < before_id (keyset paging).
+
+    `fields` must be a subset of PLAN_LIST_FIELDS; each page is a range walk of
+    the primary key or of idx_plans_user_listing, however deep the cursor is.
+    """
+    columns = ['id'] + [f for f in PLAN_LIST_FIELDS if f in fields and f != 'id']
+    where, args = [], []
+    if user_id:
+        where.append('user_id=?')
+        args.append(user_id)
+    if before_id is not None:
+        where.append('id<?')
+        args.append(before_id)
+    sql = f"SELECT {', '.join(columns)} FROM plans"
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    rows = conn.execute(sql + ' ORDER BY id DESC LIMIT ?', (*args, limit)).fetchall()
+    return [dict(zip(columns, r)) for r in rows]
+
+
+def get_plan_row(conn: sqlite3.Connection, plan_id: int) -> Optional[Tuple[str, int]]:
+    """Return (plan_json, version) or None."""
+    row = conn.execute('SELECT plan_json, version, plan_format, progress_in_rows FROM plans WHERE id=?', (plan_id,)).fetchone()
+    if not row:
+        return None
+    plan_json = plan_codec.decode(row[0], row[2])
+    if row[3]:
+        plan_json = _with_row_done_flags(conn, plan_id, plan_json)
+    return plan_json, row[1]
+
+
+def get_plan_bytes(conn: sqlite3.Connection, plan_id: int) -> Optional[Tuple[bytes, int]]:
+    """Return (UTF-8 plan_json, version) or None, for sending the stored plan as is.
+
+    CAST hands over the stored bytes without building a Python str first.
+    """
+    row = conn.execute('SELECT CAST(plan_json AS BLOB), version, plan_format, progress_in_rows FROM plans WHERE id=?',
+                       (plan_id,)).fetchone()
+    if not row:
+        return None
+    if row[3]:
+        return _with_row_done_flags(conn, plan_id, plan_codec.decode(row[0], row[2])).encode('utf-8'), row[1]
+    return plan_codec.decode_bytes(row[0], row[2]), row[1]
+
+
+def _with_row_done_flags(conn: sqlite3.Connection, plan_id: int, plan_json: str) -> str:
+    """plan_json with the done flags set by update_topics_done since it was written."""
+    done = {(d, i): bool(f) for d, i, f in conn.execute('SELECT day, idx, done FROM plan_topics WHERE plan_id=?', (plan_id,))}
+    plan_obj = json.loads(plan_json)
+    for d in plan_obj["plan"]:
+        for i, t in enumerate(d.get("topics") or []):
+            if (d.get("day"), i) in done:
+                t["done"] = done[(d.get("day"), i)]
+    return json.dumps(plan_obj)
+
+
+def update_plan_json(conn: sqlite3.Connection, plan_id: int, plan_json: str) -> Optional[int]:
+    """Replace a plan's JSON and bump its version; returns the new version (None if missing)."""
+    stored, fmt = plan_codec.encode(plan_json)
+    cur = conn.execute('UPDATE plans SET plan_json=?, plan_format=?, progress_in_rows=0, version=version+1 WHERE id=?',
+                       (stored, fmt, plan_id))
+    if cur.rowcount != 1:
+        return None
+    _replace_plan_rows(conn, plan_id, plan_json)
+    return conn.execute('SELECT version FROM plans WHERE id=?', (plan_id,)).fetchone()[0]
+
+
+def update_plan_json_if_version(conn: sqlite3.Connection, plan_id: int, plan_json: str, version: int) -> bool:
+    """Compare-and-set: replace the JSON only if the plan is still at `version`."""
+    stored, fmt = plan_codec.encode(plan_json)
+    cur = conn.execute('UPDATE plans SET plan_json=?, plan_format=?, progress_in_rows=0, version=version+1 WHERE id=? AND version=?',
+                       (stored, fmt, plan_id, version))
+    if cur.rowcount != 1:
+        return False
+    _replace_plan_rows(conn, plan_id, plan_json)
+    return True
+
+
+# --- normalized progress (plan_days / plan_topics) ---
+def plan_progress(conn: sqlite3.Connection, plan_id: int) -> Optional[Dict]:
+    """Progress totals of a plan, or None if it doesn't exist.
+
+    Keys: version, created_at, days, topics, topics_done, minutes,
+    minutes_done, open_days (ascending days that still have unfinished topics)
+    and source. A plan with rows is answered from plan_days / plan_topics
+    alone ("rows"); otherwise its plan_json is parsed ("plan_json").
+    """
+    plan = conn.execute('SELECT version, created_at FROM plans WHERE id=?', (plan_id,)).fetchone()
+    if not plan:
+        return None
+    progress = {"version": plan[0], "created_at": plan[1]}
+    days = conn.execute('SELECT COUNT(*) FROM plan_days WHERE plan_id=?', (plan_id,)).fetchone()[0]
+    if days:
+        topics, topics_done, minutes, minutes_done = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(done), 0), COALESCE(SUM(estimated_minutes), 0), '
+            'COALESCE(SUM(CASE WHEN done THEN estimated_minutes ELSE 0 END), 0) FROM plan_topics WHERE plan_id=?',
+            (plan_id,)).fetchone()
+        open_days = [r[0] for r in conn.execute('SELECT DISTINCT day FROM plan_topics WHERE plan_id=? AND done=0 ORDER BY day',
+                                                (plan_id,))]
+        return dict(progress, days=days, topics=topics, topics_done=topics_done, minutes=minutes,
+                    minutes_done=minutes_done, open_days=open_days, source="rows")
+    rows = _plan_rows(get_plan_row(conn, plan_id)[0]) or ([], [])
+    topic_rows = rows[1]
+    return dict(progress, days=len(rows[0]), topics=len(topic_rows), topics_done=sum(t[4] for t in topic_rows),
+                minutes=sum(t[3] or 0 for t in topic_rows), minutes_done=sum(t[3] or 0 for t in topic_rows if t[4]),
+                open_days=sorted({t[0] for t in topic_rows if not t[4]}), source="plan_json")
+
+
+def plan_version(conn: sqlite3.Connection, plan_id: int) -> Optional[int]:
+    row = conn.execute('SELECT version FROM plans WHERE id=?', (plan_id,)).fetchone()
+    return row[0] if row else None
+
+
+def plan_header(conn: sqlite3.Connection, plan_id: int) -> Optional[Tuple[int, str]]:
+    """(version, created_at) of a plan, or None; enough to check a client's cached copy."""
+    row = conn.execute('SELECT version, created_at FROM plans WHERE id=?', (plan_id,)).fetchone()
+    return (row[0], row[1]) if row else None
+
+
+def has_plan_rows(conn: sqlite3.Connection, plan_id: int) -> bool:
+    return conn.execute('SELECT 1 FROM plan_days WHERE plan_id=? LIMIT 1', (plan_id,)).fetchone() is not None
+
+
+def update_topics_done(conn: sqlite3.Connection, plan_id: int, version: int, flags: Dict[Tuple[int, int], bool]) -> bool:
+    """Compare-and-set done flags in plan_topics (keys are (day, 0-based topic index)).
+
+    Bumps the plan's version and leaves plan_json as it is; get_plan_row
+    overlays these flags until the next full write. Returns False if the plan
+    is no longer at `version`; raises KeyError (rolling back) if a key is not
+    a topic of the plan.
+    """
+    cur = conn.execute('UPDATE plans SET version=version+1, progress_in_rows=1 WHERE id=? AND version=?', (plan_id, version))
+    if cur.rowcount != 1:
+        return False
+    for (day, idx), done in flags.items():
+        if conn.execute('UPDATE plan_topics SET done=? WHERE plan_id=? AND day=? AND idx=?',
+                        (int(done), plan_id, day, idx)).rowcount != 1:
+            raise KeyError((day, idx))
+    return True
+
+
+# --- users ---
+def find_user(conn: sqlite3.Connection, username: str) -> Optional[Tuple[int, str]]:
+    """Return (id, password_hash) or None."""
+    return conn.execute('SELECT id, password_hash FROM users WHERE username=?', (username,)).fetchone()
+
+
+def insert_user(conn: sqlite3.Connection, username: str, password_hash: str, created_at: str) -> Optional[int]:
+    """Create a user; returns None if the username is taken."""
+    if conn.execute('SELECT id FROM users WHERE username=?', (username,)).fetchone():
+        return None
+    cur = conn.execute('INSERT INTO users (username, password_hash, created_at) VALUES (?,?,?)',
+                       (username, password_hash, created_at))
+    return cur.lastrowid
+
+
+# --- oauth tokens ---
+def insert_oauth_token(conn: sqlite3.Connection, plan_id: Optional[int], refresh_token: Optional[str],
+                       access_token: Optional[str], scope: Optional[str], expires_at: Optional[str],
+                       created_at: str, user_id: Optional[int]) -> int:
+    cur = conn.execute('INSERT INTO oauth_tokens (plan_id, refresh_token, access_token, scope, expires_at, created_at, user_id) VALUES (?,?,?,?,?,?,?)',
+                       (plan_id, refresh_token, access_token, scope, expires_at, created_at, user_id))
+    return cur.lastrowid
+
+
+def latest_refresh_token(conn: sqlite3.Connection, plan_id: int) -> Optional[str]:
+    row = conn.execute('SELECT refresh_token FROM oauth_tokens WHERE plan_id=? ORDER BY id DESC LIMIT 1', (plan_id,)).fetchone()
+    return row[0] if row else None
+
+
+def active_refresh_tokens(conn: sqlite3.Connection, plan_id: Optional[int] = None, user_id: Optional[int] = None) -> List[Tuple[int, str]]:
+    """(id, refresh_token) of the not yet revoked tokens of a plan, or else of a user."""
+    if plan_id:
+        return conn.execute('SELECT id, refresh_token FROM oauth_tokens WHERE plan_id=? AND revoked=0', (plan_id,)).fetchall()
+    return conn.execute('SELECT id, refresh_token FROM oauth_tokens WHERE user_id=? AND revoked=0', (user_id,)).fetchall()
+
+
+def mark_tokens_revoked(conn: sqlite3.Connection, token_ids: Sequence[int]):
+    conn.executemany('UPDATE oauth_tokens SET revoked=1 WHERE id=?', [(i,) for i in token_ids])
+
+
+def all_refresh_tokens(conn: sqlite3.Connection) -> List[Tuple[int, str]]:
+    return conn.execute('SELECT id, refresh_token FROM oauth_tokens').fetchall()
+
+
+def replace_refresh_token(conn: sqlite3.Connection, token_id: int, refresh_token: str, backup: Optional[str] = None):
+    if backup is not None:
+        conn.execute('UPDATE oauth_tokens SET refresh_token_backup=? WHERE id=?', (backup, token_id))
+    conn.execute('UPDATE oauth_tokens SET refresh_token=? WHERE id=?', (refresh_token, token_id))
@@ -0,0 +1,262 @@
+"""Content-addressed cache for text extracted from uploaded syllabi.
+
+Entries are keyed by the SHA-256 of the uploaded bytes plus the extractor
+settings (e.g. OCR engine and GPU flag), so a repeat upload of the same file
+skips pdfplumber/OCR entirely. Two tiers:
+
+- memory: a per-process LRU bounded by total text size
+- disk: a SQLite table (default `backend/text_cache.db`, next to `plans.db`)
+  bounded by total text size, evicting least recently used rows
+
+Async callers use `aget` / `aput`: the memory tier is answered inline and the
+disk tier runs on a dedicated thread, so SQLite I/O never blocks the event
+loop. A disk hit does not write anything right away; its `last_used` stamp is
+queued and written with the next store or once TOUCH_BATCH hits have piled
+up. The stamps only order evictions, so losing queued ones in a crash is
+harmless.
+
+Configuration (environment variables):
+- PLANORA_TEXT_CACHE_DB: path of the on-disk tier ("" disables it)
+- PLANORA_TEXT_CACHE_MEMORY_BYTES: memory tier budget (default 32 MB)
+- PLANORA_TEXT_CACHE_DISK_BYTES: disk tier budget (default 512 MB)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), 'text_cache.db')
+# disk hits whose last_used stamps are written in one statement
+TOUCH_BATCH = 64
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def cache_key(contents: bytes, **settings) -> str:
+    """Return the cache key for `contents` extracted with `settings`."""
+    digest = hashlib.sha256(contents).hexdigest()
+    return digest + '|' + json.dumps(settings, sort_keys=True, separators=(',', ':'))
+
+
+class TextCache:
+    """Two-tier (memory LRU + SQLite) cache of extracted syllabus text."""
+
+    def __init__(self, db_path: str = None, memory_bytes: int = None, disk_bytes: int = None):
+        self.db_path = os.environ.get('PLANORA_TEXT_CACHE_DB', DEFAULT_DB_PATH) if db_path is None else db_path
+        self.memory_bytes = _env_int('PLANORA_TEXT_CACHE_MEMORY_BYTES', 32 * 1024 * 1024) if memory_bytes is None else memory_bytes
+        self.disk_bytes = _env_int('PLANORA_TEXT_CACHE_DISK_BYTES', 512 * 1024 * 1024) if disk_bytes is None else disk_bytes
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        self._db_ready = False
+        self._executor = None
+        # key -> time of its latest disk hit, not yet written to last_used
+        self._touched = {}
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0,
+                         'memory_evictions': 0, 'disk_evictions': 0}
+
+    # --- disk tier ---
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if not self.db_path:
+            return None
+        conn = sqlite3.connect(self.db_path)
+        if not self._db_ready:
+            conn.execute('''CREATE TABLE IF NOT EXISTS text_cache (
+                key TEXT PRIMARY KEY,
+                text TEXT,
+                size INTEGER,
+                last_used REAL
+            )''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_text_cache_last_used ON text_cache(last_used)')
+            conn.commit()
+            self._db_ready = True
+        return conn
+
+    def _disk_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # one thread: disk-tier statements never contend with each other
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='text-cache')
+            return self._executor
+
+    def _write_touches(self, conn: sqlite3.Connection):
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if touched:
+            conn.executemany('UPDATE text_cache SET last_used=? WHERE key=?', [(t, k) for k, t in touched.items()])
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        conn = self._connect()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute('SELECT text FROM text_cache WHERE key=?', (key,)).fetchone()
+            if row:
+                with self._lock:
+                    self._touched[key] = time.time()
+                    flush = len(self._touched) >= TOUCH_BATCH
+                if flush:
+                    self._write_touches(conn)
+                    conn.commit()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    def _disk_put(self, key: str, text: str, size: int):
+        conn = self._connect()
+        if conn is None or size > self.disk_bytes:
+            if conn is not None:
+                conn.close()
+            return
+        try:
+            # recent hits first, so eviction sees them as recently used
+            self._write_touches(conn)
+            conn.execute('INSERT OR REPLACE INTO text_cache (key, text, size, last_used) VALUES (?,?,?,?)',
+                         (key, text, size, time.time()))
+            used = conn.execute('SELECT COALESCE(SUM(size), 0) FROM text_cache').fetchone()[0]
+            if used > self.disk_bytes:
+                # evict least recently used rows until the budget is met
+                while used > self.disk_bytes:
+                    rows = conn.execute('SELECT key, size FROM text_cache ORDER BY last_used ASC LIMIT 64').fetchall()
+                    if not rows:
+                        break
+                    for old_key, old_size in rows:
+                        if used <= self.disk_bytes:
+                            break
+                        conn.execute('DELETE FROM text_cache WHERE key=?', (old_key,))
+                        used -= old_size
+                        self.counters['disk_evictions'] += 1
+            conn.commit()
+        finally:
+            conn.close()
+
+    # --- memory tier ---
+    def _memory_put(self, key: str, text: str, size: int):
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_used -= old[1]
+            self._memory[key] = (text, size)
+            self._memory_used += size
+            while self._memory_used > self.memory_bytes and self._memory:
+                _, (_, evicted_size) = self._memory.popitem(last=False)
+                self._memory_used -= evicted_size
+                self.counters['memory_evictions'] += 1
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.counters['memory_hits'] += 1
+                return entry[0]
+        return None
+
+    def _disk_lookup(self, key: str) -> Optional[str]:
+        try:
+            return self._disk_get(key)
+        except sqlite3.Error:
+            return None
+
+    def _disk_store(self, key: str, text: str, size: int):
+        try:
+            self._disk_put(key, text, size)
+        except sqlite3.Error:
+            pass
+
+    def _disk_result(self, key: str, text: Optional[str]) -> Optional[str]:
+        if text is None:
+            self.counters['misses'] += 1
+            return None
+        self.counters['disk_hits'] += 1
+        self._memory_put(key, text, len(text.encode('utf-8')))
+        return text
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached text for `key`, or None on a miss (blocks on the disk tier)."""
+        text = self._memory_get(key)
+        if text is not None:
+            return text
+        return self._disk_result(key, self._disk_lookup(key))
+
+    async def aget(self, key: str) -> Optional[str]:
+        """`get` for async code: a memory miss reads the disk tier on the cache's own thread."""
+        text = self._memory_get(key)
+        if text is not None:
+            return text
+        if not self.db_path:
+            return self._disk_result(key, None)
+        text = await asyncio.get_running_loop().run_in_executor(self._disk_executor(), self._disk_lookup, key)
+        return self._disk_result(key, text)
+
+    def put(self, key: str, text: str):
+        """Store `text` under `key` in both tiers. Empty text is not cached."""
+        if not text:
+            return
+        size = len(text.encode('utf-8'))
+        self._memory_put(key, text, size)
+        self._disk_store(key, text, size)
+        self.counters['stores'] += 1
+
+    async def aput(self, key: str, text: str):
+        """`put` for async code; the disk write runs on the cache's own thread."""
+        if not text:
+            return
+        size = len(text.encode('utf-8'))
+        self._memory_put(key, text, size)
+        self.counters['stores'] += 1
+        if self.db_path:
+            await asyncio.get_running_loop().run_in_executor(self._disk_executor(), self._disk_store, key, text, size)
+
+    def shutdown(self):
+        """Write queued last_used stamps and stop the disk thread."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        conn = None
+        try:
+            conn = self._connect()
+            if conn is not None:
+                self._write_touches(conn)
+                conn.commit()
+        except sqlite3.Error:
+            pass
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_used = 0
+            self._touched.clear()
+        conn = self._connect()
+        if conn is not None:
+            conn.execute('DELETE FROM text_cache')
+            conn.commit()
+            conn.close()
+
+    def stats(self) -> dict:
+        lookups = self.counters['memory_hits'] + self.counters['disk_hits'] + self.counters['misses']
+        hits = lookups - self.counters['misses']
+        return dict(self.counters,
+                    memory_entries=len(self._memory),
+                    memory_bytes=self._memory_used,
+                    memory_budget=self.memory_bytes,
+                    disk_budget=self.disk_bytes,
+                    hit_rate=round(hits / lookups, 3) if lookups else None)
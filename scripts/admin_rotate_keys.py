@@ -7,7 +7,8 @@ Usage:
 This script will read existing keys from the environment variable `ENCRYPTION_KEYS` (comma-separated),
 try to decrypt each stored `refresh_token` from the `oauth_tokens` table using those keys,
 and re-encrypt using the provided `--new-key`. If `--backup` is set, the previous ciphertext is written
-into `refresh_token_backup` column.
+into `refresh_token_backup` column. The database is first brought up to the current schema
+version (backend/migrations.py), which provides the `revoked` and `refresh_token_backup` columns.
 
 Security: run this script on the server where DB and keys reside. Do NOT transmit keys over network.
 """
@@ -18,6 +19,12 @@ import sqlite3
 import sys
 from typing import List
 
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend.migrations import migrate
+
 try:
     from cryptography.fernet import Fernet
 except Exception:
@@ -77,17 +84,10 @@ def main():
         sys.exit(2)
 
     conn = sqlite3.connect(db_path)
+    # same schema upgrade the server applies on start (no-op when already current)
+    migrate(conn)
     cur = conn.cursor()
 
-    # ensure columns exist
-    cur.execute("PRAGMA table_info(oauth_tokens)")
-    cols = [r[1] for r in cur.fetchall()]
-    if 'refresh_token_backup' not in cols:
-        if args.backup:
-            cur.execute('ALTER TABLE oauth_tokens ADD COLUMN refresh_token_backup TEXT')
-    if 'revoked' not in cols:
-        cur.execute('ALTER TABLE oauth_tokens ADD COLUMN revoked INTEGER DEFAULT 0')
-
     cur.execute('SELECT id, refresh_token FROM oauth_tokens')
     rows = cur.fetchall()
     total = len(rows)
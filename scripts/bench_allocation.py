@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Benchmark plan allocation as the number of topics and days grows.
+
+Usage:
+  python scripts/bench_allocation.py [--repeat 3]
+
+Compares `generate_plan` against the original rescanning allocator (which rebuilt
+and walked the rotated day order for every topic) for both exam types.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend import parser as planner
+
+
+class _LegacyAllocator:
+    """Original allocator: rescan the rotated day order on every topic."""
+
+    def __init__(self, days, order, capacity):
+        self.days = days
+        self.order = order
+        self.capacity = capacity
+
+    def allocate(self, title, minutes, start=0):
+        day_order = self.order[start:] + self.order[:start]
+        remaining = minutes
+        part_idx = 1
+        while remaining > 0:
+            allocated_in_pass = False
+            for di in day_order:
+                day = self.days[di]
+                avail = self.capacity - day.total_minutes
+                if avail <= 0:
+                    continue
+                take = min(remaining, avail)
+                part_title = title
+                if minutes > take:
+                    part_title = f"{title} (Part {part_idx})"
+                day.topics.append((part_title, take))
+                day.total_minutes += take
+                remaining -= take
+                part_idx += 1
+                allocated_in_pass = True
+                if remaining <= 0:
+                    break
+            if not allocated_in_pass:
+                break
+
+
+def _time_plan(topics, plan_length, exam_type, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        fresh = [dict(t) for t in topics]
+        t0 = time.perf_counter()
+        result = planner.generate_plan(fresh, plan_length=plan_length, hours_per_day=2.0, exam_type=exam_type)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--repeat", type=int, default=3, help="Runs per case (best time is reported)")
+    args = p.parse_args()
+
+    current = planner._DayAllocator
+    print(f"{'exam_type':<13}{'topics':>8}{'days':>6}{'legacy ms':>12}{'new ms':>10}{'speedup':>9}  same")
+    for exam_type in ("final", "regular_test"):
+        for n_topics, plan_length in ((100, 30), (1000, 90), (5000, 180), (20000, 365)):
+            topics = [{"title": f"Topic {i}", "length": 200 + (i * 7919) % 3000} for i in range(n_topics)]
+            planner._DayAllocator = _LegacyAllocator
+            try:
+                legacy_t, legacy_plan = _time_plan(topics, plan_length, exam_type, args.repeat)
+            finally:
+                planner._DayAllocator = current
+            new_t, new_plan = _time_plan(topics, plan_length, exam_type, args.repeat)
+            print(f"{exam_type:<13}{n_topics:>8}{plan_length:>6}{legacy_t * 1000:>12.1f}{new_t * 1000:>10.1f}"
+                  f"{legacy_t / new_t:>8.1f}x  {legacy_plan == new_plan}")
+
+
+if __name__ == "__main__":
+    main()
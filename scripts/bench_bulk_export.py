@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Bulk export (/export_bulk) vs one /export_pdf + /export_ics call per plan.
+
+Usage:
+  python scripts/bench_bulk_export.py [--plans 40] [--days 365] [--workers N]
+
+Saves `--plans` plans of `--days` days for one user and exports them all as
+PDF + ICS, first with two requests per plan and then with one streamed ZIP.
+The ASGI app is called directly so response bodies are never buffered whole.
+The PDF cache is disabled, so every plan is rendered each time. Reported:
+wall time, time to the first ZIP bytes, bytes sent, and peak Python memory
+of the server process (renders run in the export workers).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend import main as backend_main
+from backend.db import ConnectionPool
+from backend.exports import ExportPool
+from backend.hot_plans import HotPlanCache
+from backend.migrations import migrate
+from backend.pdf_cache import PdfCache
+
+
+async def call(method, path, params, on_chunk):
+    """Call the ASGI app directly; httpx's ASGITransport would buffer the whole body."""
+    body = urlencode(params).encode() if method == "POST" else b""
+    query = urlencode(params).encode() if method == "GET" else b""
+    headers = [(b"content-type", b"application/x-www-form-urlencoded")] if method == "POST" else []
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method, "scheme": "http",
+             "path": path, "raw_path": path.encode(), "query_string": query, "headers": headers,
+             "client": ("bench", 0), "server": ("bench", 80), "root_path": ""}
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            await asyncio.Event().wait()  # the client never disconnects
+        requested = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            on_chunk(message.get("body", b""))
+
+    await backend_main.app(scope, receive, send)
+
+
+async def per_plan(ids):
+    sent = 0
+
+    def count(chunk):
+        nonlocal sent
+        sent += len(chunk)
+
+    for pid in ids:
+        await call("GET", "/export_pdf", {"id": pid}, count)
+        await call("GET", "/export_ics", {"id": pid}, count)
+    return sent, None
+
+
+async def bulk(user_id):
+    sent = 0
+    first = None
+    t0 = time.perf_counter()
+
+    def count(chunk):
+        nonlocal sent, first
+        if chunk and first is None:
+            first = time.perf_counter() - t0
+        sent += len(chunk)
+
+    await call("POST", "/export_bulk", {"user_id": user_id}, count)
+    return sent, first
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--plans", type=int, default=40)
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend_main.db = ConnectionPool(os.path.join(tmp, "plans.db"), setup=migrate)
+        backend_main.hot_plans = HotPlanCache(max_bytes=0)
+        backend_main.pdf_cache = PdfCache(max_bytes=0)
+        backend_main.export_pool = ExportPool(workers=args.workers)
+        backend_main.export_pool.start()
+        ids = []
+        for i in range(args.plans):
+            plan_json = json.dumps({"plan_length": args.days, "course_type": f"Chemistry {i}", "plan": [
+                {"day": d, "daily_summary": f"Day {d}: 3 topics", "total_minutes": 120,
+                 "topics": [{"title": f"Chapter {d}.{t}: kinetics and equilibrium constants", "estimated_minutes": 40}
+                            for t in range(3)]} for d in range(1, args.days + 1)]})
+            ids.append(asyncio.run(backend_main.db.write(
+                backend_main.store.insert_plan, "2025-01-01T00:00:00", None, None, plan_json, 1)))
+
+        print(f"{args.plans} plans x {args.days} days, {backend_main.export_pool.workers} export workers, {os.cpu_count()} CPUs")
+        print(f"{'mode':<10}{'wall s':>9}{'first byte s':>14}{'MB sent':>9}{'peak MB':>9}")
+        for label, job in (("per-plan", lambda: per_plan(ids)), ("bulk zip", lambda: bulk(1))):
+            t0 = time.perf_counter()
+            sent, first = asyncio.run(job())
+            wall = time.perf_counter() - t0
+            tracemalloc.start()
+            asyncio.run(job())
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            first_s = "-" if first is None else f"{first:.2f}"
+            print(f"{label:<10}{wall:>9.2f}{first_s:>14}{sent / 1e6:>9.1f}{peak / 1e6:>9.1f}")
+        backend_main.export_pool.shutdown()
+        backend_main.db.shutdown()
+
+
+if __name__ == "__main__":
+    main()
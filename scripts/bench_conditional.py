@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Full responses vs 304 revalidation for saved-plan reads and exports.
+
+Usage:
+  python scripts/bench_conditional.py [--days 365] [--reads 200]
+
+Saves one `--days`-day plan and requests /get_plan, /export_ics and
+/export_pdf repeatedly through the ASGI app, once without a validator and
+once with the ETag of the previous response in If-None-Match. Median
+latency and bytes sent per request are reported.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import httpx
+
+from backend import main as backend_main
+from backend.db import ConnectionPool
+from backend.hot_plans import HotPlanCache
+from backend.migrations import migrate
+
+
+async def drive(paths, reads):
+    transport = httpx.ASGITransport(app=backend_main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as ac:
+        rows = []
+        for path in paths:
+            etag = (await ac.get(path)).headers["ETag"]
+            for label, headers in (("200", {}), ("304", {"If-None-Match": etag})):
+                n = reads if path.startswith("/get_plan") or label == "304" else max(5, reads // 20)
+                lat, size = [], 0
+                for _ in range(n):
+                    t0 = time.perf_counter()
+                    resp = await ac.get(path, headers=headers)
+                    lat.append(time.perf_counter() - t0)
+                    assert resp.status_code == int(label)
+                    size = len(resp.content)
+                lat.sort()
+                rows.append((path.split("?")[0], label, lat[len(lat) // 2] * 1000, size))
+    return rows
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--days", type=int, default=365)
+    p.add_argument("--reads", type=int, default=200)
+    args = p.parse_args()
+
+    plan_json = json.dumps({"plan_length": args.days, "plan": [
+        {"day": d, "daily_summary": f"Day {d}: 3 topics", "total_minutes": 120,
+         "topics": [{"title": f"Chapter {d}.{i}: kinetics and equilibrium constants", "estimated_minutes": 40}
+                    for i in range(3)]} for d in range(1, args.days + 1)]})
+    with tempfile.TemporaryDirectory() as tmp:
+        backend_main.db = ConnectionPool(os.path.join(tmp, "plans.db"), setup=migrate)
+        backend_main.hot_plans = HotPlanCache()
+        pid = asyncio.run(backend_main.db.write(backend_main.store.insert_plan, "2025-01-01T00:00:00", None, None, plan_json))
+        paths = [f"/get_plan?id={pid}", f"/export_ics?id={pid}", f"/export_pdf?id={pid}"]
+        print(f"{args.days}-day plan ({len(plan_json) / 1000:.0f} KB stored)")
+        print(f"{'endpoint':<14}{'status':>7}{'p50 ms':>10}{'bytes':>10}")
+        for path, status, p50, size in asyncio.run(drive(paths, args.reads)):
+            print(f"{path:<14}{status:>7}{p50:>10.2f}{size:>10}")
+        backend_main.db.shutdown()
+
+
+if __name__ == "__main__":
+    main()
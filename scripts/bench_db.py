@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Mixed read/write throughput of plans.db access: connect-per-call vs pooled WAL.
+
+Usage:
+  python scripts/bench_db.py [--threads 8] [--seconds 5] [--write-ratio 0.2] [--rows 2000]
+
+"connect" mimics the old endpoints (sqlite3.connect per call, default
+rollback journal, closed after every query); "pooled" uses
+backend.db.ConnectionPool. Both run the same mix of get_plan-style reads and
+save_plan/update_plan-style writes against a fresh temporary database.
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend.db import ConnectionPool
+
+PLAN_JSON = json.dumps({"plan": [{"day": d, "topics": [{"title": f"Topic {d}", "estimated_minutes": 60}]} for d in range(120)]})
+
+
+class ConnectPerCall:
+    def __init__(self, path):
+        self.path = path
+
+    @contextmanager
+    def transaction(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def seed(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE plans (id INTEGER PRIMARY KEY AUTOINCREMENT, created_at TEXT, course_type TEXT, '
+                 'exam_date TEXT, plan_json TEXT, user_id INTEGER, version INTEGER NOT NULL DEFAULT 0)')
+    conn.executemany('INSERT INTO plans (created_at, plan_json) VALUES (?, ?)', [("now", PLAN_JSON)] * rows)
+    conn.commit()
+    conn.close()
+
+
+def run(db, threads, seconds, write_ratio, rows):
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def worker(seed_value):
+        rng = random.Random(seed_value)
+        reads = writes = errors = 0
+        while time.perf_counter() < stop:
+            try:
+                if rng.random() < write_ratio:
+                    with db.transaction() as conn:
+                        if rng.random() < 0.5:
+                            conn.execute('INSERT INTO plans (created_at, plan_json) VALUES (?, ?)', ("now", PLAN_JSON))
+                        else:
+                            conn.execute('UPDATE plans SET plan_json=?, version=version+1 WHERE id=?',
+                                         (PLAN_JSON, rng.randint(1, rows)))
+                    writes += 1
+                else:
+                    with db.transaction() as conn:
+                        conn.execute('SELECT plan_json FROM plans WHERE id=?', (rng.randint(1, rows),)).fetchone()
+                    reads += 1
+            except sqlite3.OperationalError:
+                errors += 1
+        with lock:
+            counts['reads'] += reads
+            counts['writes'] += writes
+            counts['errors'] += errors
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return counts
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--threads", type=int, default=8)
+    p.add_argument("--seconds", type=float, default=5.0)
+    p.add_argument("--write-ratio", type=float, default=0.2)
+    p.add_argument("--rows", type=int, default=2000)
+    args = p.parse_args()
+
+    print(f"{'mode':<10}{'reads/s':>10}{'writes/s':>10}{'total/s':>10}{'errors':>8}")
+    for mode in ("connect", "pooled"):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "plans.db")
+            seed(path, args.rows)
+            db = ConnectionPool(path) if mode == "pooled" else ConnectPerCall(path)
+            counts = run(db, args.threads, args.seconds, args.write_ratio, args.rows)
+            if mode == "pooled":
+                db.close_all()
+        r, w = counts['reads'] / args.seconds, counts['writes'] / args.seconds
+        print(f"{mode:<10}{r:>10.0f}{w:>10.0f}{r + w:>10.0f}{counts['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
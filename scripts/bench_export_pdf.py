@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""PDF export throughput for 365-day plans.
+
+Usage:
+  python scripts/bench_export_pdf.py [--days 365] [--exports 40] [--concurrency 4] [--workers N]
+
+Runs `--exports` exports, `--concurrency` at a time, three ways:
+- inline: the old handler (reportlab draws into a temp file on the event loop)
+- pool:   every plan distinct, so each one is rendered in export_pool
+- cached: one plan exported repeatedly, served from pdf_cache
+A ticker task measures how long the event loop is blocked. Exports per
+second, the worst loop stall and temp files left behind are reported.
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend import exports
+from backend import main as backend_main
+from backend.pdf_cache import PdfCache
+
+
+def make_plan(days: int, variant: int) -> bytes:
+    return json.dumps({"plan_length": days, "course_type": f"Chemistry {variant}", "exam_date": "2025-12-01", "plan": [
+        {"day": d, "daily_summary": f"Day {d}: 3 topics", "total_minutes": 120,
+         "topics": [{"title": f"Chapter {d}.{i}: kinetics and equilibrium constants", "estimated_minutes": 40}
+                    for i in range(3)]} for d in range(1, days + 1)]}).encode()
+
+
+async def old_export(plan_json: bytes):
+    # what /export_pdf did before: parse, draw on the loop into a temp file that is never removed
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
+    exports.render_pdf(json.loads(plan_json), tmp.name)
+    with open(tmp.name, 'rb') as f:
+        return len(f.read())
+
+
+async def new_export(plan_json: bytes):
+    resp = await backend_main._pdf_response(plan_json, "planora_plan.pdf")
+    return sum([len(chunk) async for chunk in resp.body_iterator])
+
+
+async def run(fn, plans, concurrency):
+    stall = 0.0
+    stop = False
+
+    async def ticker():
+        nonlocal stall
+        while not stop:
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.005)
+            stall = max(stall, time.perf_counter() - t0 - 0.005)
+
+    tick = asyncio.create_task(ticker())
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(p):
+        async with sem:
+            assert await fn(p) > 0
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[one(p) for p in plans])
+    elapsed = time.perf_counter() - t0
+    stop = True
+    await tick
+    return len(plans) / elapsed, stall * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--exports", type=int, default=40)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
+
+    distinct = [make_plan(args.days, i) for i in range(args.exports)]
+    same = [distinct[0]] * args.exports
+    tmpdir = tempfile.gettempdir()
+    before = set(glob.glob(os.path.join(tmpdir, "*.pdf")))
+
+    backend_main.export_pool = exports.ExportPool(workers=args.workers)
+    backend_main.export_pool.start()
+    print(f"{args.days}-day plans, {args.exports} exports, concurrency {args.concurrency}, "
+          f"{backend_main.export_pool.workers} workers, {os.cpu_count()} CPUs")
+    print(f"{'mode':<8}{'exports/s':>11}{'max stall ms':>14}{'temp files':>12}")
+    for label, fn, plans in (("inline", old_export, distinct), ("pool", new_export, distinct), ("cached", new_export, same)):
+        backend_main.pdf_cache = PdfCache()
+        rate, stall = asyncio.run(run(fn, plans, args.concurrency))
+        leaked = set(glob.glob(os.path.join(tmpdir, "*.pdf"))) - before
+        print(f"{label:<8}{rate:>11.1f}{stall:>14.1f}{len(leaked):>12}")
+        for path in leaked:
+            os.unlink(path)
+        before -= leaked
+    backend_main.export_pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Sustained save_plan-style write throughput with and without group commit.
+
+Usage:
+  python scripts/bench_group_commit.py [--clients 64] [--writes 20] [--synchronous FULL]
+
+Each of `--clients` concurrent asyncio tasks awaits `--writes` plan inserts
+through ConnectionPool.write. "per-write" uses batch_max=1 (one commit and
+fsync per request); "group" uses the default batching. Run with
+--synchronous FULL to count an fsync per commit as on a durable setup.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend import store
+from backend.db import ConnectionPool
+from backend.migrations import migrate
+
+PLAN_JSON = json.dumps({"plan": [{"day": d, "topics": [{"title": f"Topic {d}", "estimated_minutes": 60}]} for d in range(60)]})
+
+
+async def drive(pool, clients, writes):
+    latencies = []
+
+    async def client():
+        for _ in range(writes):
+            t0 = time.perf_counter()
+            await pool.write(store.insert_plan, "now", "bench", None, PLAN_JSON, None)
+            latencies.append(time.perf_counter() - t0)
+
+    await asyncio.gather(*[client() for _ in range(clients)])
+    return sorted(latencies)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--clients", type=int, default=64)
+    p.add_argument("--writes", type=int, default=20)
+    p.add_argument("--synchronous", default="FULL")
+    args = p.parse_args()
+
+    print(f"{'mode':<10}{'writes/s':>10}{'commits':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for mode, batch_max in (("per-write", 1), ("group", None)):
+        with tempfile.TemporaryDirectory() as tmp:
+            pool = ConnectionPool(os.path.join(tmp, "plans.db"), synchronous=args.synchronous, batch_max=batch_max)
+            migrate(pool.connection())
+            t0 = time.perf_counter()
+            lat = asyncio.run(drive(pool, args.clients, args.writes))
+            elapsed = time.perf_counter() - t0
+            commits = pool.stats()["batches"]
+            pool.shutdown()
+        p50, p99 = lat[len(lat) // 2], lat[min(len(lat) - 1, int(0.99 * len(lat)))]
+        print(f"{mode:<10}{len(lat) / elapsed:>10.0f}{commits:>9}{p50 * 1000:>9.1f}{p99 * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""GET /get_plan latency with and without the hot-plan read cache.
+
+Usage:
+  python scripts/bench_hot_plans.py [--days 180] [--plans 20] [--reads 2000]
+
+Saves `--plans` plans of `--days` days (stored compressed, as by default) and
+reads them round-robin through the ASGI app, first with the cache disabled
+and then with the default budget. Median and p99 latency and the cache's
+hit rate are reported.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import httpx
+
+from backend import main as backend_main
+from backend.db import ConnectionPool
+from backend.hot_plans import HotPlanCache
+from backend.migrations import migrate
+
+PLAN_JSON = json.dumps({"plan": [{"day": d, "topics": [{"title": f"Chapter {d}.{i}: kinetics and equilibrium constants",
+                                                     "estimated_minutes": 40} for i in range(3)]} for d in range(1, 366)]})
+
+
+async def drive(ids, reads):
+    transport = httpx.ASGITransport(app=backend_main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as ac:
+        lat = []
+        for i in range(reads):
+            t0 = time.perf_counter()
+            assert (await ac.get(f"/get_plan?id={ids[i % len(ids)]}")).status_code == 200
+            lat.append(time.perf_counter() - t0)
+    lat.sort()
+    return lat[len(lat) // 2] * 1000, lat[min(len(lat) - 1, int(0.99 * len(lat)))] * 1000
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--days", type=int, default=180)
+    p.add_argument("--plans", type=int, default=20)
+    p.add_argument("--reads", type=int, default=2000)
+    args = p.parse_args()
+
+    plan_json = json.dumps({"plan": json.loads(PLAN_JSON)["plan"][:args.days]})
+    with tempfile.TemporaryDirectory() as tmp:
+        backend_main.db = ConnectionPool(os.path.join(tmp, "plans.db"), setup=migrate)
+        ids = [asyncio.run(backend_main.db.write(backend_main.store.insert_plan, "now", None, None, plan_json))
+               for _ in range(args.plans)]
+        print(f"plan {len(plan_json) / 1000:.0f} KB; {args.reads} reads over {args.plans} plans")
+        print(f"{'cache':<10}{'p50 ms':>9}{'p99 ms':>9}{'hit rate':>10}")
+        for label, budget in (("off", 0), ("on", None)):
+            backend_main.hot_plans = HotPlanCache(max_bytes=budget)
+            p50, p99 = asyncio.run(drive(ids, args.reads))
+            print(f"{label:<10}{p50:>9.2f}{p99:>9.2f}{str(backend_main.hot_plans.stats()['hit_rate']):>10}")
+        backend_main.db.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Lookup latency of the list_plans and OAuth token queries per index layout.
+
+Usage:
+  python scripts/bench_indexes.py [--plans 50000] [--users 2000] [--tokens 20000] [--lookups 2000]
+
+Seeds one temporary database with realistic plan rows (a few KB of plan_json
+each, spread over `--users` owners) and tokens, then times the backend.store
+lookups under three layouts: no secondary indexes, the single-column indexes
+of schema v2, and the covering indexes of schema v3.
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend import store
+from backend.migrations import migrate
+
+PLAN_JSON = json.dumps({"plan": [{"day": d, "topics": [{"title": f"Topic {d}", "estimated_minutes": 60}]} for d in range(60)]})
+
+V2 = ['CREATE INDEX idx_plans_user_id ON plans(user_id)',
+      'CREATE INDEX idx_oauth_tokens_plan_id ON oauth_tokens(plan_id)',
+      'CREATE INDEX idx_oauth_tokens_user_id ON oauth_tokens(user_id)']
+V3 = ['CREATE INDEX idx_plans_user_listing ON plans(user_id, id, created_at, course_type, exam_date)',
+      'CREATE INDEX idx_oauth_tokens_plan_tokens ON oauth_tokens(plan_id, id, revoked, refresh_token)',
+      'CREATE INDEX idx_oauth_tokens_user_tokens ON oauth_tokens(user_id, id, revoked, refresh_token)']
+LAYOUTS = {"none": [], "v2": V2, "v3": V3}
+
+QUERIES = {
+    "list_plans(user)": lambda c, rng, a: store.list_plans(c, 50, user_id=rng.randint(1, a.users)),
+    "latest_refresh_token": lambda c, rng, a: store.latest_refresh_token(c, rng.randint(1, a.plans)),
+    "active_tokens(plan)": lambda c, rng, a: store.active_refresh_tokens(c, plan_id=rng.randint(1, a.plans)),
+    "active_tokens(user)": lambda c, rng, a: store.active_refresh_tokens(c, user_id=rng.randint(1, a.users)),
+}
+
+
+def seed(path, args):
+    rng = random.Random(0)
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.executemany('INSERT INTO plans (created_at, course_type, exam_date, plan_json, user_id) VALUES (?,?,?,?,?)',
+                     (("2025-01-01", "MCAT", "2025-06-01", PLAN_JSON, rng.randint(1, args.users)) for _ in range(args.plans)))
+    conn.executemany('INSERT INTO oauth_tokens (plan_id, user_id, refresh_token, revoked) VALUES (?,?,?,?)',
+                     ((rng.randint(1, args.plans), rng.randint(1, args.users), "x" * 120, int(rng.random() < 0.3))
+                      for _ in range(args.tokens)))
+    conn.commit()
+    return conn
+
+
+def use_layout(conn, statements):
+    names = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index' AND name LIKE 'idx_%'")]
+    for name in names:
+        conn.execute(f'DROP INDEX {name}')
+    for sql in statements:
+        conn.execute(sql)
+    conn.execute('ANALYZE')
+    conn.commit()
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--plans", type=int, default=50000)
+    p.add_argument("--users", type=int, default=2000)
+    p.add_argument("--tokens", type=int, default=20000)
+    p.add_argument("--lookups", type=int, default=2000)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = seed(os.path.join(tmp, "plans.db"), args)
+        print(f"{'query':<24}{'layout':<8}{'p50 us':>9}{'p99 us':>9}")
+        for name, query in QUERIES.items():
+            for layout, statements in LAYOUTS.items():
+                use_layout(conn, statements)
+                rng = random.Random(1)
+                lat = []
+                for _ in range(args.lookups):
+                    t0 = time.perf_counter()
+                    query(conn, rng, args)
+                    lat.append(time.perf_counter() - t0)
+                lat.sort()
+                p50, p99 = lat[len(lat) // 2], lat[min(len(lat) - 1, int(0.99 * len(lat)))]
+                print(f"{name:<24}{layout:<8}{p50 * 1e6:>9.1f}{p99 * 1e6:>9.1f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
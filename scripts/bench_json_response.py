@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Serialization cost of large plan responses: FastAPI's default path vs backend.fastjson.
+
+Usage:
+  python scripts/bench_json_response.py [--days 365] [--topics 400] [--runs 50]
+
+Builds one plan of `--days` days with POST /plan. It then times, per
+response:
+- get_plan the old way: json.loads of the stored text, then
+  jsonable_encoder, then JSONResponse.render.
+- get_plan now: the stored bytes are sent as is, so the only cost is
+  building the response.
+- a /plan-sized dict through jsonable_encoder plus JSONResponse, compared
+  with FastJSONResponse using orjson and using the stdlib fallback.
+
+It also reports end-to-end GET /get_plan latency through the ASGI app.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from backend import fastjson
+from backend import main as backend_main
+from backend.db import ConnectionPool
+from backend.migrations import migrate
+
+
+def median_ms(fn, runs):
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+
+def stdlib_only(content):
+    fastjson.ORJSON_AVAILABLE = False
+    try:
+        return fastjson.FastJSONResponse(content)
+    finally:
+        fastjson.ORJSON_AVAILABLE = fastjson.find_spec('orjson') is not None
+
+
+async def get_plan_latency(pid, runs):
+    transport = httpx.ASGITransport(app=backend_main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as ac:
+        times = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            assert (await ac.get(f"/get_plan?id={pid}")).status_code == 200
+            times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--days", type=int, default=365)
+    p.add_argument("--topics", type=int, default=400)
+    p.add_argument("--runs", type=int, default=50)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend_main.db = ConnectionPool(os.path.join(tmp, "plans.db"), setup=migrate)
+        client = TestClient(backend_main.app)
+        topics = "\n".join(f"Chapter {i}: reaction kinetics, equilibrium constants and rate laws" for i in range(args.topics))
+        plan = client.post("/plan", data={"topics_text": topics, "plan_length": args.days, "hours_per_day": 3}).json()
+        text = json.dumps(plan)
+        pid = client.post("/save_plan", data={"plan": text}).json()["id"]
+        stored = text.encode()
+        print(f"plan: {args.days} days, {sum(len(d['topics']) for d in plan['plan'])} topic slots, {len(stored) / 1000:.0f} KB JSON "
+              f"(orjson {'installed' if fastjson.ORJSON_AVAILABLE else 'missing'}); median ms per response")
+
+        rows = [
+            ("get_plan, old: loads + encoder + render", lambda: JSONResponse(jsonable_encoder(json.loads(text)))),
+            ("get_plan, now: stored bytes as is", lambda: fastjson.RawJSONResponse(stored)),
+            ("/plan dict: encoder + JSONResponse", lambda: JSONResponse(jsonable_encoder(plan))),
+            ("/plan dict: FastJSONResponse (orjson)", lambda: fastjson.FastJSONResponse(plan)),
+            ("/plan dict: FastJSONResponse (stdlib)", lambda: stdlib_only(plan)),
+        ]
+        for label, fn in rows:
+            print(f"  {label:<42}{median_ms(fn, args.runs):>8.2f}")
+        print(f"  {'GET /get_plan end to end':<42}{asyncio.run(get_plan_latency(pid, args.runs)):>8.2f}")
+        backend_main.db.shutdown()
+
+
+if __name__ == "__main__":
+    main()
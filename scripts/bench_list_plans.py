@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Full /list_plans walk: one huge page vs cursor pages vs NDJSON streaming.
+
+Usage:
+  python scripts/bench_list_plans.py [--plans 100000] [--page 500]
+
+Seeds a temporary database with `--plans` plans and reads every summary
+through the ASGI app (called directly, so streamed chunks are dropped as
+they arrive). "one-shot" is the old pattern: a single request with
+limit=--plans, which lifts the server's page cap. "cursor" follows
+next_cursor with pages of --page; "ndjson" streams with format=ndjson. Peak
+traced Python memory (server and client share the process) and wall time are
+reported, along with the latency of the first and the last cursor page.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend import main as backend_main
+from backend.db import ConnectionPool
+from backend.migrations import migrate
+
+PLAN_JSON = json.dumps({"plan": [{"day": d, "topics": [{"title": f"Topic {d}", "estimated_minutes": 60}]} for d in range(30)]})
+
+
+def seed(path, plans):
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.executemany('INSERT INTO plans (created_at, course_type, exam_date, plan_json, user_id) VALUES (?,?,?,?,?)',
+                     (("2025-01-01T00:00:00", "Calculus", "2025-06-01", PLAN_JSON, i % 50 + 1) for i in range(plans)))
+    conn.commit()
+    conn.close()
+
+
+async def get(path, params, on_chunk):
+    """Call the ASGI app directly; httpx's ASGITransport would buffer the whole body."""
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": path, "raw_path": path.encode(), "query_string": urlencode(params).encode(), "headers": [],
+             "client": ("bench", 0), "server": ("bench", 80), "root_path": ""}
+
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            await asyncio.Event().wait()  # the client never disconnects
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            on_chunk(message.get("body", b""))
+
+    await backend_main.app(scope, receive, send)
+
+
+async def get_json(path, params):
+    chunks = []
+    await get(path, params, chunks.append)
+    return json.loads(b"".join(chunks))
+
+
+async def one_shot(args):
+    backend_main.LIST_PLANS_MAX_LIMIT = args.plans
+    try:
+        return len((await get_json("/list_plans", {"limit": args.plans}))["plans"]), []
+    finally:
+        backend_main.LIST_PLANS_MAX_LIMIT = args.page
+
+
+async def cursor_pages(args):
+    count, cursor, page_times = 0, None, []
+    while True:
+        t0 = time.perf_counter()
+        page = await get_json("/list_plans", {"limit": args.page, **({"cursor": cursor} if cursor else {})})
+        page_times.append(time.perf_counter() - t0)
+        count += len(page["plans"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return count, page_times
+
+
+async def ndjson(args):
+    count = 0
+
+    def on_chunk(chunk):
+        nonlocal count
+        count += chunk.count(b"\n")  # consumed and dropped as it arrives
+
+    await get("/list_plans", {"format": "ndjson"}, on_chunk)
+    return count, []
+
+
+async def measure(mode, args):
+    await get_json("/list_plans", {"limit": 1})  # warm the pool
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    count, page_times = await mode(args)
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, elapsed, peak, page_times
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--plans", type=int, default=100000)
+    p.add_argument("--page", type=int, default=500)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "plans.db")
+        seed(path, args.plans)
+        backend_main.db = ConnectionPool(path, setup=migrate)
+        backend_main.LIST_PLANS_MAX_LIMIT = args.page
+        print(f"{'mode':<10}{'rows':>8}{'seconds':>9}{'peak MB':>9}")
+        for name, mode in (("one-shot", one_shot), ("cursor", cursor_pages), ("ndjson", ndjson)):
+            count, elapsed, peak, page_times = asyncio.run(measure(mode, args))
+            print(f"{name:<10}{count:>8}{elapsed:>9.2f}{peak / 1e6:>9.1f}")
+            if page_times:
+                print(f"  first page {page_times[0] * 1000:.1f} ms, last page {page_times[-1] * 1000:.1f} ms")
+        backend_main.db.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Measure request latency while large PDFs are being uploaded to /plan.
+
+Usage:
+  python scripts/bench_pdf_extraction.py [--pages 300] [--uploads 4] [--workers 4]
+
+Runs the app in-process (one event loop, like a single uvicorn worker), posts
+`--uploads` copies of a generated PDF concurrently and probes /list_plans the
+whole time. Each run is repeated with inline extraction (PLANORA_PDF_WORKERS=0,
+the previous behaviour) and with the process pool.
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import httpx
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from backend import main as backend_main
+from backend.extraction import PdfExtractionPool
+
+
+def make_pdf(pages: int) -> bytes:
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=letter)
+    for i in range(pages):
+        y = 740
+        c.drawString(40, y, f"Chapter {i + 1}: Section heading for page {i + 1}")
+        for line in range(40):
+            y -= 16
+            c.drawString(40, y, f"Body text line {line} of page {i + 1} with enough words to parse.")
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+
+async def run(pdf: bytes, uploads: int):
+    transport = httpx.ASGITransport(app=backend_main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        probe_latency = []
+        upload_latency = []
+        done = asyncio.Event()
+
+        async def probe():
+            while not done.is_set():
+                t0 = time.perf_counter()
+                await client.get("/list_plans", params={"limit": 5})
+                probe_latency.append(time.perf_counter() - t0)
+                await asyncio.sleep(0.01)
+
+        async def upload():
+            t0 = time.perf_counter()
+            r = await client.post("/plan", files={"file": ("s.pdf", pdf, "application/pdf")}, data={"plan_length": 30})
+            r.raise_for_status()
+            upload_latency.append(time.perf_counter() - t0)
+
+        prober = asyncio.create_task(probe())
+        t0 = time.perf_counter()
+        await asyncio.gather(*[upload() for _ in range(uploads)])
+        wall = time.perf_counter() - t0
+        done.set()
+        await prober
+    return wall, upload_latency, probe_latency
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--pages", type=int, default=300)
+    p.add_argument("--uploads", type=int, default=4)
+    p.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    args = p.parse_args()
+
+    pdf = make_pdf(args.pages)
+    print(f"{args.pages}-page PDF ({len(pdf) // 1024} KB), {args.uploads} concurrent uploads")
+    print(f"{'mode':<12}{'wall s':>8}{'upload p50 s':>14}{'probe n':>9}{'probe p50 ms':>14}{'probe p99 ms':>14}{'probe max ms':>14}")
+    for label, workers in (("inline", 0), (f"pool x{args.workers}", args.workers)):
+        pool = PdfExtractionPool(workers=workers, queue_depth=args.uploads)
+        backend_main.pdf_pool = pool
+        try:
+            wall, ups, probes = asyncio.run(run(pdf, args.uploads))
+        finally:
+            pool.shutdown()
+        print(f"{label:<12}{wall:>8.2f}{statistics.median(ups):>14.2f}{len(probes):>9}"
+              f"{pct(probes, 0.5):>14.1f}{pct(probes, 0.99):>14.1f}{max(probes) * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
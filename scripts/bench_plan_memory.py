@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Measure peak Python memory of the /plan pipeline on a large syllabus.
+
+Usage:
+  python scripts/bench_plan_memory.py [--mb 5] [--days 180]
+
+Traces extract_topics + generate_plan (the work /plan does after text
+extraction) with tracemalloc for each heuristic. Run it on two revisions to
+compare representations.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend.parser import extract_topics, generate_plan
+
+PARA = "This paragraph discusses the material in depth with examples and exercises for the student. " * 3
+
+
+def syllabi(size):
+    chapters = "".join(f"Chapter {i}: Title {i}\n" + (PARA + "\n") * 6 + "\n" for i in range(1, 400))
+    inline = "Course overview. " + " ".join(f"chapter {i}: Title {i}. " + PARA * 6 for i in range(1, 400))
+    paragraphs = "\n\n".join(PARA for _ in range(4000))
+    for name, text in (("headings", chapters), ("inline", inline), ("paragraphs", paragraphs)):
+        yield name, (text * (size // len(text) + 1))[:size]
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--mb", type=float, default=5.0, help="Syllabus size in MB")
+    p.add_argument("--days", type=int, default=180)
+    args = p.parse_args()
+
+    size = int(args.mb * 1024 * 1024)
+    print(f"{'heuristic':<12}{'topics':>8}{'peak MB':>10}{'retained MB':>13}{'time ms':>10}")
+    for name, text in syllabi(size):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        topics = extract_topics(text)
+        plan = generate_plan(topics, plan_length=args.days, hours_per_day=3.0)
+        elapsed = time.perf_counter() - t0
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # the syllabus text itself is allocated before tracing starts
+        print(f"{name:<12}{len(topics):>8}{peak / 2**20:>10.1f}{current / 2**20:>13.1f}{elapsed * 1000:>10.1f}")
+        del topics, plan
+
+
+if __name__ == "__main__":
+    main()
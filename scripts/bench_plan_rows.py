@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Progress queries and done-flag updates: plan_topics rows vs the plan_json blob.
+
+Usage:
+  python scripts/bench_plan_rows.py [--plans 500] [--days 180] [--ops 500]
+
+Seeds two temporary databases with the same `--plans` plans of `--days` days.
+One stores plan_json only; the other also keeps plan_days / plan_topics
+(store.NORMALIZE_PLANS). On each it times the work behind /plan_stats
+(store.plan_progress) and behind a one-topic /plan_progress patch: an
+indexed UPDATE on the rows, or read-decode-modify-encode-write of the whole
+blob. It also times the saves themselves, which pay for writing the rows.
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend import store
+from backend.migrations import migrate
+
+
+def make_plan(days):
+    return json.dumps({"plan": [{"day": d, "topics": [{"title": f"Chapter {d}.{i}: reaction kinetics and equilibrium constants",
+                                                      "estimated_minutes": 40} for i in range(3)],
+                                 "total_minutes": 120, "is_review": False, "daily_summary": f"Day {d}"}
+                                for d in range(1, days + 1)]})
+
+
+def percentiles(lat):
+    lat = sorted(lat)
+    return lat[len(lat) // 2] * 1000, lat[min(len(lat) - 1, int(0.99 * len(lat)))] * 1000
+
+
+def blob_patch(conn, plan_id, day, idx):
+    plan_json, version = store.get_plan_row(conn, plan_id)
+    plan_obj = json.loads(plan_json)
+    plan_obj["plan"][day - 1]["topics"][idx]["done"] = True
+    store.update_plan_json_if_version(conn, plan_id, json.dumps(plan_obj), version)
+
+
+def rows_patch(conn, plan_id, day, idx):
+    store.update_topics_done(conn, plan_id, store.plan_version(conn, plan_id), {(day, idx): True})
+
+
+def timed(conn, fn, calls, commit=False):
+    lat = []
+    for args in calls:
+        t0 = time.perf_counter()
+        fn(conn, *args)
+        if commit:
+            conn.commit()
+        lat.append(time.perf_counter() - t0)
+    return percentiles(lat)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--plans", type=int, default=500)
+    p.add_argument("--days", type=int, default=180)
+    p.add_argument("--ops", type=int, default=500)
+    args = p.parse_args()
+
+    plan_json = make_plan(args.days)
+    rng = random.Random(0)
+    ids = [rng.randint(1, args.plans) for _ in range(args.ops)]
+    patches = [(i, rng.randint(1, args.days), rng.randint(0, 2)) for i in ids]
+    print(f"plan_json {len(plan_json) / 1000:.0f} KB; p50 / p99 in ms")
+    print(f"{'storage':<10}{'save':>16}{'plan_stats':>16}{'patch 1 topic':>16}")
+    for label, normalize in (("plan_json", False), ("rows", True)):
+        store.NORMALIZE_PLANS = normalize
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = sqlite3.connect(os.path.join(tmp, "plans.db"))
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            migrate(conn)
+            save = timed(conn, store.insert_plan, [("2025-01-01T00:00:00", None, None, plan_json)] * args.plans, commit=True)
+            stats = timed(conn, store.plan_progress, [(i,) for i in ids])
+            patch = timed(conn, rows_patch if normalize else blob_patch, patches, commit=True)
+            conn.close()
+        print(f"{label:<10}" + "".join(f"{a:>8.2f} /{b:>6.2f}" for a, b in (save, stats, patch)))
+
+
+if __name__ == "__main__":
+    main()
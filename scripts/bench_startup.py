@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Cold-start cost of the backend: import time and time to first request.
+
+Usage:
+  python scripts/bench_startup.py [--runs 5]
+
+Every run is a fresh interpreter (as for a new worker) that imports
+backend.main and then serves GET /list_plans through a TestClient against an
+empty temporary database. Medians over `--runs` are reported, along with the
+heavy optional modules that were loaded by the import alone.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+HEAVY = ["reportlab", "cryptography", "pdfplumber", "PIL", "pytesseract", "easyocr", "torch"]
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import backend.main as m
+t1 = time.perf_counter()
+loaded = [name for name in HEAVY if name in sys.modules]
+from fastapi.testclient import TestClient
+client = TestClient(m.app)
+t2 = time.perf_counter()
+assert client.get("/list_plans").status_code == 200
+t3 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "first_request": t3 - t2, "to_first_response": (t1 - t0) + (t3 - t2), "loaded": loaded}))
+"""
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--runs", type=int, default=5)
+    args = p.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.runs):
+            env = dict(os.environ, PLANORA_DB_PATH=os.path.join(tmp, f"plans{i}.db"), PLANORA_TEXT_CACHE_DB="")
+            out = subprocess.run([sys.executable, "-c", f"HEAVY = {HEAVY!r}\n" + PROBE], cwd=ROOT, env=env,
+                                 capture_output=True, text=True, check=True)
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    for key in ("import", "first_request", "to_first_response"):
+        print(f"{key:<20}{statistics.median(r[key] for r in results) * 1000:>9.1f} ms")
+    print(f"{'loaded by import':<20} {', '.join(results[-1]['loaded']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
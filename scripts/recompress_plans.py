@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Rewrite stored plans in another plan_json storage format, in batches.
+
+Usage:
+  ./scripts/recompress_plans.py [--db backend/plans.db] [--format zlib|zstd|json] [--batch 500] [--vacuum] [--dry-run]
+
+The database is first brought up to the current schema version
+(backend/migrations.py). Rows are then read in id order, `--batch` at a time.
+Each row whose format differs from `--format` is re-encoded through
+backend/plan_codec.py. Every batch commits on its own, so a running server
+only waits for one short batch at a time. A row that the server rewrote
+since it was read is left alone, because the server's write already used the
+current format. Plan versions are not bumped, since the plan itself is
+unchanged.
+
+`--format` defaults to the server's setting (PLANORA_PLAN_COMPRESSION). Use
+`--format json` to undo compression. Freed pages are reused by later writes.
+Pass --vacuum to shrink the file itself. Database size, stored bytes per
+format and get_plan read latency are printed before and after.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend import plan_codec, store
+from backend.migrations import migrate
+
+
+def report(conn, db_path, label, sample):
+    size = sum(os.path.getsize(p) for p in (db_path, db_path + '-wal') if os.path.exists(p))
+    by_format = conn.execute('SELECT plan_format, COUNT(*), SUM(LENGTH(plan_json)) FROM plans GROUP BY plan_format').fetchall()
+    lat = []
+    for pid in sample:
+        t0 = time.perf_counter()
+        store.get_plan_row(conn, pid)
+        lat.append(time.perf_counter() - t0)
+    lat.sort()
+    print(f"{label}: file {size / 1e6:.1f} MB; "
+          + ", ".join(f"{fmt} {n} rows / {(stored or 0) / 1e6:.1f} MB" for fmt, n, stored in by_format))
+    if lat:
+        p50, p99 = lat[len(lat) // 2], lat[min(len(lat) - 1, int(0.99 * len(lat)))]
+        print(f"{label}: get_plan p50 {p50 * 1e6:.0f} us, p99 {p99 * 1e6:.0f} us over {len(lat)} reads")
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--db', default='backend/plans.db', help='Path to sqlite DB')
+    p.add_argument('--format', choices=plan_codec.FORMATS, default=plan_codec.WRITE_FORMAT,
+                   help='Target plan_json format (default: PLANORA_PLAN_COMPRESSION)')
+    p.add_argument('--batch', type=int, default=500, help='Rows per transaction')
+    p.add_argument('--sample', type=int, default=500, help='Plans read to measure get_plan latency')
+    p.add_argument('--vacuum', action='store_true', help='VACUUM afterwards to return freed pages to the OS')
+    p.add_argument('--dry-run', action='store_true', help='Do not write changes, just count them')
+    args = p.parse_args()
+
+    if args.format == 'zstd' and not plan_codec.ZSTD_AVAILABLE:
+        print("zstd needs the zstandard package (pip install zstandard)", file=sys.stderr)
+        sys.exit(2)
+    if not os.path.exists(args.db):
+        print(f"DB not found at {args.db}", file=sys.stderr)
+        sys.exit(2)
+
+    conn = sqlite3.connect(args.db, timeout=30)
+    # same schema upgrade the server applies on start (no-op when already current)
+    migrate(conn)
+    ids = [r[0] for r in conn.execute('SELECT id FROM plans')]
+    sample = random.Random(0).sample(ids, min(args.sample, len(ids)))
+    report(conn, args.db, "before", sample)
+
+    last_id, seen, rewritten, skipped = 0, 0, 0, 0
+    t0 = time.perf_counter()
+    while True:
+        rows = conn.execute('SELECT id, plan_json, plan_format, version FROM plans WHERE id>? ORDER BY id LIMIT ?',
+                            (last_id, args.batch)).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        seen += len(rows)
+        updates = []
+        for pid, stored, fmt, version in rows:
+            if fmt == args.format or stored is None:
+                continue
+            new_stored, new_fmt = plan_codec.encode(plan_codec.decode(stored, fmt), args.format)
+            if new_fmt != fmt:
+                updates.append((new_stored, new_fmt, pid, version))
+        if args.dry_run:
+            rewritten += len(updates)
+            continue
+        with conn:
+            for u in updates:
+                # skip rows the server changed since we read them
+                if conn.execute('UPDATE plans SET plan_json=?, plan_format=? WHERE id=? AND version=?', u).rowcount:
+                    rewritten += 1
+                else:
+                    skipped += 1
+        print(f"  ... {seen} rows checked, {rewritten} rewritten", end='\r')
+
+    if seen and not args.dry_run:
+        print()
+    prefix = "[DRY] would rewrite" if args.dry_run else "rewrote"
+    print(f"{prefix} {rewritten} of {seen} rows to {args.format} in {time.perf_counter() - t0:.1f}s"
+          + (f" ({skipped} changed concurrently, left as written)" if skipped else ""))
+    if args.vacuum and not args.dry_run:
+        conn.execute('VACUUM')
+        # in WAL mode the vacuumed pages land in the -wal file first
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    report(conn, args.db, "after", sample)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
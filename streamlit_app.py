@@ -9,6 +9,73 @@ st.title("📚 Planora — AI Study Plan Generator")
 
 st.markdown("Upload a syllabus (PDF) or paste the syllabus text, choose your exam date, hours per day, and plan length.")
 
+
+def _done_flags(plan_obj, token):
+    """{(day, 0-based topic index): done} from the checkboxes shown under `token`; also recorded on the topics."""
+    flags = {}
+    for day in plan_obj.get('plan', []):
+        for i, t in enumerate(day.get('topics', []), 1):
+            t['done'] = bool(st.session_state.get(f"done_{token}_{day['day']}_{i}", t.get('done', False)))
+            flags[(day['day'], i - 1)] = t['done']
+    return flags
+
+
+def _activate_loaded_plan(plan_obj, plan_id, version):
+    """Show a plan read from the server: fresh checkbox keys seeded with its done flags, which count as synced."""
+    import uuid
+    token = str(uuid.uuid4())
+    st.session_state['active_plan'] = plan_obj
+    st.session_state['active_plan_token'] = token
+    st.session_state['active_plan_id'] = plan_id
+    st.session_state['plan_version'] = version
+    for day in plan_obj.get('plan', []):
+        for i, t in enumerate(day.get('topics', []), 1):
+            st.session_state[f"done_{token}_{day['day']}_{i}"] = bool(t.get('done', False))
+    st.session_state['synced_done'] = ((plan_id, token), _done_flags(plan_obj, token))
+
+
+def _auto_save_progress():
+    """Send only the done flags that changed since the last sync to /plan_progress.
+
+    When the version is unknown or the server reports a conflict (the plan
+    was changed elsewhere), the server's copy is fetched and the local
+    changes are replayed on top of it, so other edits are never overwritten.
+    """
+    plan_id = st.session_state.get('active_plan_id')
+    token = st.session_state.get('active_plan_token', '')
+    flags = _done_flags(st.session_state.get('active_plan'), token)
+    synced = st.session_state.get('synced_done')
+    if not synced or synced[0] != (plan_id, token):
+        synced = ((plan_id, token), {})
+    changes = {(d, i): v for (d, i), v in flags.items() if synced[1].get((d, i)) != v}
+    for _attempt in range(3):
+        if not changes:
+            break
+        version = st.session_state.get('plan_version')
+        if version is not None:
+            j = requests.patch("http://localhost:8000/plan_progress", data={"id": plan_id, "version": version, "changes": json.dumps([[d, i, v] for (d, i), v in changes.items()])}, timeout=5).json()
+            if j.get('ok'):
+                st.session_state['plan_version'] = j.get('version')
+                break
+            if j.get('error') != 'version_conflict':
+                return
+        # re-read the plan and its version, then retry with the changes it doesn't have yet
+        r = requests.get(f"http://localhost:8000/get_plan?id={plan_id}", timeout=5)
+        server = r.json()
+        if server.get('error'):
+            return
+        st.session_state['plan_version'] = r.headers.get('X-Plan-Version')
+        server_flags = {}
+        for day in server.get('plan', []):
+            for i, t in enumerate(day.get('topics', [])):
+                server_flags[(day.get('day'), i)] = bool(t.get('done', False))
+        # topics the server plan no longer has (e.g. rescheduled elsewhere) can't be replayed
+        changes = {k: v for k, v in changes.items() if k in server_flags and server_flags[k] != v}
+    else:
+        return
+    st.session_state['synced_done'] = ((plan_id, token), flags)
+
+
 # --- Simple account UI ---
 if 'user' not in st.session_state:
     st.session_state['user'] = None
@@ -185,6 +252,9 @@ if submit:
             token = str(uuid.uuid4())
             st.session_state['active_plan_token'] = token
             st.session_state['active_plan'] = plan
+            # a freshly generated plan is not on the server until it is saved
+            st.session_state['active_plan_id'] = None
+            st.session_state['plan_version'] = None
 
             # Helper to reset topic-done keys when a new plan is loaded/generated
             def _init_topic_keys(plan_obj, token_key):
@@ -192,7 +262,8 @@ if submit:
                     for i, t in enumerate(day.get('topics', []), 1):
                         key = f"done_{token_key}_{day['day']}_{i}"
                         if key not in st.session_state:
-                            st.session_state[key] = False
+                            # rescheduled plans keep the done flags of their completed days
+                            st.session_state[key] = bool(t.get('done', False))
 
             _init_topic_keys(plan, token)
 
@@ -238,6 +309,7 @@ if submit:
                 if st.button("💾 Save Plan to Server"):
                     try:
                         plan_to_save = st.session_state['active_plan'].copy()
+                        saved_flags = _done_flags(plan_to_save, st.session_state.get('active_plan_token', ''))
                         plan_to_save['review_day_fraction'] = float(review_frac_pct) / 100.0
                         payload = {"plan": json.dumps(plan_to_save), "course_type": course_type, "exam_date": str(exam_date)}
                         if st.session_state.get('user_id'):
@@ -247,6 +319,10 @@ if submit:
                         pid = resp.json().get('id')
                         st.success(f"Plan saved with id: {pid}")
                         st.session_state['last_saved_plan_id'] = pid
+                        st.session_state['active_plan_id'] = pid
+                        st.session_state['plan_version'] = resp.json().get('version')
+                        # the server now has exactly these flags
+                        st.session_state['synced_done'] = ((pid, st.session_state.get('active_plan_token', '')), saved_flags)
                     except Exception as e:
                         st.error(f"Failed to save plan: {e}")
                 # Auto-save toggle
@@ -265,7 +341,7 @@ if submit:
                             if loaded.get('error'):
                                 st.error(f"Load failed: {loaded.get('error')}")
                             else:
-                                st.session_state['active_plan'] = loaded
+                                _activate_loaded_plan(loaded, int(load_id), r.headers.get('X-Plan-Version'))
                                 # Set exam_date if present
                                 try:
                                     # store exam_date for reschedule calculations
@@ -301,7 +377,7 @@ if submit:
                                         if loaded.get('error'):
                                             st.error(f"Load failed: {loaded.get('error')}")
                                         else:
-                                            st.session_state['active_plan'] = loaded
+                                            _activate_loaded_plan(loaded, sid, r2.headers.get('X-Plan-Version'))
                                             st.session_state['loaded_exam_date'] = loaded.get('exam_date')
                                             if 'review_day_fraction' in loaded:
                                                 st.session_state['loaded_review_frac_pct'] = int(loaded['review_day_fraction'] * 100)
@@ -361,9 +437,28 @@ if submit:
                                     payload['review_day_fraction'] = float(review_frac_pct) / 100.0
                                 except Exception:
                                     pass
-                                r = requests.post("http://localhost:8000/plan", data=payload, timeout=20)
+                                saved_id = st.session_state.get('active_plan_id')
+                                if saved_id:
+                                    # saved plans are rescheduled server-side: completed days stay, only remaining minutes move
+                                    done_flags = []
+                                    for day in active.get('plan', []):
+                                        for i, t in enumerate(day.get('topics', []), 1):
+                                            key = f"done_{st.session_state.get('active_plan_token','')}_{day['day']}_{i}"
+                                            done_flags.append([day['day'], i - 1, bool(st.session_state.get(key, False))])
+                                    # the same hours, exam type and review share as a fresh plan from this form
+                                    form = {k: v for k, v in payload.items() if k in ("hours_per_day", "exam_type", "review_day_fraction")}
+                                    r = requests.post("http://localhost:8000/reschedule", data={"id": saved_id, "plan_length": days_left, "done": json.dumps(done_flags), **form}, timeout=20)
+                                else:
+                                    r = requests.post("http://localhost:8000/plan", data=payload, timeout=20)
                                 r.raise_for_status()
                                 new_plan = r.json()
+                                if new_plan.get('error'):
+                                    raise RuntimeError(new_plan['error'])
+                                if saved_id:
+                                    # the server's copy, done flags included, is what this session now has
+                                    _activate_loaded_plan(new_plan, saved_id, r.headers.get('X-Plan-Version'))
+                                    st.success(f"Rescheduled remaining {len(remaining)} topics across {days_left} days")
+                                    st.experimental_rerun()
                                 st.session_state['active_plan'] = new_plan
                                 # re-init topic keys for the new plan
                                 new_token = str(uuid.uuid4())
@@ -374,15 +469,9 @@ if submit:
                             except Exception as e:
                                 st.error(f"Reschedule failed: {e}")
             # If auto-save enabled, persist progress to server (non-blocking)
-            if st.session_state.get('auto_save') and st.session_state.get('last_saved_plan_id'):
+            if st.session_state.get('auto_save') and st.session_state.get('active_plan_id'):
                 try:
-                    active_plan = st.session_state.get('active_plan')
-                    # annotate plan topics with done flags
-                    for day in active_plan.get('plan', []):
-                        for i, t in enumerate(day.get('topics', []), 1):
-                            key = f"done_{st.session_state.get('active_plan_token','')}_{day['day']}_{i}"
-                            t['done'] = bool(st.session_state.get(key, False))
-                    requests.post("http://localhost:8000/update_plan", data={"id": st.session_state.get('last_saved_plan_id'), "plan": json.dumps(active_plan)}, timeout=5)
+                    _auto_save_progress()
                 except Exception:
                     pass
 
@@ -582,14 +671,9 @@ if submit:
                                 done = st.checkbox(f"{i}. {t['title']} — {fmt(est_min)}", value=st.session_state.get(key, False), key=key)
 
                     # Auto-save for active plan (if enabled and saved previously)
-                    if st.session_state.get('auto_save') and st.session_state.get('last_saved_plan_id'):
+                    if st.session_state.get('auto_save') and st.session_state.get('active_plan_id'):
                         try:
-                            active_plan = st.session_state.get('active_plan')
-                            for day in active_plan.get('plan', []):
-                                for i, t in enumerate(day.get('topics', []), 1):
-                                    key = f"done_{st.session_state.get('active_plan_token','')}_{day['day']}_{i}"
-                                    t['done'] = bool(st.session_state.get(key, False))
-                            requests.post("http://localhost:8000/update_plan", data={"id": st.session_state.get('last_saved_plan_id'), "plan": json.dumps(active_plan)}, timeout=5)
+                            _auto_save_progress()
                         except Exception:
                             pass
 
@@ -601,6 +685,7 @@ if submit:
                         if st.button("💾 Save Plan to Server", key="save_active"):
                             try:
                                 plan_to_save = st.session_state['active_plan'].copy()
+                                saved_flags = _done_flags(plan_to_save, st.session_state.get('active_plan_token', ''))
                                 frac_to_use = st.session_state.get('loaded_review_frac_pct', default_frac) if not submit else review_frac_pct
                                 plan_to_save['review_day_fraction'] = float(frac_to_use) / 100.0
                                 resp = requests.post("http://localhost:8000/save_plan", data={"plan": json.dumps(plan_to_save), "course_type": course_type, "exam_date": str(exam_date)}, timeout=10)
@@ -608,6 +693,9 @@ if submit:
                                 pid = resp.json().get('id')
                                 st.success(f"Plan saved with id: {pid}")
                                 st.session_state['last_saved_plan_id'] = pid
+                                st.session_state['active_plan_id'] = pid
+                                st.session_state['plan_version'] = resp.json().get('version')
+                                st.session_state['synced_done'] = ((pid, st.session_state.get('active_plan_token', '')), saved_flags)
                             except Exception as e:
                                 st.error(f"Failed to save plan: {e}")
                     with col_s2:
@@ -623,7 +711,7 @@ if submit:
                                     if loaded.get('error'):
                                         st.error(f"Load failed: {loaded.get('error')}")
                                     else:
-                                        st.session_state['active_plan'] = loaded
+                                        _activate_loaded_plan(loaded, int(load_id), r.headers.get('X-Plan-Version'))
                                         st.session_state['loaded_exam_date'] = loaded.get('exam_date')
                                         st.experimental_rerun()
                             except Exception as e:
@@ -674,10 +762,28 @@ if submit:
                                             payload['review_day_fraction'] = float(review_frac_pct) / 100.0
                                         except Exception:
                                             pass
-                                        r = requests.post("http://localhost:8000/plan", data=payload, timeout=20)
+                                        saved_id = st.session_state.get('active_plan_id')
+                                        if saved_id:
+                                            # saved plans are rescheduled server-side: completed days stay, only remaining minutes move
+                                            done_flags = []
+                                            for day in active.get('plan', []):
+                                                for i, t in enumerate(day.get('topics', []), 1):
+                                                    key = f"done_{st.session_state.get('active_plan_token','')}_{day['day']}_{i}"
+                                                    done_flags.append([day['day'], i - 1, bool(st.session_state.get(key, False))])
+                                            # the same hours, exam type and review share as a fresh plan from this form
+                                            form = {k: v for k, v in payload.items() if k in ("hours_per_day", "exam_type", "review_day_fraction")}
+                                            r = requests.post("http://localhost:8000/reschedule", data={"id": saved_id, "plan_length": days_left, "done": json.dumps(done_flags), **form}, timeout=20)
+                                        else:
+                                            r = requests.post("http://localhost:8000/plan", data=payload, timeout=20)
                                         r.raise_for_status()
                                         new_plan = r.json()
-                                        new_plan = r.json()
+                                        if new_plan.get('error'):
+                                            raise RuntimeError(new_plan['error'])
+                                        if saved_id:
+                                            # the server's copy, done flags included, is what this session now has
+                                            _activate_loaded_plan(new_plan, saved_id, r.headers.get('X-Plan-Version'))
+                                            st.success(f"Rescheduled remaining {len(remaining)} topics across {days_left} days")
+                                            st.experimental_rerun()
                                         st.session_state['active_plan'] = new_plan
                                         new_token = str(uuid.uuid4())
                                         st.session_state['active_plan_token'] = new_token
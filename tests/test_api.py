@@ -1,6 +1,8 @@
 import json
 import os
 import sys
+
+import pytest
 from fastapi.testclient import TestClient
 
 # Ensure repository root is on sys.path so `backend` package imports work during tests
@@ -14,6 +16,18 @@ from backend.main import app
 client = TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def tmp_text_cache(tmp_path, monkeypatch):
+    # keep /plan uploads out of the working tree's backend/text_cache.db
+    from backend import main as backend_main
+    from backend.text_cache import TextCache
+
+    cache = TextCache(db_path=str(tmp_path / "text_cache.db"))
+    monkeypatch.setattr(backend_main, "text_cache", cache)
+    yield cache
+    cache.shutdown()
+
+
 def test_plan_with_manual_topics():
     data = {
         "topics_text": "Topic A\nTopic B\nTopic C",
@@ -75,3 +89,592 @@ def test_ocr_status_endpoint():
     assert resp.status_code == 200
     j = resp.json()
     assert 'pytesseract_installed' in j and 'easyocr_installed' in j
+
+
+def test_plan_sweep_grid():
+    data = {
+        "syllabus_text": "Chapter 1: Intro\nBasics of course.\n\nChapter 2: Advanced\nHard topics.",
+        "exam_type": "final",
+        "hours_per_day": "1,2",
+        "plan_length": "[7, 14, 30]",
+    }
+    resp = client.post("/plan_sweep", data=data)
+    assert resp.status_code == 200
+    j = resp.json()
+    assert len(j["grid"]) == 6
+    point = next(g for g in j["grid"] if g["hours_per_day"] == 2.0 and g["plan_length"] == 14)
+    # Sweep sizing must agree with a full /plan call for the same inputs
+    plan = client.post("/plan", data={"syllabus_text": data["syllabus_text"], "hours_per_day": 2.0, "plan_length": 14}).json()
+    assert point["review_days"] == sum(1 for d in plan["plan"] if d["is_review"])
+    assert point["study_minutes"] == sum(d["total_minutes"] for d in plan["plan"])
+
+
+@pytest.mark.parametrize("hours", ["nan", "1,inf", "-inf", "[2, NaN]"])
+def test_plan_sweep_rejects_non_finite_hours(hours):
+    resp = client.post("/plan_sweep", data={"topics_text": "Limits\nDerivatives", "hours_per_day": hours, "plan_length": "7"})
+    assert resp.status_code == 200
+    assert "error" in resp.json()
+
+
+def _make_pdf(pages):
+    import io
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=letter)
+    for i in range(pages):
+        c.drawString(40, 700, f"Chapter {i + 1} Topic number {i + 1}")
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def test_pdf_upload_extracted_in_page_order():
+    from backend import main as backend_main
+    from backend.extraction import PdfExtractionPool
+
+    pool = PdfExtractionPool(workers=2, queue_depth=4, pages_per_chunk=3)
+    original, backend_main.pdf_pool = backend_main.pdf_pool, pool
+    try:
+        pdf = _make_pdf(8)
+        resp = client.post("/plan", files={"file": ("syllabus.pdf", pdf, "application/pdf")}, data={"plan_length": 7})
+        assert resp.status_code == 200
+        titles = [t["title"] for d in resp.json()["plan"] for t in d["topics"]]
+        assert titles[0].startswith("Chapter 1 ")
+        assert resp.json()["topics_count"] == 8
+        assert pool.pending == 0
+    finally:
+        pool.shutdown()
+        backend_main.pdf_pool = original
+
+
+def test_pdf_queue_full_returns_503():
+    from backend import main as backend_main
+    from backend.extraction import PdfExtractionPool
+
+    pool = PdfExtractionPool(workers=1, queue_depth=0)
+    original, backend_main.pdf_pool = backend_main.pdf_pool, pool
+    try:
+        resp = client.post("/plan", files={"file": ("syllabus.pdf", _make_pdf(1), "application/pdf")})
+        assert resp.status_code == 503
+        assert "retry-after" in resp.headers
+    finally:
+        backend_main.pdf_pool = original
+
+
+def test_plan_rejects_bad_ocr_languages():
+    resp = client.post("/plan", data={"topics_text": "A\nB", "ocr_languages": "en,../x"})
+    assert resp.status_code == 200
+    assert "error" in resp.json()
+
+
+def test_ocr_queue_full_returns_503_fast():
+    from backend import main as backend_main
+    from backend.extraction import OcrWorkerPool
+
+    pool = OcrWorkerPool(workers=1, queue_size=0, deadline=5)
+    pool.in_flight = pool.capacity  # every worker slot and queue slot taken
+    original, backend_main.ocr_pool = backend_main.ocr_pool, pool
+    try:
+        resp = client.post("/plan", files={"image": ("photo.png", b"not-really-a-png-1", "image/png")})
+        assert resp.status_code == 503
+        assert int(resp.headers["retry-after"]) >= 1
+        assert client.get("/ocr_status").json()["ocr_pool"]["rejected"] == 1
+    finally:
+        backend_main.ocr_pool = original
+
+
+def test_ocr_deadline_returns_503():
+    from backend import main as backend_main
+    from backend.extraction import OcrWorkerPool
+
+    pool = OcrWorkerPool(workers=1, queue_size=1, deadline=0.001)
+    original, backend_main.ocr_pool = backend_main.ocr_pool, pool
+    try:
+        resp = client.post("/plan", files={"image": ("photo.png", b"not-really-a-png-2", "image/png")})
+        assert resp.status_code == 503
+        assert pool.status()["deadline_exceeded"] == 1
+    finally:
+        pool.shutdown()
+        backend_main.ocr_pool = original
+
+
+def test_ocr_status_reports_pool_timings():
+    from backend import main as backend_main
+    from backend.extraction import OcrWorkerPool
+
+    pool = OcrWorkerPool(workers=0, queue_size=2)
+    original, backend_main.ocr_pool = backend_main.ocr_pool, pool
+    try:
+        client.post("/plan", files={"image": ("photo.png", b"not-really-a-png-3", "image/png")},
+                    data={"syllabus_text": "Chapter 1: Fallback\nText when OCR finds nothing."})
+        status = client.get("/ocr_status").json()["ocr_pool"]
+        assert status["completed"] == 1 and status["in_flight"] == 0
+        assert status["ocr_s_p50"] is not None and status["wait_s_p50"] is not None
+    finally:
+        backend_main.ocr_pool = original
+
+
+@pytest.fixture
+def tmp_db(tmp_path, monkeypatch):
+    # keep the tracked backend/plans.db out of API tests
+    from backend import main as backend_main
+    from backend.db import ConnectionPool
+    from backend.hot_plans import HotPlanCache
+    from backend.migrations import migrate
+
+    pool = ConnectionPool(str(tmp_path / "plans.db"), setup=migrate)
+    monkeypatch.setattr(backend_main, "db", pool)
+    # cached plans belong to the database they were read from
+    monkeypatch.setattr(backend_main, "hot_plans", HotPlanCache())
+    yield pool
+    pool.shutdown()
+
+
+def test_reschedule_saved_plan(tmp_db):
+    plan = client.post("/plan", data={"topics_text": "Limits\nDerivatives\nIntegrals", "plan_length": 6, "hours_per_day": 1.0}).json()
+    assert [t["title"] for t in plan["topics"]] == ["Limits", "Derivatives", "Integrals"]
+    pid = client.post("/save_plan", data={"plan": json.dumps(plan)}).json()["id"]
+
+    done = [[1, i, True] for i in range(len(plan["plan"][0]["topics"]))]
+    resp = client.post("/reschedule", data={"id": pid, "plan_length": 3, "done": json.dumps(done)})
+    j = resp.json()
+    assert j["plan"][0]["topics"] == [dict(t, done=True) for t in plan["plan"][0]["topics"]]
+    assert j["plan_length"] == len(j["plan"])
+    assert client.get(f"/get_plan?id={pid}").json()["plan"] == j["plan"]
+
+    assert client.post("/reschedule", data={"id": pid + 1, "plan_length": 3}).json() == {"error": "not found"}
+    assert "error" in client.post("/reschedule", data={"id": pid, "plan_length": 3, "done": "nope"}).json()
+
+
+def test_reschedule_starts_new_days_on_the_current_day(tmp_db):
+    from datetime import date, timedelta
+
+    plan = client.post("/plan", data={"topics_text": "Limits\nDerivatives\nIntegrals", "plan_length": 6, "hours_per_day": 1.0}).json()
+    pid = client.post("/save_plan", data={"plan": json.dumps(plan)}).json()["id"]
+    as_of = (date.today() + timedelta(days=9)).isoformat()
+
+    j = client.post("/reschedule", data={"id": pid, "plan_length": 3, "as_of": as_of, "hours_per_day": 2.0,
+                                         "exam_type": "regular_test", "review_day_fraction": 0.0}).json()
+    assert [d["day"] for d in j["plan"]] == [10, 11, 12]
+    assert (j["hours_per_day"], j["exam_type"], j["review_day_fraction"]) == (2.0, "regular_test", 0.0)
+    stats = client.get(f"/plan_stats?id={pid}&as_of={as_of}").json()
+    assert stats["current_day"] == 10 and stats["overdue_days"] == []
+
+    assert "error" in client.post("/reschedule", data={"id": pid, "plan_length": 3, "as_of": "soon"}).json()
+
+
+def test_plan_progress_patch_applies_changes_with_version_check(tmp_db):
+    plan = client.post("/plan", data={"topics_text": "Limits\nDerivatives", "plan_length": 4}).json()
+    saved = client.post("/save_plan", data={"plan": json.dumps(plan)}).json()
+    pid = saved["id"]
+    assert saved["version"] == 0
+
+    resp = client.patch("/plan_progress", data={"id": pid, "version": 0, "changes": json.dumps([[1, 0, True]])})
+    assert resp.json() == {"ok": True, "version": 1, "applied": 1}
+    got = client.get(f"/get_plan?id={pid}")
+    assert got.headers["X-Plan-Version"] == "1"
+    assert got.json()["plan"][0]["topics"][0]["done"] is True
+
+    # a stale version is rejected without writing
+    stale = client.patch("/plan_progress", data={"id": pid, "version": 0, "changes": json.dumps([[1, 0, False]])})
+    assert stale.json() == {"error": "version_conflict", "version": 1}
+    assert client.get(f"/get_plan?id={pid}").json()["plan"][0]["topics"][0]["done"] is True
+
+    bad = client.patch("/plan_progress", data={"id": pid, "version": 1, "changes": json.dumps([[1, 99, True]])})
+    assert "error" in bad.json()
+    assert client.post("/update_plan", data={"id": pid, "plan": json.dumps(plan)}).json() == {"ok": True, "version": 2}
+
+
+def _p99(values):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+
+
+def test_read_latency_holds_during_write_burst(tmp_db, monkeypatch):
+    import asyncio
+    import time
+
+    import httpx
+    from backend import store
+
+    from backend import main as backend_main
+    from backend.hot_plans import HotPlanCache
+
+    # measure the database read path: cache hits would never wait on it
+    monkeypatch.setattr(backend_main, "hot_plans", HotPlanCache(max_bytes=0))
+    pid = client.post("/save_plan", data={"plan": json.dumps({"plan": []})}).json()["id"]
+    insert_plan = store.insert_plan
+
+    def slow_insert(*args):
+        time.sleep(0.05)  # stand-in for a slow fsync or a lock wait
+        return insert_plan(*args)
+
+    monkeypatch.setattr(store, "insert_plan", slow_insert)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            async def timed_read():
+                t0 = time.perf_counter()
+                assert (await ac.get(f"/get_plan?id={pid}")).status_code == 200
+                return time.perf_counter() - t0
+
+            baseline = [await timed_read() for _ in range(30)]
+            writes = [asyncio.create_task(ac.post("/save_plan", data={"plan": "{}"})) for _ in range(20)]
+            during = []
+            while not all(w.done() for w in writes):
+                during.append(await timed_read())
+            ids = [(await w).json()["id"] for w in writes]
+            return baseline, during, ids
+
+    baseline, during, ids = asyncio.run(scenario())
+    assert len(set(ids)) == 20
+    # writes run on the writer thread: reads never wait behind a 50 ms write
+    assert len(during) > 20
+    assert _p99(during) < 0.05, (_p99(baseline), _p99(during))
+
+
+def test_import_is_lazy(tmp_path):
+    import subprocess
+
+    db_path = tmp_path / "plans.db"
+    code = ("import sys, backend.main; "
+            "print(','.join(m for m in ('reportlab', 'cryptography', 'pdfplumber', 'PIL', 'pytesseract', 'easyocr') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True,
+                         env=dict(os.environ, PLANORA_DB_PATH=str(db_path), PLANORA_TEXT_CACHE_DB=""))
+    assert out.stdout.strip() == ""
+    # the schema is created on first use, not at import
+    assert not db_path.exists()
+
+
+def test_gcal_revoke_queries_revoked_column(tmp_db):
+    # `revoked` used to be created only by the admin script
+    assert client.post("/gcal_revoke", data={"plan_id": 1}).json() == {"results": []}
+
+
+def test_list_plans_keyset_pages_projection_and_ndjson(tmp_db, monkeypatch):
+    from backend import main as backend_main
+
+    monkeypatch.setattr(backend_main, "LIST_PLANS_MAX_LIMIT", 3)
+    ids = [client.post("/save_plan", data={"plan": "{}", "course_type": f"c{i}", "user_id": 1 + i % 2}).json()["id"]
+           for i in range(8)]
+    newest_first = ids[::-1]
+
+    # pages are capped server-side and chained by next_cursor
+    seen, cursor = [], None
+    while True:
+        page = client.get("/list_plans", params={"limit": 100, **({"cursor": cursor} if cursor else {})}).json()
+        assert 0 < len(page["plans"]) <= 3
+        seen += [p["id"] for p in page["plans"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == newest_first
+
+    page = client.get("/list_plans", params={"user_id": 2, "fields": "course_type"}).json()
+    assert page["plans"][0] == {"id": ids[7], "course_type": "c7"}
+    assert "error" in client.get("/list_plans", params={"fields": "plan_json"}).json()
+    assert client.get("/list_plans", params={"cursor": "garbage"}).json() == {"error": "invalid_cursor"}
+
+    # NDJSON streams the whole listing, page by page
+    resp = client.get("/list_plans", params={"format": "ndjson", "fields": "id"})
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in resp.text.splitlines()] == [{"id": i} for i in newest_first]
+
+    # ...or `limit` rows, then where to resume
+    lines = [json.loads(l) for l in client.get("/list_plans", params={"format": "ndjson", "limit": 5}).text.splitlines()]
+    assert [l["id"] for l in lines[:5]] == newest_first[:5]
+    rest = client.get("/list_plans", params={"cursor": lines[5]["next_cursor"]}).json()
+    assert [p["id"] for p in rest["plans"]] == newest_first[5:]
+
+
+def test_plan_rows_serve_progress_queries_and_topic_updates(tmp_db, monkeypatch):
+    from backend import store
+
+    monkeypatch.setattr(store, "NORMALIZE_PLANS", True)
+    plan = client.post("/plan", data={"topics_text": "Limits\nDerivatives\nIntegrals", "plan_length": 3}).json()
+    pid = client.post("/save_plan", data={"plan": json.dumps(plan)}).json()["id"]
+    n_topics = sum(len(d["topics"]) for d in plan["plan"])
+    today = client.get("/plan_stats", params={"id": pid}).json()
+    assert today["source"] == "rows" and today["topics"] == n_topics and today["topics_done"] == 0
+    assert today["current_day"] == 1 and today["next_day"] == 1 and today["overdue_days"] == []
+
+    # flags go to plan_topics only; get_plan still shows them
+    first_day = [[1, i, True] for i in range(len(plan["plan"][0]["topics"]))]
+    resp = client.patch("/plan_progress", data={"id": pid, "version": 0, "changes": json.dumps(first_day)})
+    assert resp.json() == {"ok": True, "version": 1, "applied": len(first_day)}
+    got = client.get(f"/get_plan?id={pid}")
+    assert got.headers["X-Plan-Version"] == "1"
+    assert all(t["done"] for t in got.json()["plan"][0]["topics"])
+
+    later = client.get("/plan_stats", params={"id": pid, "as_of": "2999-01-01"}).json()
+    open_days = [d["day"] for d in plan["plan"][1:] if d["topics"]]
+    assert later["topics_done"] == len(first_day) and later["days_done"] == len(plan["plan"]) - len(open_days)
+    assert later["next_day"] == open_days[0] and later["overdue_days"] == open_days
+
+    assert client.patch("/plan_progress", data={"id": pid, "version": 0, "changes": "[[2, 0, true]]"}).json() == \
+        {"error": "version_conflict", "version": 1}
+    assert "error" in client.patch("/plan_progress", data={"id": pid, "version": 1, "changes": "[[1, 99, true]]"}).json()
+    assert client.get("/plan_stats", params={"id": pid}).json()["version"] == 1
+
+    # a full write replaces the rows and the overlay; without rows the blob answers the same
+    assert client.post("/update_plan", data={"id": pid, "plan": got.text}).json() == {"ok": True, "version": 2}
+    monkeypatch.setattr(store, "NORMALIZE_PLANS", False)
+    legacy = client.post("/save_plan", data={"plan": got.text}).json()["id"]
+    from_rows = client.get("/plan_stats", params={"id": pid, "as_of": "2999-01-01"}).json()
+    from_json = client.get("/plan_stats", params={"id": legacy, "as_of": "2999-01-01"}).json()
+    assert from_json["source"] == "plan_json"
+    for key in ("days", "topics", "topics_done", "minutes", "minutes_done", "days_done", "next_day", "overdue_days"):
+        assert from_rows[key] == from_json[key], key
+
+
+def test_get_plan_sends_stored_json_as_is(tmp_db):
+    stored = '{"plan": [{"day": 1, "topics": []}],   "note": "café"}'
+    pid = client.post("/save_plan", data={"plan": stored}).json()["id"]
+    got = client.get(f"/get_plan?id={pid}")
+    assert got.headers["content-type"] == "application/json"
+    assert got.headers["X-Plan-Version"] == "0"
+    assert got.content == stored.encode("utf-8")
+
+    # text that isn't JSON comes back wrapped, as it always did
+    pid = client.post("/save_plan", data={"plan": "day 1: read chapter 2"}).json()["id"]
+    assert client.get(f"/get_plan?id={pid}").json() == {"plan": "day 1: read chapter 2"}
+    assert client.get("/get_plan?id=999").json() == {"error": "not found"}
+
+
+@pytest.mark.parametrize("orjson", [True, False])
+def test_fast_json_matches_stdlib_output(monkeypatch, orjson):
+    from backend import fastjson
+
+    monkeypatch.setattr(fastjson, "ORJSON_AVAILABLE", orjson)
+    content = {"plan": [{"day": 1, "topics": [{"title": "Ünits", "estimated_minutes": 30}], "is_review": False}],
+               "review_day_fraction": None, "hours_per_day": 1.5, "tags": {"a"}}
+    assert json.loads(fastjson.dumps(content)) == dict(content, tags=["a"])
+    assert fastjson.loads(fastjson.dumps(content))["plan"][0]["topics"][0]["title"] == "Ünits"
+
+
+def test_get_plan_is_served_from_hot_plans_until_written(tmp_db, monkeypatch):
+    from backend import main as backend_main
+    from backend.hot_plans import HotPlanCache
+
+    monkeypatch.setattr(backend_main, "hot_plans", HotPlanCache(max_bytes=1 << 20))
+    pid = client.post("/save_plan", data={"plan": json.dumps({"plan": [{"day": 1, "topics": [{"title": "A"}]}]})}).json()["id"]
+    first = client.get(f"/get_plan?id={pid}")
+    assert client.get(f"/get_plan?id={pid}").content == first.content
+    stats = client.get("/cache_stats").json()["hot_plans"]
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+    client.patch("/plan_progress", data={"id": pid, "version": 0, "changes": "[[1, 0, true]]"})
+    got = client.get(f"/get_plan?id={pid}")
+    assert got.headers["X-Plan-Version"] == "1" and got.json()["plan"][0]["topics"][0]["done"] is True
+
+    # a stale entry (e.g. written by another process) doesn't fake a version conflict
+    backend_main.hot_plans.put(pid, first.content, 0, backend_main.hot_plans.token())
+    resp = client.patch("/plan_progress", data={"id": pid, "version": 1, "changes": "[[1, 0, false]]"})
+    assert resp.json() == {"ok": True, "version": 2, "applied": 1}
+    assert client.get(f"/get_plan?id={pid}").json()["plan"][0]["topics"][0]["done"] is False
+
+
+def test_conditional_requests_answer_304_until_the_plan_changes(tmp_db, monkeypatch):
+    from backend import main as backend_main
+    from backend.exports import ExportPool
+
+    monkeypatch.setattr(backend_main, "export_pool", ExportPool(workers=0))
+    plan = client.post("/plan", data={"topics_text": "Limits\nDerivatives", "plan_length": 3}).json()
+    pid = client.post("/save_plan", data={"plan": json.dumps(plan), "user_id": 7}).json()["id"]
+
+    got = client.get(f"/get_plan?id={pid}")
+    etag = got.headers["ETag"]
+    assert client.get(f"/get_plan?id={pid}", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(f"/get_plan?id={pid}", headers={"If-None-Match": f'"x", W/{etag}'}).status_code == 304
+
+    listing = client.get("/list_plans?user_id=7")
+    list_etag = listing.headers["ETag"]
+    assert client.get("/list_plans?user_id=7", headers={"If-None-Match": list_etag}).status_code == 304
+
+    ics = client.get(f"/export_ics?id={pid}&start=2025-01-06")
+    assert ics.headers["content-type"].startswith("text/calendar")
+    assert "DTSTART;VALUE=DATE:20250106" in ics.text and ics.text.count("BEGIN:VEVENT") == len(plan["plan"])
+    assert client.get(f"/export_ics?id={pid}&start=2025-01-06", headers={"If-None-Match": ics.headers["ETag"]}).status_code == 304
+    assert client.get(f"/export_ics?id={pid}&start=2025-01-07", headers={"If-None-Match": ics.headers["ETag"]}).status_code == 200
+
+    pdf = client.get(f"/export_pdf?id={pid}")
+    assert pdf.content.startswith(b"%PDF") and client.get(f"/export_pdf?id={pid}").content == pdf.content
+    assert client.get(f"/export_pdf?id={pid}", headers={"If-None-Match": pdf.headers["ETag"]}).status_code == 304
+
+    # a progress write bumps the version and with it every plan-derived ETag
+    client.patch("/plan_progress", data={"id": pid, "version": 0, "changes": "[[1, 0, true]]"})
+    assert client.get(f"/get_plan?id={pid}", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get(f"/export_pdf?id={pid}", headers={"If-None-Match": pdf.headers["ETag"]}).status_code == 200
+    # ... while the listing only changes when a plan is added
+    assert client.get("/list_plans?user_id=7", headers={"If-None-Match": list_etag}).status_code == 304
+    client.post("/save_plan", data={"plan": json.dumps(plan), "user_id": 7})
+    assert client.get("/list_plans?user_id=7", headers={"If-None-Match": list_etag}).status_code == 200
+    assert client.get("/export_ics?id=999").json() == {"error": "not found"}
+
+
+def test_export_pdf_renders_json_strings_in_memory_and_caches(tmp_db, monkeypatch):
+    from backend import main as backend_main
+    from backend.exports import ExportPool
+    from backend.pdf_cache import PdfCache
+
+    monkeypatch.setattr(backend_main, "export_pool", ExportPool(workers=0))
+    monkeypatch.setattr(backend_main, "pdf_cache", PdfCache(max_bytes=1 << 20))
+    plan = client.post("/plan", data={"topics_text": "Limits\nDerivatives", "plan_length": 3}).json()
+    # the form field is a JSON string (this used to be rejected with 422)
+    first = client.post("/export_pdf", data={"plan": json.dumps(plan)})
+    assert first.status_code == 200 and first.headers["content-type"] == "application/pdf"
+    assert first.content.startswith(b"%PDF") and first.headers["content-length"] == str(len(first.content))
+    assert client.post("/export_pdf", data={"plan": json.dumps(plan)}).content == first.content
+    stats = client.get("/cache_stats").json()["pdf"]
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+    assert client.post("/export_pdf", data={"plan": "not json"}).json() == {"error": "plan is not valid JSON"}
+    assert client.post("/export_pdf", data={"plan": "[1, 2]"}).json() == {"error": "plan must be a JSON object"}
+
+    monkeypatch.setattr(backend_main, "export_pool", ExportPool(workers=0, queue_depth=0))
+    busy = client.post("/export_pdf", data={"plan": json.dumps(dict(plan, plan_length=4))})
+    assert busy.status_code == 503 and "Retry-After" in busy.headers
+
+
+def test_export_pool_renders_in_worker_process():
+    import asyncio
+    from backend.exports import ExportPool
+
+    pool = ExportPool(workers=1)
+    try:
+        pdf = asyncio.run(pool.render_pdf(b'{"plan_length": 1, "plan": [{"day": 1, "topics": [{"title": "A"}]}]}'))
+    finally:
+        pool.shutdown()
+    assert pdf.startswith(b"%PDF")
+
+
+def test_export_bulk_streams_a_zip_of_every_plan(tmp_db, monkeypatch):
+    import io
+    import zipfile
+    from backend import main as backend_main
+    from backend.exports import ExportPool
+
+    monkeypatch.setattr(backend_main, "export_pool", ExportPool(workers=0, queue_depth=2))
+    plan = client.post("/plan", data={"topics_text": "Limits\nDerivatives", "plan_length": 3}).json()
+    pids = [client.post("/save_plan", data={"plan": json.dumps(dict(plan, course_type=f"C{i}")), "user_id": 5}).json()["id"]
+            for i in range(4)]
+    legacy = client.post("/save_plan", data={"plan": "day 1: read", "user_id": 5}).json()["id"]
+
+    resp = client.post("/export_bulk", data={"user_id": 5})
+    assert resp.headers["content-type"] == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(resp.content))
+    assert archive.testzip() is None
+    manifest = {m["id"]: m for m in json.loads(archive.read("manifest.json"))}
+    assert set(manifest) == set(pids) | {legacy}
+    assert manifest[legacy] == {"id": legacy, "files": [], "error": "not a study plan"}
+    for pid in pids:
+        assert manifest[pid]["files"] == [f"plan_{pid}.pdf", f"plan_{pid}.ics"]
+        assert archive.read(f"plan_{pid}.pdf").startswith(b"%PDF")
+        assert archive.read(f"plan_{pid}.ics").count(b"BEGIN:VEVENT") == len(plan["plan"])
+    # the same bytes as the single-plan export
+    assert archive.read(f"plan_{pids[0]}.pdf") == client.get(f"/export_pdf?id={pids[0]}").content
+
+    only = zipfile.ZipFile(io.BytesIO(client.post("/export_bulk", data={"ids": json.dumps([pids[1], 999]), "formats": "ics"}).content))
+    assert sorted(only.namelist()) == ["manifest.json", f"plan_{pids[1]}.ics"]
+    assert {m["id"]: m["error"] for m in json.loads(only.read("manifest.json"))} == {pids[1]: None, 999: "not found"}
+
+    assert "error" in client.post("/export_bulk", data={"ids": "nope"}).json()
+    assert "error" in client.post("/export_bulk", data={"user_id": 5, "formats": "docx"}).json()
+    assert client.post("/export_bulk", data={}).json() == {"error": "pass ids or user_id"}
+
+
+def test_export_bulk_skips_malformed_plans_and_a_busy_pool(tmp_db, monkeypatch):
+    import io
+    import zipfile
+    from backend import main as backend_main
+    from backend.exports import ExportPool
+
+    monkeypatch.setattr(backend_main, "export_pool", ExportPool(workers=0, queue_depth=2))
+    plan = client.post("/plan", data={"topics_text": "Limits\nDerivatives", "plan_length": 3}).json()
+    good = [client.post("/save_plan", data={"plan": json.dumps(plan), "user_id": 6}).json()["id"] for _ in range(2)]
+    bad = [client.post("/save_plan", data={"plan": json.dumps(p), "user_id": 6}).json()["id"]
+           for p in ({"plan": ["x"]}, {"plan": [{"day": 1, "topics": "x"}]}, {"plan": [{"day": 1, "topics": [3]}]})]
+
+    archive = zipfile.ZipFile(io.BytesIO(client.post("/export_bulk", data={"user_id": 6}).content))
+    assert archive.testzip() is None
+    manifest = {m["id"]: m for m in json.loads(archive.read("manifest.json"))}
+    assert {pid: manifest[pid]["error"] for pid in bad} == {pid: "not a study plan" for pid in bad}
+    for pid in good:
+        assert archive.read(f"plan_{pid}.pdf").startswith(b"%PDF")
+
+    # a pool that never frees up skips the plan instead of waiting forever
+    full = ExportPool(workers=0, queue_depth=1)
+    full.pending = 1
+    monkeypatch.setattr(backend_main, "export_pool", full)
+    monkeypatch.setattr(backend_main, "BULK_EXPORT_BUSY_RETRIES", 1)
+    busy = zipfile.ZipFile(io.BytesIO(client.post("/export_bulk", data={"ids": json.dumps(good), "formats": "ics"}).content))
+    assert [m["error"] for m in json.loads(busy.read("manifest.json"))] == ["export busy", "export busy"]
+
+
+def test_lifespan_warms_ocr_and_shuts_everything_down(monkeypatch):
+    import warnings
+    from backend import main as backend_main
+
+    closed = []
+
+    class Stub:
+        workers = 1
+
+        def __init__(self, name):
+            self.name = name
+
+        def start(self):
+            closed.append("start " + self.name)
+
+        def shutdown(self):
+            closed.append(self.name)
+
+    for name in ("pdf_pool", "ocr_pool", "export_pool", "text_cache", "db"):
+        monkeypatch.setattr(backend_main, name, Stub(name))
+    monkeypatch.setattr(backend_main, "ocr_warm_language_sets", lambda: [["en"]])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        with TestClient(backend_main.app):
+            assert closed == ["start ocr_pool"]
+    assert closed[1:] == ["pdf_pool", "ocr_pool", "export_pool", "text_cache", "db"]
+
+
+def test_pools_replace_an_executor_broken_by_a_dead_worker():
+    import asyncio
+    from backend.exports import ExportPool
+    from backend.extraction import OcrWorkerPool, ExtractionQueueFull
+
+    plan = b'{"plan_length": 1, "plan": [{"day": 1, "topics": [{"title": "A"}]}]}'
+
+    def kill_workers(pool):
+        for proc in list(pool._executor._processes.values()):
+            proc.kill()
+            proc.join()
+
+    pool = ExportPool(workers=1)
+    try:
+        assert asyncio.run(pool.render_pdf(plan)).startswith(b"%PDF")
+        broken = pool._executor
+        kill_workers(pool)
+        # the job that finds the pool broken is retried on fresh workers
+        assert asyncio.run(pool.render_pdf(plan)).startswith(b"%PDF")
+        assert pool._executor is not broken
+    finally:
+        pool.shutdown()
+
+    ocr = OcrWorkerPool(workers=1, queue_size=1, deadline=60)
+    try:
+        ocr.start()
+        # wait until the worker is up, then kill it
+        ocr._executor.submit(int).result()
+        kill_workers(ocr)
+        with pytest.raises(ExtractionQueueFull):
+            asyncio.run(ocr.submit(b"not an image"))
+        assert ocr.in_flight == 0 and ocr._executor is None
+        # the next request runs on a fresh worker
+        assert asyncio.run(ocr.submit(b"not an image")) == ""
+    finally:
+        ocr.shutdown()
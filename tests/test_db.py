@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+# Ensure repository root is on sys.path so `backend` package imports work during tests
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend.db import ConnectionPool
+
+
+def test_connections_are_per_thread_and_tuned(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "t.db"), synchronous="normal", cache_kb=1024, mmap_bytes=0, busy_timeout_ms=1234)
+    conn = pool.connection()
+    assert pool.connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -1024
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 1234
+
+    other = []
+    t = threading.Thread(target=lambda: other.append(pool.connection()))
+    t.start()
+    t.join()
+    assert other[0] is not conn
+    assert pool.stats()["connections"] == 2
+    pool.close_all()
+    assert pool.connection() is not conn
+
+
+def test_commits_are_durable_by_default(tmp_path, monkeypatch):
+    monkeypatch.delenv("PLANORA_DB_SYNCHRONOUS", raising=False)
+    pool = ConnectionPool(str(tmp_path / "t.db"))
+    assert pool.synchronous == "FULL"
+    assert pool.connection().execute("PRAGMA synchronous").fetchone()[0] == 2
+    assert ConnectionPool(str(tmp_path / "t.db"), synchronous="bogus").synchronous == "FULL"
+
+
+def test_transaction_commits_or_rolls_back(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "t.db"))
+    with pool.transaction() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+    with pool.transaction() as conn:
+        conn.execute("INSERT INTO t VALUES (1)")
+        # nested blocks join the outer transaction
+        with pool.transaction() as inner:
+            inner.execute("INSERT INTO t VALUES (2)")
+    with pytest.raises(RuntimeError):
+        with pool.transaction() as conn:
+            conn.execute("INSERT INTO t VALUES (3)")
+            raise RuntimeError("boom")
+    reader = sqlite3.connect(str(tmp_path / "t.db"))
+    assert [r[0] for r in reader.execute("SELECT x FROM t ORDER BY x")] == [1, 2]
+    reader.close()
+    assert pool.stats()["rollbacks"] == 1
+    pool.close_all()
+
+
+def _insert(conn, value):
+    if value < 0:
+        raise ValueError("negative")
+    return conn.execute("INSERT INTO t VALUES (?)", (value,)).lastrowid
+
+
+def test_writes_are_group_committed_and_isolated(tmp_path):
+    import asyncio
+
+    pool = ConnectionPool(str(tmp_path / "t.db"), batch_max=16, batch_wait_ms=20)
+    with pool.transaction() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+
+    async def burst():
+        return await asyncio.gather(*[pool.write(_insert, v) for v in [1, 2, -1, 3, 4, 5]], return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert isinstance(results[2], ValueError)
+    assert sorted(r for i, r in enumerate(results) if i != 2) == [1, 2, 3, 4, 5]
+    stats = pool.stats()
+    assert stats["batched_writes"] == 6 and stats["batches"] < 6
+    pool.shutdown()
+
+    reader = sqlite3.connect(str(tmp_path / "t.db"))
+    assert [r[0] for r in reader.execute("SELECT x FROM t ORDER BY x")] == [1, 2, 3, 4, 5]
+    reader.close()
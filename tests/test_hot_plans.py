@@ -0,0 +1,51 @@
+import os
+import sys
+
+# Ensure repository root is on sys.path so `backend` package imports work during tests
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend.hot_plans import ENTRY_OVERHEAD, HotPlanCache
+
+
+def test_evicts_least_recently_used_past_byte_budget():
+    cache = HotPlanCache(max_bytes=3 * (100 + ENTRY_OVERHEAD))
+    for pid in (1, 2, 3):
+        cache.put(pid, b"x" * 100, 0, cache.token())
+    assert cache.get(1) == (b"x" * 100, 0)  # 1 is now most recent
+    cache.put(4, b"y" * 100, 0, cache.token())
+    assert cache.get(2) is None
+    assert cache.get(1) is not None and cache.get(3) is not None and cache.get(4) is not None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["bytes"] <= cache.max_bytes
+
+    # bigger than the whole budget: never stored
+    cache.put(5, b"z" * cache.max_bytes, 0, cache.token())
+    assert cache.get(5) is None
+
+
+def test_put_after_a_write_is_dropped():
+    cache = HotPlanCache(max_bytes=10000)
+    token = cache.token()          # reader starts, misses, goes to the database...
+    cache.invalidate(7)            # ...a write to the plan commits meanwhile...
+    cache.put(7, b"old", 3, token)  # ...and the old row must not be cached
+    assert cache.get(7) is None
+    assert cache.stats()["stale_puts"] == 1
+
+    cache.put(7, b"new", 4, cache.token())
+    assert cache.get(7) == (b"new", 4)
+
+
+def test_invalidate_drops_entry_and_its_bytes():
+    cache = HotPlanCache(max_bytes=10000)
+    cache.put(1, b"abc", 0, cache.token())
+    cache.invalidate(1)
+    assert cache.get(1) is None
+    stats = cache.stats()
+    assert stats["invalidations"] == 1 and stats["bytes"] == 0 and stats["entries"] == 0
+
+
+def test_zero_budget_disables():
+    cache = HotPlanCache(max_bytes=0)
+    cache.put(1, b"", 0, cache.token())
+    assert cache.get(1) is None
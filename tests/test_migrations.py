@@ -0,0 +1,144 @@
+import json
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# Ensure repository root is on sys.path so `backend` package imports work during tests
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend import store
+from backend.migrations import LATEST_VERSION, migrate, schema_version
+
+
+def _columns(conn, table):
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def test_fresh_database_gets_full_schema(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "plans.db"))
+    assert migrate(conn) == LATEST_VERSION == schema_version(conn)
+    assert {"user_id", "version"} <= _columns(conn, "plans")
+    assert {"user_id", "revoked", "refresh_token_backup"} <= _columns(conn, "oauth_tokens")
+    indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    assert {"idx_plans_user_listing", "idx_oauth_tokens_plan_tokens", "idx_oauth_tokens_user_tokens"} <= indexes
+    # superseded by the covering indexes
+    assert not {"idx_plans_user_id", "idx_oauth_tokens_plan_id", "idx_oauth_tokens_user_id"} & indexes
+
+    # already current: nothing to do, not even a transaction
+    before = conn.total_changes
+    assert migrate(conn) == LATEST_VERSION
+    assert conn.total_changes == before and not conn.in_transaction
+    conn.close()
+
+
+def test_pre_versioning_database_is_upgraded_in_place(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "plans.db"))
+    # schema written by the old import-time init_db
+    conn.execute("CREATE TABLE plans (id INTEGER PRIMARY KEY AUTOINCREMENT, created_at TEXT, course_type TEXT, exam_date TEXT, plan_json TEXT, user_id INTEGER)")
+    conn.execute("CREATE TABLE oauth_tokens (id INTEGER PRIMARY KEY AUTOINCREMENT, plan_id INTEGER, refresh_token TEXT, access_token TEXT, scope TEXT, expires_at TEXT, created_at TEXT, user_id INTEGER)")
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE, password_hash TEXT, created_at TEXT)")
+    conn.execute("INSERT INTO plans (plan_json) VALUES ('{}')")
+    conn.execute("INSERT INTO oauth_tokens (plan_id, refresh_token) VALUES (1, 'tok')")
+    conn.commit()
+
+    assert migrate(conn) == LATEST_VERSION
+    assert conn.execute("SELECT plan_json, version FROM plans").fetchall() == [("{}", 0)]
+    assert conn.execute("SELECT refresh_token, revoked FROM oauth_tokens WHERE revoked=0").fetchall() == [("tok", 0)]
+    conn.close()
+
+
+def test_failed_step_rolls_back_everything(tmp_path, monkeypatch):
+    from backend import migrations
+
+    def boom(conn):
+        raise RuntimeError("step failed")
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS + ((LATEST_VERSION + 1, "broken", boom),))
+    monkeypatch.setattr(migrations, "LATEST_VERSION", LATEST_VERSION + 1)
+    conn = sqlite3.connect(str(tmp_path / "plans.db"))
+    with pytest.raises(RuntimeError):
+        migrations.migrate(conn)
+    assert schema_version(conn) == 0
+    assert conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='plans'").fetchone() is None
+    conn.close()
+
+
+def _query_plans(conn, call):
+    """EXPLAIN QUERY PLAN details of every SELECT `call(conn)` runs."""
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call(conn)
+    finally:
+        conn.set_trace_callback(None)
+    return {sql: " | ".join(r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql))
+            for sql in statements if sql.lstrip().upper().startswith("SELECT")}
+
+
+@pytest.mark.parametrize("call, index", [
+    (lambda c: store.list_plans(c, 20, user_id=7), "idx_plans_user_listing"),
+    (lambda c: store.latest_refresh_token(c, 3), "idx_oauth_tokens_plan_tokens"),
+    (lambda c: store.active_refresh_tokens(c, plan_id=3), "idx_oauth_tokens_plan_tokens"),
+    (lambda c: store.active_refresh_tokens(c, user_id=7), "idx_oauth_tokens_user_tokens"),
+])
+def test_hot_lookups_use_covering_indexes(tmp_path, call, index):
+    conn = sqlite3.connect(str(tmp_path / "plans.db"))
+    migrate(conn)
+    conn.executemany("INSERT INTO plans (plan_json, user_id) VALUES ('{}', ?)", [(i % 10,) for i in range(200)])
+    conn.executemany("INSERT INTO oauth_tokens (plan_id, user_id, refresh_token) VALUES (?, ?, 'tok')",
+                     [(i % 10, i % 10) for i in range(200)])
+    conn.execute("ANALYZE")
+    plans = _query_plans(conn, call)
+    assert plans
+    for sql, detail in plans.items():
+        assert f"USING COVERING INDEX {index}" in detail, (sql, detail)
+        # ORDER BY id DESC is answered by the index order, not a sort step
+        assert "TEMP B-TREE" not in detail, (sql, detail)
+    conn.close()
+
+
+def test_progress_queries_stay_on_plan_ranges(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, "NORMALIZE_PLANS", True)
+    conn = sqlite3.connect(str(tmp_path / "plans.db"))
+    migrate(conn)
+    plan_json = json.dumps({"plan": [{"day": d, "topics": [{"title": "t", "estimated_minutes": 30}] * 3} for d in range(1, 31)]})
+    for _ in range(20):
+        store.insert_plan(conn, "2025-01-01T00:00:00", None, None, plan_json)
+    # well into the plans: most topics are done
+    conn.execute("UPDATE plan_topics SET done=1 WHERE day<28")
+    conn.execute("ANALYZE")
+    plans = _query_plans(conn, lambda c: (store.plan_progress(c, 7), store.has_plan_rows(c, 7)))
+    assert plans
+    for sql, detail in plans.items():
+        assert "SCAN" not in detail, (sql, detail)
+    open_days = next(d for sql, d in plans.items() if "done=0" in sql)
+    assert "idx_plan_topics_open" in open_days
+    conn.close()
+
+
+def test_legacy_text_plans_are_stored_as_the_json_get_plan_sends(tmp_path, monkeypatch):
+    import zlib
+    from backend import migrations
+
+    conn = sqlite3.connect(str(tmp_path / "plans.db"))
+    monkeypatch.setattr(migrations, "MIGRATIONS", migrations.MIGRATIONS[:5])
+    monkeypatch.setattr(migrations, "LATEST_VERSION", 5)
+    migrate(conn)
+    rows = [("day 1: read", "json"), ('{"plan": [', "json"), ('"just a string"', "json"), ("[1, 2]", "json"),
+            (None, "json"), (zlib.compress(b"compressed notes"), "zlib")]
+    conn.executemany("INSERT INTO plans (plan_json, plan_format) VALUES (?, ?)", rows)
+    conn.commit()
+    monkeypatch.undo()
+
+    assert migrate(conn) == LATEST_VERSION
+    got = conn.execute("SELECT plan_json, plan_format, version FROM plans ORDER BY id").fetchall()
+    assert [(json.loads(p), f) for p, f, _ in got] == [
+        ({"plan": "day 1: read"}, "json"), ({"plan": '{"plan": ['}, "json"), ("just a string", "json"),
+        ([1, 2], "json"), ({"plan": None}, "json"), ({"plan": "compressed notes"}, "json")]
+    # valid JSON, scalars included, is left byte for byte; versions are untouched
+    assert got[2][0] == '"just a string"' and {v for _, _, v in got} == {0}
+    conn.close()
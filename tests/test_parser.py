@@ -0,0 +1,217 @@
+import os
+import random
+import sys
+
+# Ensure repository root is on sys.path so `backend` package imports work during tests
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend.parser import PlanDay, _DayAllocator, generate_plan
+
+
+def _legacy_allocate(days, capacity, title, minutes, day_order):
+    # Reference copy of the original rescanning allocator
+    remaining = minutes
+    part_idx = 1
+    while remaining > 0:
+        allocated_in_pass = False
+        for di in day_order:
+            day = days[di]
+            avail = capacity - day["total_minutes"]
+            if avail <= 0:
+                continue
+            take = min(remaining, avail)
+            part_title = title
+            if minutes > take:
+                part_title = f"{title} (Part {part_idx})"
+            day["topics"].append({"title": part_title, "estimated_minutes": take})
+            day["total_minutes"] += take
+            remaining -= take
+            part_idx += 1
+            allocated_in_pass = True
+            if remaining <= 0:
+                break
+        if not allocated_in_pass:
+            break
+
+
+def _empty_days(n):
+    return [{"day": d + 1, "topics": [], "total_minutes": 0, "is_review": False} for d in range(n)]
+
+
+def test_day_allocator_matches_rotated_rescan():
+    rng = random.Random(1)
+    for _ in range(200):
+        n_days = rng.randint(1, 30)
+        capacity = rng.choice([0, 30, 60, 120])
+        order = [i for i in range(n_days) if rng.random() > 0.2] or [0]
+        expected, actual = _empty_days(n_days), [PlanDay(d + 1) for d in range(n_days)]
+        allocator = _DayAllocator(actual, order, capacity)
+        next_idx = 0
+        for k in range(rng.randint(0, 80)):
+            minutes = rng.randint(3, 300)
+            rotated = order[next_idx:] + order[:next_idx]
+            _legacy_allocate(expected, capacity, f"T{k}", minutes, rotated)
+            allocator.allocate(f"T{k}", minutes, next_idx)
+            next_idx = (next_idx + 1) % len(order)
+        assert [{k: v for k, v in d.to_dict().items() if k != "daily_summary"} for d in actual] == expected
+
+
+def test_generate_plan_fills_days_without_overflow():
+    topics = [{"title": f"Topic {i}", "length": 100 + i * 37} for i in range(2000)]
+    for exam_type in ("final", "regular_test"):
+        plan = generate_plan([dict(t) for t in topics], plan_length=180, hours_per_day=2.0, exam_type=exam_type)
+        assert len(plan) == 180
+        assert all(d["total_minutes"] <= 120 for d in plan)
+        assert sum(len(d["topics"]) for d in plan) >= 2000
+
+
+def test_size_plan_matches_scalar_estimates():
+    from backend.parser import size_plan
+
+    lengths = [0, 1, 7, 50, 333, 1200, 5000]
+    sizing = size_plan(lengths, plan_length=10, hours_per_day=1.5, exam_type="final")
+    topic_capacity = sizing["topic_capacity"]
+    expected = [max(5, int(round(n / sum(lengths) * topic_capacity))) for n in lengths]
+    if sum(expected) > topic_capacity:
+        scale = topic_capacity / sum(expected)
+        expected = [max(3, int(round(m * scale))) for m in expected]
+    assert sizing["minutes"].tolist() == expected
+    assert sizing["review_days_count"] == 1
+
+
+def test_easyocr_reader_pool_reuses_and_evicts(monkeypatch):
+    from backend.parser import EasyOcrReaderPool
+
+    loaded = []
+
+    class FakeReader:
+        def __init__(self, languages, gpu):
+            loaded.append((tuple(languages), gpu))
+
+    pool = EasyOcrReaderPool(memory_budget_bytes=2 * EasyOcrReaderPool.DEFAULT_READER_BYTES)
+    monkeypatch.setattr(pool, "_load", lambda languages, gpu: FakeReader(languages, gpu))
+
+    en = pool.get(["en"])
+    assert pool.get(["EN", "en"]) is en  # normalized to the same language set
+    pool.get(["en", "fr"])
+    pool.get(["de"])  # over budget: least recently used set ("en") is dropped
+    assert loaded == [(("en",), False), (("en", "fr"), False), (("de",), False)]
+    assert pool.status()["evictions"] == 1
+    assert [r["languages"] for r in pool.status()["readers"]] == [["en", "fr"], ["de"]]
+
+
+def test_extract_topics_manual_list():
+    from backend.parser import extract_topics
+
+    topics = extract_topics("  Limits \r\n\r\nDerivatives\n   \nIntegrals")
+    assert [(t["title"], t["length"]) for t in topics] == [("Limits", 6), ("Derivatives", 11), ("Integrals", 9)]
+
+
+def test_extract_topics_chapter_headings_use_body_offsets():
+    from backend.parser import extract_topics
+
+    body = "x" * 150
+    text = f"Preface {body}\nChapter 1: Intro\n{body}\n\nchapter 2 Advanced\n  Hard topics.  \n"
+    topics = extract_topics(text)
+    assert [t["title"] for t in topics] == ["Chapter 1: Intro", "chapter 2 Advanced"]
+    assert topics[0]["content"] == body
+    assert topics[0]["length"] == len(f"\n{body}\n\n")
+    assert topics[1]["content"] == "Hard topics."
+    assert topics[1]["length"] == len("\n  Hard topics.  \n")
+
+
+def test_extract_topics_inline_chapters_and_paragraph_fallback():
+    from backend.parser import extract_topics
+
+    long = "y" * 130
+    inline = extract_topics(f"Course {long} Chapter 1: Atoms and bonds. Chapter 2:   \nKinetics chapter 3:  ")
+    assert [t["title"] for t in inline] == ["Chapter 1: Atoms and bonds.", "Chapter 2: Kinetics", "Chapter 3: Chapter 3"]
+
+    paragraphs = extract_topics(f"{long}\nmore\n\nshort\n\n  Second section with enough text here  \n")
+    assert [t["title"] for t in paragraphs] == [long[:80], "Second section with enough text here"]
+    assert paragraphs[0]["length"] == len(long) + len("\nmore")
+
+
+def test_topics_are_views_into_one_buffer():
+    from backend.parser import Topic, extract_topics
+
+    body = "Body line for the chapter. " * 10
+    text = "".join(f"Chapter {i}: Title {i}\n  {body}\n\n" for i in range(1, 4))
+    topics = extract_topics(text)
+    assert all(isinstance(t, Topic) for t in topics)
+    assert len({id(t._text) for t in topics}) == 1
+    assert topics[0].content == body.strip()
+    assert not hasattr(topics[0], "__dict__")
+    assert topics[0].to_dict() == {"title": "Chapter 1: Title 1", "length": len(f"\n  {body}\n\n")}
+
+
+def test_generate_plan_serializes_days_at_the_edge():
+    from backend.parser import build_plan, extract_topics
+
+    topics = extract_topics("Limits\nDerivatives\nIntegrals")
+    days = build_plan(topics, plan_length=3, hours_per_day=1.0)
+    assert all(t.estimated_minutes for t in topics)
+    d = days[0].to_dict()
+    assert list(d) == ["day", "topics", "total_minutes", "is_review", "daily_summary"]
+    assert d["topics"] and set(d["topics"][0]) == {"title", "estimated_minutes"}
+
+
+def test_reschedule_keeps_completed_days_and_moves_remaining_minutes():
+    from backend.parser import extract_topics, reschedule_plan
+
+    topics = extract_topics("Limits\nDerivatives\nIntegrals\nSeries")
+    plan = generate_plan(topics, plan_length=6, hours_per_day=1.0)
+    for t in plan[0]["topics"]:
+        t["done"] = True
+    remaining = sum(t["estimated_minutes"] for d in plan[1:] for t in d["topics"])
+
+    new = reschedule_plan(plan, 8, hours_per_day=1.0, topics_meta=[t.to_dict() for t in topics])
+    assert new[0] == plan[0]
+    assert [d["day"] for d in new] == list(range(1, len(new) + 1))
+    assert sum(t["estimated_minutes"] for d in new[1:] for t in d["topics"]) == remaining
+    assert all(d["total_minutes"] <= 60 for d in new)
+    assert len(new) == 1 + 8
+
+    # too little time left: remaining minutes are scaled into the new days
+    short = reschedule_plan(plan, 2, hours_per_day=1.0, topics_meta=[t.to_dict() for t in topics])
+    assert len(short) == 1 + 2
+    assert sum(t["estimated_minutes"] for d in short[1:] for t in d["topics"]) < remaining
+
+
+def test_reschedule_keeps_completed_days_after_an_unfinished_one():
+    from backend.parser import reschedule_plan
+
+    plan = [
+        {"day": 1, "topics": [{"title": "A", "estimated_minutes": 60}], "total_minutes": 60, "is_review": False},
+        {"day": 2, "topics": [{"title": "B", "estimated_minutes": 60, "done": True}], "total_minutes": 60, "is_review": False},
+        {"day": 3, "topics": [{"title": "C", "estimated_minutes": 60}], "total_minutes": 60, "is_review": False},
+    ]
+    new = reschedule_plan(plan, 2, hours_per_day=1.0)
+    assert new[0] == dict(plan[1], day=1)
+    assert [d["day"] for d in new] == list(range(1, len(new) + 1))
+    titles = [t["title"] for d in new for t in d["topics"]]
+    assert sorted(titles) == ["A", "B", "C"]
+    # the same holds when the flag comes from `done` instead of the stored topic
+    plan[1]["topics"][0].pop("done")
+    assert reschedule_plan(plan, 2, hours_per_day=1.0, done={(2, 0): True})[0]["topics"][0]["title"] == "B"
+
+
+def test_reschedule_keeps_done_topics_of_partly_done_days_and_starts_at_first_day():
+    from backend.parser import reschedule_plan
+
+    plan = [
+        {"day": 1, "topics": [{"title": "A", "estimated_minutes": 30, "done": True},
+                              {"title": "B", "estimated_minutes": 30}], "total_minutes": 60, "is_review": False},
+        {"day": 2, "topics": [{"title": "C", "estimated_minutes": 60}], "total_minutes": 60, "is_review": False},
+    ]
+    new = reschedule_plan(plan, 2, hours_per_day=1.0, first_day=5)
+    assert new[0]["day"] == 1
+    assert new[0]["topics"] == [{"title": "A", "estimated_minutes": 30, "done": True}]
+    assert new[0]["total_minutes"] == 30
+    # a user who is behind gets the new days from today on, not in the past
+    assert [d["day"] for d in new[1:]] == [5, 6]
+    assert sorted(t["title"] for d in new[1:] for t in d["topics"]) == ["B", "C"]
+    # days already kept past `first_day` push the new days after them
+    assert [d["day"] for d in reschedule_plan(plan, 2, hours_per_day=1.0, first_day=1)] == [1, 2, 3]
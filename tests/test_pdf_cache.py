@@ -0,0 +1,35 @@
+import os
+import sys
+
+# Ensure repository root is on sys.path so `backend` package imports work during tests
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend.pdf_cache import ENTRY_OVERHEAD, PdfCache, pdf_cache_key
+
+
+def test_key_follows_plan_content():
+    assert pdf_cache_key(b'{"plan": []}') == pdf_cache_key(b'{"plan": []}')
+    assert pdf_cache_key(b'{"plan": []}') != pdf_cache_key(b'{"plan": [1]}')
+
+
+def test_evicts_least_recently_used_past_byte_budget():
+    cache = PdfCache(max_bytes=3 * (100 + ENTRY_OVERHEAD))
+    for key in ("a", "b", "c"):
+        cache.put(key, b"%" * 100)
+    assert cache.get("a") == b"%" * 100  # a is now most recent
+    cache.put("d", b"%" * 100)
+    assert cache.get("b") is None
+    assert all(cache.get(k) is not None for k in ("a", "c", "d"))
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["bytes"] <= cache.max_bytes
+
+    cache.put("e", b"%" * cache.max_bytes)  # bigger than the budget: never stored
+    assert cache.get("e") is None
+
+
+def test_zero_budget_disables():
+    cache = PdfCache(max_bytes=0)
+    cache.put("a", b"")
+    assert cache.get("a") is None
@@ -0,0 +1,50 @@
+import os
+import sys
+
+# Ensure repository root is on sys.path so `backend` package imports work during tests
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend.parser import extract_topics, generate_plan
+from backend.plan_cache import PlanCache, plan_fingerprint
+
+TOPICS = "Limits\nDerivatives\nIntegrals\nSeries"
+
+
+def test_cached_plan_matches_and_is_safe_to_mutate():
+    cache = PlanCache(max_entries=8, ttl_seconds=60)
+    expected = generate_plan(extract_topics(TOPICS), plan_length=5, hours_per_day=1.0)
+
+    first = cache.generate(extract_topics(TOPICS), plan_length=5, hours_per_day=1.0)
+    first[0]["topics"].append({"title": "scribble", "estimated_minutes": 1})
+    first[1]["total_minutes"] = -1
+
+    topics = extract_topics(TOPICS)
+    second = cache.generate(topics, plan_length=5, hours_per_day=1.0)
+    assert first != expected and second == expected
+    assert all(t["estimated_minutes"] for t in topics)
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_fingerprint_covers_every_input():
+    topics = extract_topics(TOPICS)
+    base = plan_fingerprint(topics, 14, 2.0, "final", None)
+    assert base == plan_fingerprint(extract_topics(TOPICS), 14, 2, "final", None)
+    assert base != plan_fingerprint(topics, 15, 2.0, "final", None)
+    assert base != plan_fingerprint(topics, 14, 2.0, "regular_test", None)
+    assert base != plan_fingerprint(topics, 14, 2.0, "final", 0.1)
+    assert base != plan_fingerprint(extract_topics(TOPICS + "\nVectors"), 14, 2.0, "final", None)
+
+
+def test_ttl_and_lru_eviction():
+    now = [0.0]
+    cache = PlanCache(max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+    for days in (3, 4, 5):
+        cache.generate(extract_topics(TOPICS), plan_length=days)
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 2
+
+    now[0] = 11.0
+    cache.generate(extract_topics(TOPICS), plan_length=5)
+    assert cache.stats()["expired"] == 1
+    assert cache.stats()["hits"] == 0
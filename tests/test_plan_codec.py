@@ -0,0 +1,60 @@
+import json
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# Ensure repository root is on sys.path so `backend` package imports work during tests
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend import plan_codec, store
+from backend.migrations import migrate
+
+PLAN_JSON = json.dumps({"plan": [{"day": d, "topics": [{"title": f"Chapter {d}: kinetics and equilibrium", "estimated_minutes": 60}]}
+                                 for d in range(1, 181)]})
+
+
+@pytest.mark.parametrize("fmt", ["json", "zlib"] + (["zstd"] if plan_codec.ZSTD_AVAILABLE else []))
+def test_round_trip(fmt):
+    stored, used = plan_codec.encode(PLAN_JSON, fmt)
+    assert used == fmt
+    if fmt != "json":
+        assert isinstance(stored, bytes) and len(stored) < len(PLAN_JSON) // 4
+    assert plan_codec.decode(stored, used) == PLAN_JSON
+
+
+def test_compression_is_opt_in():
+    assert plan_codec._write_format(None) == "json"
+    assert plan_codec._write_format("none") == "json"
+    assert plan_codec._write_format("auto") == ("zstd" if plan_codec.ZSTD_AVAILABLE else "zlib")
+
+
+def test_small_plans_stay_plain_and_unknown_formats_fail():
+    assert plan_codec.encode('{"plan": []}', "zlib") == ('{"plan": []}', "json")
+    with pytest.raises(ValueError):
+        plan_codec.decode(b"x", "lz4")
+
+
+def test_store_reads_legacy_rows_and_compresses_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(plan_codec, "WRITE_FORMAT", "zlib")
+    conn = sqlite3.connect(str(tmp_path / "plans.db"))
+    migrate(conn)
+    # a row written before compression: plain text, default tag
+    conn.execute("INSERT INTO plans (plan_json) VALUES (?)", (PLAN_JSON,))
+    assert store.get_plan_row(conn, 1) == (PLAN_JSON, 0)
+
+    pid = store.insert_plan(conn, "now", None, None, PLAN_JSON)
+    stored, fmt = conn.execute("SELECT plan_json, plan_format FROM plans WHERE id=?", (pid,)).fetchone()
+    assert fmt == "zlib" and isinstance(stored, bytes)
+    assert store.get_plan_row(conn, pid) == (PLAN_JSON, 0)
+
+    # updates re-encode in the current format, whatever the row held before
+    changed = PLAN_JSON.replace("kinetics", "thermodynamics")
+    assert store.update_plan_json(conn, 1, changed) == 1
+    assert conn.execute("SELECT plan_format FROM plans WHERE id=1").fetchone()[0] == "zlib"
+    assert store.update_plan_json_if_version(conn, 1, PLAN_JSON, 1)
+    assert store.get_plan_row(conn, 1) == (PLAN_JSON, 2)
+    conn.close()
@@ -0,0 +1,123 @@
+import os
+import sys
+
+# Ensure repository root is on sys.path so `backend` package imports work during tests
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend.text_cache import TextCache, cache_key
+
+
+def test_key_depends_on_bytes_and_settings():
+    assert cache_key(b"abc", extractor="ocr", gpu=False) == cache_key(b"abc", gpu=False, extractor="ocr")
+    assert cache_key(b"abc", extractor="ocr", gpu=False) != cache_key(b"abc", extractor="ocr", gpu=True)
+    assert cache_key(b"abc", extractor="ocr") != cache_key(b"abd", extractor="ocr")
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    db = str(tmp_path / "cache.db")
+    cache = TextCache(db_path=db)
+    assert cache.get("k") is None
+    cache.put("k", "Chapter 1: Intro")
+    assert cache.get("k") == "Chapter 1: Intro"
+    assert cache.stats()["memory_hits"] == 1 and cache.stats()["misses"] == 1
+
+    fresh = TextCache(db_path=db)
+    assert fresh.get("k") == "Chapter 1: Intro"
+    assert fresh.stats()["disk_hits"] == 1
+
+
+def test_size_bounded_lru_eviction(tmp_path):
+    cache = TextCache(db_path=str(tmp_path / "cache.db"), memory_bytes=25, disk_bytes=25)
+    cache.put("a", "x" * 10)
+    cache.put("b", "y" * 10)
+    cache.get("a")  # a is now most recently used in memory
+    cache.put("c", "z" * 10)
+    assert cache.stats()["memory_evictions"] == 1
+    assert "b" not in cache._memory and "a" in cache._memory
+    assert cache.stats()["disk_evictions"] == 1
+
+
+def test_repeat_upload_skips_extraction(tmp_path):
+    from fastapi.testclient import TestClient
+    from backend import main as backend_main
+
+    class CountingPool:
+        calls = 0
+
+        async def extract(self, contents):
+            CountingPool.calls += 1
+            return "Chapter 1: Cached\nSome body text for the cached chapter."
+
+    originals = backend_main.pdf_pool, backend_main.text_cache
+    backend_main.pdf_pool = CountingPool()
+    backend_main.text_cache = TextCache(db_path=str(tmp_path / "cache.db"))
+    try:
+        client = TestClient(backend_main.app)
+        pdf = b"%PDF-1.4 fake syllabus bytes"
+        for _ in range(2):
+            resp = client.post("/plan", files={"file": ("s.pdf", pdf, "application/pdf")})
+            assert resp.status_code == 200
+            assert resp.json()["topics_count"] >= 1
+        assert CountingPool.calls == 1
+        stats = client.get("/cache_stats").json()["text"]
+        assert stats["memory_hits"] == 1 and stats["stores"] == 1
+    finally:
+        backend_main.pdf_pool, backend_main.text_cache = originals
+
+
+def test_async_access_keeps_disk_io_off_the_calling_thread(tmp_path):
+    import asyncio
+    import threading
+
+    db = str(tmp_path / "cache.db")
+    TextCache(db_path=db).put("k", "Chapter 1: Intro")
+    cache = TextCache(db_path=db)
+    disk_threads = []
+    disk_get = cache._disk_get
+
+    def recording_disk_get(key):
+        disk_threads.append(threading.get_ident())
+        return disk_get(key)
+
+    cache._disk_get = recording_disk_get
+
+    async def run():
+        assert await cache.aget("k") == "Chapter 1: Intro"
+        assert await cache.aget("k") == "Chapter 1: Intro"  # memory tier now
+        assert await cache.aget("missing") is None
+        await cache.aput("k2", "Chapter 2: More")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert len(disk_threads) == 2 and loop_thread not in disk_threads
+    assert cache.stats()["disk_hits"] == 1 and cache.stats()["memory_hits"] == 1 and cache.stats()["misses"] == 1
+    assert TextCache(db_path=db).get("k2") == "Chapter 2: More"
+    cache.shutdown()
+
+
+def test_disk_hits_stamp_last_used_in_batches(tmp_path):
+    import sqlite3
+
+    db = str(tmp_path / "cache.db")
+    TextCache(db_path=db).put("k", "Chapter 1: Intro")
+
+    def last_used():
+        conn = sqlite3.connect(db)
+        try:
+            return conn.execute("SELECT last_used FROM text_cache WHERE key='k'").fetchone()[0]
+        finally:
+            conn.close()
+
+    stored = last_used()
+    cache = TextCache(db_path=db, memory_bytes=0)  # every hit goes to disk
+    assert cache.get("k") == "Chapter 1: Intro"
+    assert last_used() == stored  # a hit alone writes nothing
+    cache.put("other", "Chapter 9: Later")
+    assert last_used() > stored  # written along with the next store
+
+    before = last_used()
+    cache.get("k")
+    cache.shutdown()
+    assert last_used() > before  # queued stamps are flushed on shutdown